@@ -0,0 +1,212 @@
+"""
+Alert rules: which detections raise alerts, grouped how, and how severe
+Alert candidates (new detections, or objects gone from a site's scene) go
+through three stages, all in memory, so deciding costs no database reads:
+
+1. Deduplication: a candidate whose (place, kind, class, grid cell) raised an
+   alert within the window is suppressed. Recently alerted keys are kept in a
+   bounded LRU, so memory stays flat however many places are watched.
+2. Aggregation: the remaining candidates of one image, kind and class become
+   one summary alert, attached to the most confident detection.
+3. Rate limiting: a token bucket caps the alerts per minute; when a batch
+   doesn't fit, the most severe alerts are kept and the rest dropped.
+
+Severity comes from per-class rules (confidence thresholds, and escalation
+of summaries covering many objects). State is per process: under gunicorn
+each worker deduplicates and rate-limits on its own. It only changes once
+the alerts are stored: evaluate decides, apply records the decision after
+the transaction commits, so alerts that are rolled back can be raised again.
+"""
+
+import json
+import math
+import threading
+import time
+from collections import Counter, OrderedDict
+
+SEVERITY_RANK = {'low': 0, 'medium': 1, 'high': 2}
+
+# Matches the original confidence-only severities; ALERT_RULES overrides per class
+DEFAULT_RULE = {
+    'enabled': True,
+    'min_confidence': 0.0,  # candidates below this never alert
+    'medium': 0.7,  # severity is medium above this confidence...
+    'high': 0.9,  # ...and high above this one
+    'escalate_count': 0  # summaries of at least this many objects are high (0: never)
+}
+
+
+class SeverityRules:
+    """Per-class alert rules; '*' sets the defaults for classes without their own"""
+
+    def __init__(self, rules=None):
+        rules = dict(rules or {})
+        unknown = {key for rule in rules.values() for key in rule} - set(DEFAULT_RULE)
+        if unknown:
+            raise ValueError(f"Unknown alert rule settings: {', '.join(sorted(unknown))}")
+        self.default = {**DEFAULT_RULE, **rules.pop('*', {})}
+        self.rules = {class_name: {**self.default, **rule} for class_name, rule in rules.items()}
+
+    @classmethod
+    def from_json(cls, text):
+        """Rules from a JSON object such as {"truck": {"high": 0.8}, "*": {"min_confidence": 0.6}}"""
+        return cls(json.loads(text) if text and text.strip() else None)
+
+    def rule(self, class_name):
+        return self.rules.get(class_name, self.default)
+
+    def alerts(self, class_name, confidence):
+        rule = self.rule(class_name)
+        return rule['enabled'] and confidence >= rule['min_confidence']
+
+    def severity(self, class_name, confidence, count=1):
+        rule = self.rule(class_name)
+        if confidence > rule['high'] or (rule['escalate_count'] and count >= rule['escalate_count']):
+            return 'high'
+        if confidence > rule['medium']:
+            return 'medium'
+        return 'low'
+
+    def to_dict(self):
+        return {'*': self.default, **self.rules}
+
+
+class RecentKeys:
+    """LRU of keys that raised an alert, and when (bounded to max_keys)"""
+
+    def __init__(self, window_seconds, max_keys=10000):
+        self.window_seconds = window_seconds
+        self.max_keys = max_keys
+        self._seen = OrderedDict()
+
+    def __len__(self):
+        return len(self._seen)
+
+    def recent(self, key, now):
+        """Whether key alerted within the window"""
+        seen = self._seen.get(key)
+        return seen is not None and now - seen < self.window_seconds
+
+    def add(self, key, now):
+        self._seen[key] = now
+        self._seen.move_to_end(key)
+        while len(self._seen) > self.max_keys:
+            self._seen.popitem(last=False)
+
+
+class RateLimiter:
+    """Token bucket allowing per_minute alerts a minute, in bursts of up to per_minute"""
+
+    def __init__(self, per_minute):
+        self.per_minute = per_minute
+        self._tokens = float(per_minute)
+        self._updated = None
+
+    def _refill(self, now):
+        if self._updated is not None and now > self._updated:
+            self._tokens = min(self.per_minute, self._tokens + (now - self._updated) * self.per_minute / 60)
+        if self._updated is None or now > self._updated:
+            self._updated = now
+
+    def available(self, now):
+        """Whole tokens available at now (nothing is spent)"""
+        self._refill(now)
+        return max(0, math.floor(self._tokens))
+
+    def spend(self, count, now):
+        self._refill(now)
+        self._tokens -= count
+
+
+class AlertEngine:
+    """
+    Turns one image's alert candidates into the alerts to store
+    A candidate is (kind, detection id, class name, confidence, (x_min,
+    y_min, x_max, y_max)); kind is 'new' or 'disappeared'.
+    """
+
+    def __init__(self, rules=None, aggregate=True, dedup_window_seconds=300, cell_size=128, max_keys=10000,
+                 rate_per_minute=0, clock=time.monotonic):
+        self.rules = rules or SeverityRules()
+        self.aggregate = aggregate
+        self.cell_size = cell_size
+        self.recent = RecentKeys(dedup_window_seconds, max_keys) if dedup_window_seconds > 0 else None
+        self.limiter = RateLimiter(rate_per_minute) if rate_per_minute > 0 else None
+        self.clock = clock
+        self.counts = Counter()
+        self._lock = threading.Lock()
+
+    def region_key(self, place, kind, class_name, box):
+        """Dedup key: the grid cell of the box centre at a place (a site, or one image)"""
+        x_min, y_min, x_max, y_max = box
+        return (place, kind, class_name,
+                int((x_min + x_max) / 2 // self.cell_size), int((y_min + y_max) / 2 // self.cell_size))
+
+    def evaluate(self, candidates, place, pending=()):
+        """
+        Apply the rules to one image's candidates
+        Nothing is recorded yet: pass the returned decision to apply() once the
+        alerts are stored.
+        pending: decisions of the same transaction not applied yet; their keys
+        and tokens count as used
+        Returns: (alert groups, most severe first, as dicts of kind, detection_id
+        (the group's most confident detection), class_name, confidence (its
+        highest), count and severity; Counter of what happened to the
+        candidates; the decision)
+        """
+        with self._lock:
+            now = self.clock()
+            pending_keys = {key for decision in pending for key in decision['keys']}
+            outcomes = Counter(candidates=len(candidates))
+            groups = {}
+            for kind, detection_id, class_name, confidence, box in candidates:
+                if not self.rules.alerts(class_name, confidence):
+                    outcomes['below_rules'] += 1
+                    continue
+                key = self.region_key(place, kind, class_name, box)
+                if key in pending_keys or (self.recent is not None and self.recent.recent(key, now)):
+                    outcomes['duplicates'] += 1
+                    continue
+                group_key = (kind, class_name) if self.aggregate else (kind, class_name, detection_id)
+                group = groups.get(group_key)
+                if group is None:
+                    group = groups[group_key] = {'kind': kind, 'detection_id': detection_id, 'class_name': class_name,
+                                                 'confidence': confidence, 'count': 0, 'keys': []}
+                elif confidence > group['confidence']:
+                    group['detection_id'], group['confidence'] = detection_id, confidence
+                group['count'] += 1
+                group['keys'].append(key)
+
+            alerts = list(groups.values())
+            for group in alerts:
+                group['severity'] = self.rules.severity(group['class_name'], group['confidence'], group['count'])
+            alerts.sort(key=lambda group: (-SEVERITY_RANK[group['severity']], -group['confidence']))
+            if self.limiter is not None:
+                allowed = max(0, self.limiter.available(now) - sum(decision['tokens'] for decision in pending))
+                outcomes['rate_limited'] += sum(group['count'] for group in alerts[allowed:])
+                alerts = alerts[:allowed]
+
+            # Only alerts that will be stored start a dedup window
+            keys = [key for group in alerts for key in group.pop('keys')]
+            outcomes['alerts'] += len(alerts)
+            outcomes['aggregated'] += sum(group['count'] - 1 for group in alerts)
+            return alerts, outcomes, {'time': now, 'keys': keys, 'tokens': len(alerts), 'outcomes': outcomes}
+
+    def apply(self, decision):
+        """Record a decision whose alerts were stored: start their dedup windows and spend their tokens"""
+        with self._lock:
+            if self.recent is not None:
+                for key in decision['keys']:
+                    self.recent.add(key, decision['time'])
+            if self.limiter is not None:
+                self.limiter.spend(decision['tokens'], decision['time'])
+            self.counts.update(decision['outcomes'])
+
+    def stats(self):
+        with self._lock:
+            return {
+                **{key: self.counts[key] for key in ('candidates', 'alerts', 'aggregated', 'duplicates',
+                                                     'rate_limited', 'below_rules')},
+                'recent_keys': len(self.recent) if self.recent is not None else None,
+                'rules': self.rules.to_dict()
+            }
@@ -0,0 +1,183 @@
+"""
+Fan-out of newly created alerts to Server-Sent Events subscribers
+The alerts table is used as the shared log between processes: each process
+runs one poller thread (only while it has subscribers) that reads alerts past
+its high-water mark and fans them out to local subscribers. Alerts created
+in the same process are also published directly, so they reach local
+subscribers without waiting for the next poll. Web workers and job workers
+need no broker beyond the database they already share.
+
+Every subscriber has a bounded buffer. A subscriber that falls behind is
+marked lagged instead of growing the buffer; its stream then catches up from
+the database at its own pace.
+"""
+
+import logging
+import os
+import queue
+import threading
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class AlertSubscriber:
+    """One stream's bounded buffer of pending alerts"""
+
+    def __init__(self, severities=None, buffer_size=256):
+        self.severities = set(severities) if severities else None
+        self.buffer = queue.Queue(maxsize=buffer_size)
+        self.lagged = threading.Event()
+        self.dropped = 0
+
+    def wants(self, alert):
+        return self.severities is None or alert['severity'] in self.severities
+
+    def offer(self, alert):
+        """Buffer an alert without blocking; overflow marks the subscriber lagged"""
+        if self.lagged.is_set():
+            self.dropped += 1
+            return
+        try:
+            self.buffer.put_nowait(alert)
+        except queue.Full:
+            self.dropped += 1
+            self.lagged.set()
+
+    def get(self, timeout):
+        """Next buffered alert, or None after timeout"""
+        try:
+            return self.buffer.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def reset(self):
+        """Discard buffered alerts after a lag; the caller replays them from the database"""
+        while True:
+            try:
+                self.buffer.get_nowait()
+            except queue.Empty:
+                break
+        self.lagged.clear()
+
+
+class RecentIds:
+    """Set of the most recently added alert ids, forgetting the oldest past maxlen"""
+
+    def __init__(self, maxlen):
+        self._order = deque(maxlen=maxlen)
+        self._ids = set()
+
+    def __contains__(self, alert_id):
+        return alert_id in self._ids
+
+    def add(self, alert_id):
+        if alert_id in self._ids:
+            return
+        if len(self._order) == self._order.maxlen:
+            self._ids.discard(self._order[0])
+        self._order.append(alert_id)
+        self._ids.add(alert_id)
+
+
+class AlertHub:
+    """
+    Per-process registry of alert subscribers
+    fetch_since(after_id, limit) must return alert dicts with id > after_id in
+    id order; latest_id() the current highest alert id.
+    """
+
+    # Ids this far below the high-water mark are re-read on each poll, so an
+    # alert whose transaction commits after a higher id's isn't skipped
+    REWIND = 200
+
+    def __init__(self, fetch_since, latest_id, poll_interval=0.5, buffer_size=256, batch_size=500):
+        self._fetch_since = fetch_since
+        self._latest_id = latest_id
+        self.poll_interval = poll_interval
+        self.buffer_size = buffer_size
+        self.batch_size = batch_size
+
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._recent = RecentIds(self.REWIND * 4)
+        self._high_water = None
+        self._thread = None
+        self._pid = None
+        self._wakeup = threading.Event()
+
+    def subscribe(self, severities=None):
+        subscriber = AlertSubscriber(severities, self.buffer_size)
+        with self._lock:
+            self._subscribers.add(subscriber)
+        self._ensure_polling()
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+    def publish(self, alerts):
+        """Fan alerts out to matching subscribers, skipping ones already delivered"""
+        with self._lock:
+            fresh = []
+            for alert in alerts:
+                alert_id = alert['id']
+                if alert_id in self._recent:
+                    continue
+                if self._high_water is not None and alert_id <= self._high_water - self.REWIND:
+                    continue
+                self._recent.add(alert_id)
+                self._high_water = max(self._high_water or 0, alert_id)
+                fresh.append(alert)
+            subscribers = list(self._subscribers)
+
+        for alert in fresh:
+            for subscriber in subscribers:
+                if subscriber.wants(alert):
+                    subscriber.offer(alert)
+
+    def _ensure_polling(self):
+        """Start the poller lazily, and again in each forked worker"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._poll_loop, name='alert-stream-poller', daemon=True)
+            self._thread.start()
+
+    def _skip_to_latest(self):
+        """Move the high-water mark to the newest alert; nobody was listening for older ones"""
+        try:
+            latest = self._latest_id()
+        except Exception as e:
+            logger.error(f"Alert stream could not read latest alert id: {str(e)}")
+            return
+        with self._lock:
+            self._high_water = max(self._high_water or 0, latest)
+
+    def _poll_loop(self):
+        idle = True
+        while True:
+            if self.subscriber_count() == 0:
+                idle = True
+                self._wakeup.wait(self.poll_interval)
+                continue
+            if idle:
+                self._skip_to_latest()
+                idle = False
+
+            limit = self.batch_size + self.REWIND
+            try:
+                after_id = max((self._high_water or 0) - self.REWIND, 0)
+                alerts = self._fetch_since(after_id, limit)
+                self.publish(alerts)
+                if len(alerts) >= limit:
+                    continue  # more waiting; don't sleep
+            except Exception as e:
+                logger.error(f"Alert stream poll failed: {str(e)}")
+            self._wakeup.wait(self.poll_interval)
@@ -0,0 +1,148 @@
+"""
+Background file writer
+Moves disk writes that a response doesn't have to wait for (such as the
+original upload) off the request thread. The queue is bounded,
+so pending writes can hold at most max_pending buffers; submitters block
+when it is full. Readers of a file that may still be queued call wait().
+A failed write is retried; if it keeps failing, error() reports why and the
+on_failure callback lets the owner record that the file never arrived.
+"""
+
+import atexit
+import logging
+import os
+import queue
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+
+def write_file_atomic(path, data):
+    """Write bytes via a temp file and rename, so readers never see a partial file; skipped if path exists"""
+    path = Path(path)
+    if path.exists():
+        return
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            out.write(data)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+class BackgroundWriter:
+    """Single writer thread per process draining a bounded queue of (path, data) writes"""
+
+    MAX_ERRORS = 1000  # failed paths remembered for error()
+
+    def __init__(self, max_pending=16, retries=2, retry_delay=0.5, on_failure=None):
+        """
+        on_failure: callback(path, error message) run on the writer thread once a
+        write has failed every attempt, and callback(path, None) when a path that
+        failed is written later (e.g. the same upload arriving again)
+        """
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._lock = threading.Lock()
+        self._pending = {}  # path -> Event set once written (or failed)
+        self._errors = {}  # path -> why its last write failed
+        self._thread = None
+        self._pid = None
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.on_failure = on_failure
+        self.written = 0
+        self.retried = 0
+        self.failed = 0
+        atexit.register(self.flush)
+
+    def submit(self, path, data):
+        """
+        Queue an atomic write of data to path; an existing file is left alone
+        data: bytes-like, or a zero-argument callable returning bytes (run on the writer thread)
+        """
+        path = Path(path)
+        self._ensure_running()
+        with self._lock:
+            if path in self._pending:
+                return
+            self._pending[path] = threading.Event()
+        self._queue.put((path, data))
+
+    def wait(self, path, timeout=10):
+        """Block until a queued write of path has finished; True if nothing is pending"""
+        with self._lock:
+            done = self._pending.get(Path(path))
+        return done is None or done.wait(timeout)
+
+    def flush(self, timeout=30):
+        """Wait for every queued write (registered to run at interpreter exit)"""
+        with self._lock:
+            pending = list(self._pending.values())
+        for done in pending:
+            done.wait(timeout)
+
+    def error(self, path):
+        """Why the last write of path failed, or None"""
+        with self._lock:
+            return self._errors.get(Path(path))
+
+    def stats(self):
+        return {'pending': len(self._pending), 'written': self.written, 'retried': self.retried,
+                'failed': self.failed}
+
+    def _ensure_running(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='background-writer', daemon=True)
+            self._thread.start()
+
+    def _write(self, path, data):
+        """
+        Write with retries
+        Returns: None, or the error of the last attempt
+        """
+        for attempt in range(self.retries + 1):
+            try:
+                write_file_atomic(path, data() if callable(data) else data)
+                return None
+            except Exception as e:
+                if attempt == self.retries:
+                    return str(e) or type(e).__name__
+                self.retried += 1
+                logger.warning(f"Background write of {path} failed ({str(e)}), retrying")
+                time.sleep(self.retry_delay * (attempt + 1))
+
+    def _run(self):
+        while True:
+            path, data = self._queue.get()
+            try:
+                error = self._write(path, data)
+                with self._lock:
+                    recovered = error is None and self._errors.pop(path, None) is not None
+                    if error is not None:
+                        self._errors[path] = error
+                        if len(self._errors) > self.MAX_ERRORS:
+                            self._errors.pop(next(iter(self._errors)))
+                if error is None:
+                    self.written += 1
+                else:
+                    self.failed += 1
+                    logger.error(f"Background write of {path} failed after {self.retries + 1} attempts: {error}")
+                if self.on_failure is not None and (error is not None or recovered):
+                    try:
+                        self.on_failure(path, error)
+                    except Exception as e:
+                        logger.error(f"Recording the outcome of the background write of {path} failed: {str(e)}")
+            finally:
+                with self._lock:
+                    done = self._pending.pop(path)
+                done.set()
@@ -0,0 +1,141 @@
+"""
+Benchmark: alert volume and cost of the alert rules
+Stores a sequence of depot captures (the same few hundred objects, slightly
+jittered, re-captured under one site key) through persist_detections, once
+with one alert per detection (the old behaviour) and once with the alert
+rules (per-class summaries, deduplication, rate limiting). Reports per config
+the alert rows written, the time to store each capture, and the SELECTs
+issued while storing other than reloading the image row, which must be none:
+the rules decide in memory. Also checks that two different images uploaded
+under the same filename without a site key both alert.
+
+    cd backend && python benchmarks/bench_alert_rules.py [--objects 300] [--captures 20] [--json out.json]
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+_db_dir = tempfile.mkdtemp(prefix='bench_alert_rules_')
+os.environ['DATABASE_URL'] = f'sqlite:///{_db_dir}/alerts.db'
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import numpy as np  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+import app as backend  # noqa: E402
+from alert_rules import AlertEngine, SeverityRules  # noqa: E402
+from detections import Detections  # noqa: E402
+
+CONFIGS = {
+    'per_detection': dict(aggregate=False, dedup_window_seconds=0, rate_per_minute=0),
+    'rules': dict(aggregate=True, dedup_window_seconds=300, cell_size=128, rate_per_minute=600)
+}
+
+
+def depot(objects, rng):
+    """Fixed object layout over a 4000 px scene; each capture jitters it"""
+    xy = rng.uniform(0, 4000, (objects, 2))
+    wh = rng.uniform(20, 80, (objects, 2))
+    return np.hstack([xy, xy + wh]), rng.integers(0, 2, objects)
+
+
+def capture(layout, rng):
+    boxes, classes = layout
+    return Detections(boxes + rng.normal(0, 3, boxes.shape), rng.uniform(0.5, 1.0, len(boxes)), classes,
+                      {0: 'truck', 1: 'warehouse'})
+
+
+def run(objects, captures):
+    engine = backend.db.engine
+    statements = []
+    event.listen(engine, 'before_cursor_execute',
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+
+    results = []
+    for name, settings in CONFIGS.items():
+        backend.alert_engine = AlertEngine(SeverityRules(), **settings)
+        rng = np.random.default_rng(0)
+        layout = depot(objects, rng)
+        timings, alerts, selects = [], 0, 0
+        for i in range(captures):
+            image_record = backend.DetectionImage(filename=f'{name}_{i}.jpg', original_filename='depot.jpg',
+                                                  file_size=0, file_path='/dev/null', site_key='depot')
+            backend.db.session.add(image_record)
+            backend.db.session.commit()
+            detections = capture(layout, rng)
+            statements.clear()
+            started = time.perf_counter()
+            alerts += len(backend.persist_detections(image_record, detections)[1])
+            timings.append((time.perf_counter() - started) * 1000)
+            # Reloading the (committed, so expired) image row is the only read expected
+            selects += sum(statement.lstrip().upper().startswith('SELECT') and
+                           'FROM detection_images' not in statement for statement in statements)
+        results.append({
+            'config': name,
+            'objects': objects,
+            'captures': captures,
+            'alerts': alerts,
+            'alerts_per_capture': round(alerts / captures, 1),
+            'persist_ms_median': round(statistics.median(timings), 2),
+            'selects': selects,
+            'outcomes': {key: value for key, value in backend.alert_engine.stats().items() if key != 'rules'}
+        })
+    return results
+
+
+def same_name_alerts(objects):
+    """
+    Store two different images both named a.jpg (no site key) with the rules on
+    Returns: alerts raised for each; deduplicating across them would leave the second with none
+    """
+    backend.alert_engine = AlertEngine(SeverityRules(), **CONFIGS['rules'])
+    rng = np.random.default_rng(1)
+    detections = capture(depot(objects, rng), rng)  # the same boxes in both, the worst case for a clash
+    counts = []
+    for i in range(2):
+        image_record = backend.DetectionImage(filename=f'same_name_{i}.jpg', original_filename='a.jpg', file_size=0,
+                                              file_path='/dev/null', content_hash=f'{i:064x}')
+        backend.db.session.add(image_record)
+        backend.db.session.commit()
+        counts.append(len(backend.persist_detections(image_record, detections)[1]))
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--objects', type=int, default=300)
+    parser.add_argument('--captures', type=int, default=20)
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    backend.logger.setLevel('WARNING')
+    try:
+        backend.init_db()
+        with backend.app.app_context():
+            results = run(args.objects, args.captures)
+            same_name = same_name_alerts(args.objects)
+    finally:
+        shutil.rmtree(_db_dir, ignore_errors=True)
+
+    print(f"{'config':<14} {'alerts':>7} {'per capture':>12} {'persist':>10} {'selects':>8}")
+    for row in results:
+        print(f"{row['config']:<14} {row['alerts']:>7} {row['alerts_per_capture']:>12} "
+              f"{row['persist_ms_median']:>8}ms {row['selects']:>8}")
+
+    print(f"alerts for two different images named a.jpg: {same_name}")
+
+    if args.json:
+        Path(args.json).write_text(json.dumps({'benchmark': 'alert_rules', 'results': results,
+                                               'same_name_alerts': same_name}, indent=2))
+    sys.exit(1 if any(row['selects'] for row in results) or not all(same_name) else 0)
+
+
+if __name__ == '__main__':
+    main()
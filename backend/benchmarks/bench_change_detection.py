@@ -0,0 +1,108 @@
+"""
+Benchmark: matching two scenes' detections for change detection
+Builds a scene of random boxes over a 10000x10000 px area and a second scene
+in which most boxes moved slightly, some disappeared and some appeared, then
+times match_boxes (x-sorted candidate pruning, per class) against greedy
+matching over the full N x M IoU matrix. The matched pairs of both are
+checked to be identical.
+
+    cd backend && python benchmarks/bench_change_detection.py [--sizes 1000,5000,20000] [--json out.json]
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import numpy as np  # noqa: E402
+
+from boxes import box_iou, match_boxes  # noqa: E402
+
+SCENE_SIZE = 10000
+MATCH_IOU = 0.3
+CLASSES = 2
+
+
+def make_scenes(count, rng):
+    """Two scenes: ~90% of the objects persist (jittered), 10% vanish and 10% are new"""
+    xy = rng.uniform(0, SCENE_SIZE, (count, 2))
+    wh = rng.uniform(20, 120, (count, 2))
+    before = np.concatenate([xy, xy + wh], axis=1).astype(np.float32)
+    before_classes = rng.integers(0, CLASSES, count)
+
+    kept = rng.random(count) >= 0.1
+    moved = before[kept] + rng.normal(0, 4, (int(kept.sum()), 4)).astype(np.float32)
+    new_count = count - int(kept.sum())
+    new_xy = rng.uniform(0, SCENE_SIZE, (new_count, 2))
+    new = np.concatenate([new_xy, new_xy + rng.uniform(20, 120, (new_count, 2))], axis=1).astype(np.float32)
+    after = np.concatenate([moved, new])
+    after_classes = np.concatenate([before_classes[kept], rng.integers(0, CLASSES, new_count)])
+    return before, before_classes, after, after_classes
+
+
+def match_full_matrix(boxes_a, boxes_b, classes_a, classes_b):
+    """The unpruned reference: one N x M IoU matrix, greedy highest IoU first"""
+    iou = box_iou(boxes_a, boxes_b)
+    iou[classes_a[:, None] != classes_b[None, :]] = 0
+    rows, cols = np.nonzero(iou >= MATCH_IOU)
+    order = np.argsort(-iou[rows, cols], kind='stable')
+    used_a = np.zeros(len(boxes_a), dtype=bool)
+    used_b = np.zeros(len(boxes_b), dtype=bool)
+    matched_a, matched_b = [], []
+    for row, col in zip(rows[order].tolist(), cols[order].tolist()):
+        if not used_a[row] and not used_b[col]:
+            used_a[row] = used_b[col] = True
+            matched_a.append(row)
+            matched_b.append(col)
+    return np.asarray(matched_a, dtype=np.int64), np.asarray(matched_b, dtype=np.int64)
+
+
+def timed(function, repeats):
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        result = function()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', default='1000,5000,20000', help='boxes per scene')
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    results = []
+    for size in (int(s) for s in args.sizes.split(',')):
+        before, before_classes, after, after_classes = make_scenes(size, rng)
+        pruned_ms, pruned = timed(lambda: match_boxes(before, after, MATCH_IOU, before_classes, after_classes),
+                                  args.repeats)
+        full_ms, full = timed(lambda: match_full_matrix(before, after, before_classes, after_classes), args.repeats)
+        identical = sorted(zip(*map(np.ndarray.tolist, pruned))) == sorted(zip(*map(np.ndarray.tolist, full)))
+        results.append({
+            'boxes': size,
+            'matched': len(pruned[0]),
+            'pruned_ms': round(pruned_ms, 1),
+            'full_matrix_ms': round(full_ms, 1),
+            'speedup': round(full_ms / pruned_ms, 1),
+            'identical': identical
+        })
+
+    print(f"{'boxes':>7} {'matched':>8} {'pruned':>10} {'full matrix':>12} {'speedup':>8} {'identical':>10}")
+    for row in results:
+        print(f"{row['boxes']:>7} {row['matched']:>8} {row['pruned_ms']:>8}ms {row['full_matrix_ms']:>10}ms "
+              f"{row['speedup']:>7}x {str(row['identical']):>10}")
+
+    if args.json:
+        Path(args.json).write_text(json.dumps({'benchmark': 'change_detection', 'results': results}, indent=2))
+    sys.exit(0 if all(row['identical'] for row in results) else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+"""
+Benchmark: memory and throughput of chunked uploads
+Sends uploads of several sizes (past the 50 MB /api/upload limit) through
+/api/uploads with the Flask test client: start a session, PUT every chunk,
+finalize with async=true so only the transfer is measured. Reports the
+throughput and the peak memory tracemalloc sees during any one request of
+the upload, which should stay around one read block whatever the upload's
+(or the chunk's) size, and checks the stored file's hash against the source.
+
+    cd backend && python benchmarks/bench_chunked_upload.py [--sizes-mb 64,256,1024] [--chunk-mb 8] [--json out.json]
+"""
+
+import argparse
+import gc
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+_db_dir = tempfile.mkdtemp(prefix='bench_chunked_upload_')
+os.environ['DATABASE_URL'] = f'sqlite:///{_db_dir}/bench.db'
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import app as backend  # noqa: E402
+
+
+def source_file(size, directory):
+    """A file of random bytes, streamed so the benchmark itself stays small"""
+    path = Path(directory) / f'scene_{size}.tif'
+    digest = hashlib.sha256()
+    with open(path, 'wb') as out:
+        for offset in range(0, size, 1024 * 1024):
+            block = os.urandom(min(1024 * 1024, size - offset))
+            digest.update(block)
+            out.write(block)
+    return path, digest.hexdigest()
+
+
+def measured(request):
+    """
+    Run one request under tracemalloc
+    Returns: (response, peak bytes allocated during it)
+    """
+    gc.collect()  # the test client leaves reference cycles holding earlier request bodies
+    baseline, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    response = request()
+    return response, tracemalloc.get_traced_memory()[1] - baseline
+
+
+def upload(client, path, chunk_size):
+    """
+    Send path through a chunked upload session
+    Returns: (image id, peak bytes of any one request)
+    """
+    size = path.stat().st_size
+    response, peak = measured(lambda: client.post('/api/uploads', data={
+        'filename': path.name, 'size': size, 'chunk_size': chunk_size, 'async': 'true'
+    }))
+    session = response.get_json()
+    with open(path, 'rb') as source:
+        for index in range(session['chunk_count']):
+            # Only the chunk in flight is in memory, as with a real client
+            chunk = source.read(chunk_size)
+            response, chunk_peak = measured(lambda: client.put(
+                f"/api/uploads/{session['upload_id']}/chunks/{index}", data=chunk))
+            assert response.status_code == 200, response.get_json()
+            peak = max(peak, chunk_peak)
+            del chunk
+    response, finalize_peak = measured(lambda: client.post(f"/api/uploads/{session['upload_id']}/finalize"))
+    assert response.status_code == 202, response.get_json()
+    return response.get_json()['image_id'], max(peak, finalize_peak)
+
+
+def run(sizes, chunk_size, work_dir):
+    client = backend.app.test_client()
+    results = []
+    for size in sizes:
+        path, source_hash = source_file(size, work_dir)
+        tracemalloc.start()
+        started = time.perf_counter()
+        image_id, peak = upload(client, path, chunk_size)
+        elapsed = time.perf_counter() - started
+        tracemalloc.stop()
+        os.unlink(path)
+
+        with backend.app.app_context():
+            image_record = backend.db.session.get(backend.DetectionImage, image_id)
+            stored_hash, stored_path = image_record.content_hash, Path(image_record.file_path)
+        results.append({
+            'size_mb': size // (1024 * 1024),
+            'chunk_mb': chunk_size // (1024 * 1024),
+            'seconds': round(elapsed, 2),
+            'mb_per_second': round(size / (1024 * 1024) / elapsed, 1),
+            'peak_memory_mb': round(peak / (1024 * 1024), 1),
+            'hash_matches': stored_hash == source_hash
+        })
+        stored_path.unlink(missing_ok=True)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes-mb', default='64,256,1024')
+    parser.add_argument('--chunk-mb', type=int, default=8)
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    backend.logger.setLevel('WARNING')
+    work_dir = tempfile.mkdtemp(prefix='bench_chunked_source_')
+    try:
+        backend.init_db()
+        results = run([int(size) * 1024 * 1024 for size in args.sizes_mb.split(',')],
+                      args.chunk_mb * 1024 * 1024, work_dir)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        shutil.rmtree(_db_dir, ignore_errors=True)
+
+    print(f"{'size':>8} {'chunk':>6} {'seconds':>8} {'MB/s':>7} {'peak memory':>12} {'hash ok':>8}")
+    for row in results:
+        print(f"{row['size_mb']:>6}MB {row['chunk_mb']:>4}MB {row['seconds']:>8} {row['mb_per_second']:>7} "
+              f"{row['peak_memory_mb']:>10}MB {str(row['hash_matches']):>8}")
+
+    if args.json:
+        Path(args.json).write_text(json.dumps({'benchmark': 'chunked_upload', 'results': results}, indent=2))
+    sys.exit(0 if all(row['hash_matches'] for row in results) else 1)
+
+
+if __name__ == '__main__':
+    main()
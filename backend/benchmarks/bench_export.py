@@ -0,0 +1,161 @@
+"""
+Benchmark: columnar export against paging through /api/detections
+Seeds the detections table up to each size, then exports all of it with
+write_npy_export (what flask export-data --format npy runs), once timed and
+once under tracemalloc. Reports rows/s and the export's peak memory, which
+should stay at about one chunk whatever the table's size, next to the rate
+of fetching the same rows through /api/detections?cursor= at per_page=20
+(measured on a sample of pages). Finally checks sampled rows of the memory-mapped columns
+against the database.
+
+    cd backend && python benchmarks/bench_export.py [--sizes 100000,1000000] [--chunk-size 50000] [--json out.json]
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+_db_dir = tempfile.mkdtemp(prefix='bench_export_')
+os.environ['DATABASE_URL'] = f'sqlite:///{_db_dir}/export.db'
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import numpy as np  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+
+import app as backend  # noqa: E402
+
+CLASSES = ['truck', 'warehouse']
+
+
+def seed(start, count, rng, chunk=100000):
+    """Add detections start..count across 1000 images"""
+    db = backend.db
+    if not db.session.query(backend.DetectionImage.id).first():
+        db.session.execute(insert(backend.DetectionImage), [{
+            'filename': f'seed_{i}.jpg', 'original_filename': f'seed_{i}.jpg',
+            'file_size': 0, 'file_path': '/dev/null', 'detection_processed': True
+        } for i in range(1000)])
+    for offset in range(start, count, chunk):
+        size = min(chunk, count - offset)
+        xy = rng.uniform(0, 4000, size=(size, 2)).tolist()
+        confidences = rng.uniform(0.5, 1.0, size=size).tolist()
+        class_ids = rng.integers(0, len(CLASSES), size=size).tolist()
+        db.session.execute(insert(backend.Detection), [{
+            'image_id': 1 + (offset + i) % 1000,
+            'class_name': CLASSES[class_ids[i]],
+            'confidence': confidences[i],
+            'x_min': xy[i][0], 'y_min': xy[i][1],
+            'x_max': xy[i][0] + 40, 'y_max': xy[i][1] + 40
+        } for i in range(size)])
+    db.session.commit()
+
+
+def export(directory, chunk_size):
+    """
+    Run the npy export timed, then again under tracemalloc (which slows it down)
+    Returns: (rows, seconds, peak bytes)
+    """
+    started = time.perf_counter()
+    rows = backend.write_npy_export('detections', directory, chunk_size)
+    elapsed = time.perf_counter() - started
+    tracemalloc.start()
+    backend.write_npy_export('detections', directory, chunk_size)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return rows, elapsed, peak
+
+
+def page_rate(client, pages):
+    """Rows per second fetching pages of 20 through the keyset-paged API"""
+    cursor, rows = '', 0
+    started = time.perf_counter()
+    for _ in range(pages):
+        body = client.get(f'/api/detections?per_page=20&cursor={cursor}').get_json()
+        rows += len(body['detections'])
+        cursor = body['next_cursor']
+        if cursor is None:
+            break
+    return rows / (time.perf_counter() - started)
+
+
+def verify(directory, rng, samples=1000):
+    """Whether sampled rows of the memory-mapped columns match the database"""
+    meta = json.loads((Path(directory) / 'meta.json').read_text())
+    columns = {name: np.load(Path(directory) / f'{name}.npy', mmap_mode='r') for name in meta['columns']}
+    positions = rng.choice(meta['rows'], size=min(samples, meta['rows']), replace=False)
+    records = {record.id: record for record in backend.Detection.query.filter(
+        backend.Detection.id.in_([int(columns['id'][p]) for p in positions]))}
+    for position in positions:
+        record = records[int(columns['id'][position])]
+        if (meta['categories']['class_name'][columns['class_name'][position]] != record.class_name or
+                not np.isclose(columns['confidence'][position], record.confidence) or
+                not np.isclose(columns['x_min'][position], record.x_min, atol=1e-3) or
+                columns['image_id'][position] != record.image_id or
+                columns['detection_timestamp'][position] != np.datetime64(record.detection_timestamp, 'us')):
+            return False
+    return True
+
+
+def run(sizes, chunk_size, pages):
+    client = backend.app.test_client()
+    rng = np.random.default_rng(0)
+    results, seeded = [], 0
+    for size in sorted(sizes):
+        seed(seeded, size, rng)
+        seeded = size
+        directory = tempfile.mkdtemp(prefix='bench_export_out_')
+        try:
+            rows, elapsed, peak = export(directory, chunk_size)
+            api_rate = page_rate(client, pages)
+            results.append({
+                'rows': rows,
+                'chunk_size': chunk_size,
+                'export_seconds': round(elapsed, 2),
+                'export_rows_per_second': round(rows / elapsed),
+                'peak_memory_mb': round(peak / (1024 * 1024), 1),
+                'export_mb': round(sum(path.stat().st_size for path in Path(directory).iterdir()) / (1024 * 1024), 1),
+                'api_rows_per_second': round(api_rate),
+                'api_seconds_estimate': round(rows / api_rate, 1),
+                'matches_database': verify(directory, rng)
+            })
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', default='100000,1000000')
+    parser.add_argument('--chunk-size', type=int, default=backend.EXPORT_CHUNK_SIZE)
+    parser.add_argument('--pages', type=int, default=200, help='API pages sampled for its rate')
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    backend.logger.setLevel('WARNING')
+    try:
+        backend.init_db()
+        with backend.app.app_context():
+            results = run([int(size) for size in args.sizes.split(',')], args.chunk_size, args.pages)
+    finally:
+        shutil.rmtree(_db_dir, ignore_errors=True)
+
+    print(f"{'rows':>9} {'export':>9} {'rows/s':>9} {'peak memory':>12} {'size':>8} "
+          f"{'API rows/s':>11} {'API estimate':>13} {'matches':>8}")
+    for row in results:
+        print(f"{row['rows']:>9} {row['export_seconds']:>8}s {row['export_rows_per_second']:>9} "
+              f"{row['peak_memory_mb']:>10}MB {row['export_mb']:>6}MB {row['api_rows_per_second']:>11} "
+              f"{row['api_seconds_estimate']:>12}s {str(row['matches_database']):>8}")
+
+    if args.json:
+        Path(args.json).write_text(json.dumps({'benchmark': 'export', 'results': results}, indent=2))
+    sys.exit(0 if all(row['matches_database'] for row in results) else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+"""
+Benchmark: pulling detections out of YOLO Results
+Compares the original per-box loop (a tensor index and Python conversion per
+field) with Detections.from_result, alone and followed by to_dicts, on
+synthetic Results holding 10 to 10000 boxes. No model is loaded.
+
+    cd backend && python benchmarks/bench_extraction.py [--repeat 20] [--json out.json]
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import numpy as np  # noqa: E402
+import torch  # noqa: E402
+from ultralytics.engine.results import Results  # noqa: E402
+
+from detections import Detections  # noqa: E402
+
+BOX_COUNTS = [10, 100, 1000, 10000]
+NAMES = {i: f'class_{i}' for i in range(80)}
+SCENE_SIZE = 4096
+
+
+def synthetic_result(count):
+    """Results with random (x_min, y_min, x_max, y_max, conf, cls) boxes"""
+    xy = torch.rand(count, 2) * (SCENE_SIZE - 200)
+    wh = torch.rand(count, 2) * 190 + 10
+    data = torch.cat([
+        xy, xy + wh,
+        torch.rand(count, 1),
+        torch.randint(0, len(NAMES), (count, 1)).float()
+    ], dim=1)
+    orig_img = np.zeros((SCENE_SIZE, SCENE_SIZE, 3), dtype=np.uint8)
+    return Results(orig_img, path='synthetic.jpg', names=NAMES, boxes=data)
+
+
+def extract_per_box(result):
+    """The original process_image_with_yolo loop"""
+    detections = []
+    for box in result.boxes:
+        detections.append({
+            'class_id': int(box.cls[0]),
+            'class_name': NAMES[int(box.cls[0])],
+            'confidence': float(box.conf[0]),
+            'x_min': float(box.xyxy[0][0]),
+            'y_min': float(box.xyxy[0][1]),
+            'x_max': float(box.xyxy[0][2]),
+            'y_max': float(box.xyxy[0][3])
+        })
+    return detections
+
+
+def extract_columnar(result):
+    return Detections.from_result(result, NAMES)
+
+
+def extract_columnar_dicts(result):
+    return Detections.from_result(result, NAMES).to_dicts()
+
+
+METHODS = [
+    ('per_box', extract_per_box),
+    ('columnar', extract_columnar),
+    ('columnar+dicts', extract_columnar_dicts)
+]
+
+
+def run(repeat):
+    results = []
+    for count in BOX_COUNTS:
+        result = synthetic_result(count)
+        # Every method must agree with the original output
+        assert extract_columnar_dicts(result) == extract_per_box(result)
+
+        baseline = None
+        for name, extract in METHODS:
+            # Fewer repeats for the slow loop on large scenes
+            runs = max(3, repeat // 10) if name == 'per_box' and count >= 1000 else repeat
+            timings = []
+            for _ in range(runs):
+                started = time.perf_counter()
+                extract(result)
+                timings.append((time.perf_counter() - started) * 1000)
+
+            median = statistics.median(timings)
+            baseline = baseline or median
+            results.append({
+                'boxes': count,
+                'method': name,
+                'runs': runs,
+                'wall_ms_median': round(median, 4),
+                'wall_ms_min': round(min(timings), 4),
+                'us_per_box': round(median * 1000 / count, 3),
+                'speedup': round(baseline / median, 1)
+            })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    results = run(args.repeat)
+
+    print(f"{'boxes':>6} {'method':>15} {'median ms':>10} {'min ms':>10} {'us/box':>8} {'speedup':>8}")
+    for row in results:
+        print(f"{row['boxes']:>6} {row['method']:>15} {row['wall_ms_median']:>10} {row['wall_ms_min']:>10} "
+              f"{row['us_per_box']:>8} {row['speedup']:>7}x")
+
+    if args.json:
+        Path(args.json).write_text(json.dumps({'benchmark': 'extraction', 'results': results}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
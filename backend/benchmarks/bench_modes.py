@@ -0,0 +1,151 @@
+"""
+Benchmark: cost and recall of the detection modes
+Runs every image of a YOLO-format labelled set through the standard mode and
+the accurate mode (test-time augmentation) at several latency budgets, and
+reports per mode the median latency, the views run per image, and recall and
+precision at IoU 0.5 against the labels (matched per class name). Weights
+default to the app's MODEL_PATH; use a trained model for meaningful recall.
+
+    cd backend && python benchmarks/bench_modes.py [--weights best.pt] [--budgets 250,500,1000,0] [--json out.json]
+"""
+
+import argparse
+import importlib
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+_db_dir = tempfile.mkdtemp(prefix='bench_modes_')
+os.environ['DATABASE_URL'] = f'sqlite:///{_db_dir}/modes.db'
+os.environ.setdefault('INFERENCE_BACKEND', 'pytorch')
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import cv2  # noqa: E402
+import numpy as np  # noqa: E402
+
+DATASET = Path(__file__).resolve().parent.parent.parent / 'satellite_dataset'
+MATCH_IOU = 0.5
+
+
+def load_labels(label_path, width, height, names):
+    """YOLO label rows (class cx cy w h, normalised) as (class names, xyxy boxes in px)"""
+    rows = np.loadtxt(label_path, ndmin=2) if label_path.exists() else np.empty((0, 5))
+    if len(rows) == 0:
+        return [], np.empty((0, 4), dtype=np.float32)
+    cx, cy, w, h = rows[:, 1] * width, rows[:, 2] * height, rows[:, 3] * width, rows[:, 4] * height
+    boxes = np.stack([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2], axis=1).astype(np.float32)
+    return [names[int(c)] for c in rows[:, 0]], boxes
+
+
+def match(detections, truth_names, truth_boxes, box_iou):
+    """
+    Greedy highest-confidence-first matching at MATCH_IOU within each class
+    Returns: true positives
+    """
+    if not len(detections) or not truth_names:
+        return 0
+    predicted_names = [detections.names.get(int(c), str(int(c))) for c in detections.cls]
+    iou = box_iou(detections.xyxy, truth_boxes)
+    iou[np.array(predicted_names)[:, None] != np.array(truth_names)[None, :]] = 0
+    taken = np.zeros(len(truth_names), dtype=bool)
+    matched = 0
+    for index in np.argsort(-detections.conf, kind='stable'):
+        candidates = np.where(taken, 0, iou[index])
+        best = int(np.argmax(candidates))
+        if candidates[best] >= MATCH_IOU:
+            taken[best] = True
+            matched += 1
+    return matched
+
+
+def run(backend, samples, modes, conf):
+    from boxes import box_iou
+
+    # One untimed pass warms the model and the per-image cost estimate budgets use
+    for image, _, _ in samples:
+        backend.process_image_with_yolo(image, conf=conf)
+
+    results = []
+    for label, mode, budget_ms in modes:
+        timings, views, true_positives, predicted, expected = [], [], 0, 0, 0
+        for image, truth_names, truth_boxes in samples:
+            height, width = image.shape[:2]
+            if mode == 'accurate':
+                max_views = backend.tta_cost.max_views(budget_ms)
+                views.append(len(backend.plan_views(width, height, backend.TILE_SIZE, backend.TILE_OVERLAP, max_views)))
+            else:
+                views.append(1)
+            started = time.perf_counter()
+            detections, success, message = backend.process_image_with_yolo(image, conf=conf, mode=mode,
+                                                                           budget_ms=budget_ms)
+            timings.append((time.perf_counter() - started) * 1000)
+            assert success, message
+            true_positives += match(detections, truth_names, truth_boxes, box_iou)
+            predicted += len(detections)
+            expected += len(truth_names)
+        results.append({
+            'mode': label,
+            'images': len(samples),
+            'median_ms': round(statistics.median(timings), 1),
+            'views_per_image': round(statistics.mean(views), 1),
+            'recall': round(true_positives / expected, 3) if expected else None,
+            'precision': round(true_positives / predicted, 3) if predicted else None,
+            'detections': predicted
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--weights', help='model weights (default: the app\'s MODEL_PATH)')
+    parser.add_argument('--images', default=str(DATASET / 'images' / 'train'))
+    parser.add_argument('--labels', default=str(DATASET / 'labels' / 'train'))
+    parser.add_argument('--names', default='truck,warehouse', help='dataset class names, in label id order')
+    parser.add_argument('--budgets', default='250,500,1000,0', help='accurate-mode budgets in ms (0: no limit)')
+    parser.add_argument('--conf', type=float, help='confidence threshold (default: CONFIDENCE_THRESHOLD)')
+    parser.add_argument('--limit', type=int, help='use only the first N images')
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    if args.weights:
+        os.environ['MODEL_PATH'] = str(Path(args.weights).resolve())
+    backend = importlib.import_module('app')
+    backend.logger.setLevel('WARNING')
+    conf = backend.CONFIDENCE_THRESHOLD if args.conf is None else args.conf
+
+    names = args.names.split(',')
+    image_paths = sorted(p for p in Path(args.images).iterdir()
+                         if p.suffix.lower().lstrip('.') in backend.ALLOWED_EXTENSIONS)[:args.limit]
+    samples = []
+    for path in image_paths:
+        image = cv2.imread(str(path))
+        samples.append((image, *load_labels(Path(args.labels) / f'{path.stem}.txt',
+                                             image.shape[1], image.shape[0], names)))
+
+    modes = [('standard', 'standard', None)] + [
+        (f"accurate {budget}ms" if budget else 'accurate unlimited', 'accurate', budget)
+        for budget in (int(b) for b in args.budgets.split(','))
+    ]
+    try:
+        results = run(backend, samples, modes, conf)
+    finally:
+        shutil.rmtree(_db_dir, ignore_errors=True)
+
+    print(f"{len(samples)} images, conf {conf}, weights {backend.MODEL_FILE}")
+    print(f"{'mode':<20} {'median':>9} {'views':>6} {'recall':>7} {'precision':>10}")
+    for row in results:
+        recall = '-' if row['recall'] is None else f"{row['recall']:.3f}"
+        precision = '-' if row['precision'] is None else f"{row['precision']:.3f}"
+        print(f"{row['mode']:<20} {row['median_ms']:>7}ms {row['views_per_image']:>6} {recall:>7} {precision:>10}")
+
+    if args.json:
+        Path(args.json).write_text(json.dumps({'benchmark': 'modes', 'conf': conf, 'results': results}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
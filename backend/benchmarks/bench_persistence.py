@@ -0,0 +1,136 @@
+"""
+Benchmark: persisting one image's detections and alerts
+Compares the old per-row commit loop with the bulk single-transaction path
+(persist_detections) for images with 0, 10, 100 and 1000 detections, on a
+throwaway file-backed SQLite database so every commit pays a real fsync.
+
+    cd backend && python benchmarks/bench_persistence.py [--repeat 5] [--json out.json]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+_db_dir = tempfile.mkdtemp(prefix='bench_persistence_')
+os.environ['DATABASE_URL'] = f'sqlite:///{_db_dir}/bench.db'
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import numpy as np  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+import app as backend  # noqa: E402
+from detections import Detections  # noqa: E402
+
+DETECTION_COUNTS = [0, 10, 100, 1000]
+
+
+def synthetic_detections(count):
+    """Random truck/warehouse boxes shaped like process_image_with_yolo output"""
+    xy = np.random.uniform(0, 4000, size=(count, 2))
+    wh = np.random.uniform(10, 200, size=(count, 2))
+    return Detections(
+        np.hstack([xy, xy + wh]),
+        np.random.uniform(0.5, 1.0, size=count),
+        np.random.randint(0, 2, size=count),
+        {0: 'truck', 1: 'warehouse'}
+    )
+
+
+def persist_per_row(image_record, detections):
+    """The original upload loop: one commit per detection, then one per alert"""
+    stored_detections, alerts = [], []
+    for detection in detections.to_dicts():
+        detection_record = backend.Detection(
+            image_id=image_record.id,
+            class_name=detection['class_name'],
+            confidence=detection['confidence'],
+            x_min=detection['x_min'],
+            y_min=detection['y_min'],
+            x_max=detection['x_max'],
+            y_max=detection['y_max']
+        )
+        backend.db.session.add(detection_record)
+        backend.db.session.commit()
+
+        alert = backend.create_alert_for_detection(detection_record.id, detection, image_record.original_filename)
+        if alert:
+            alerts.append(alert.to_dict())
+        stored_detections.append(detection_record.to_dict())
+
+    image_record.detection_processed = True
+    backend.db.session.commit()
+    return stored_detections, alerts
+
+
+def new_image_record(index):
+    image_record = backend.DetectionImage(
+        filename=f'bench_{index}_{time.time_ns()}.jpg',
+        original_filename=f'bench_{index}.jpg',
+        file_size=0,
+        file_path='/dev/null'
+    )
+    backend.db.session.add(image_record)
+    backend.db.session.commit()
+    return image_record
+
+
+def run(repeat):
+    counters = {'commits': 0, 'statements': 0}
+    engine = backend.db.engine
+    event.listen(engine, 'commit', lambda conn: counters.__setitem__('commits', counters['commits'] + 1))
+    event.listen(engine, 'before_cursor_execute',
+                 lambda *args: counters.__setitem__('statements', counters['statements'] + 1))
+
+    results = []
+    for count in DETECTION_COUNTS:
+        for name, persist in (('per_row', persist_per_row), ('bulk', backend.persist_detections)):
+            timings, commits, statements = [], [], []
+            for i in range(repeat):
+                detections = synthetic_detections(count)
+                image_record = new_image_record(i)
+                counters['commits'] = counters['statements'] = 0
+                started = time.perf_counter()
+                persist(image_record, detections)
+                timings.append((time.perf_counter() - started) * 1000)
+                commits.append(counters['commits'])
+                statements.append(counters['statements'])
+
+            results.append({
+                'detections': count,
+                'method': name,
+                'commits': statistics.median(commits),
+                'statements': statistics.median(statements),
+                'wall_ms_median': round(statistics.median(timings), 3),
+                'wall_ms_min': round(min(timings), 3)
+            })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    # Per-alert INFO logs would dominate the per-row timings
+    backend.logger.setLevel('WARNING')
+    with backend.app.app_context():
+        backend.db.create_all()
+        results = run(args.repeat)
+
+    print(f"{'detections':>10} {'method':>8} {'commits':>8} {'statements':>11} {'median ms':>10} {'min ms':>10}")
+    for row in results:
+        print(f"{row['detections']:>10} {row['method']:>8} {row['commits']:>8} {row['statements']:>11} "
+              f"{row['wall_ms_median']:>10} {row['wall_ms_min']:>10}")
+
+    if args.json:
+        Path(args.json).write_text(json.dumps({'benchmark': 'persistence', 'results': results}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+"""
+Benchmark: region and nearest-neighbour search over detections
+Seeds a throwaway SQLite database (R*Tree index kept by triggers) with
+random boxes over 10000x10000 px scenes, then times bbox searches through the
+spatial index against the same filters as a full scan, and k-nearest-neighbour
+searches against loading every box and ranking them in NumPy. Results of each
+pair are checked to be identical.
+
+    cd backend && python benchmarks/bench_spatial.py [--sizes 100000,1000000] [--json out.json]
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+_db_dir = tempfile.mkdtemp(prefix='bench_spatial_')
+os.environ['DATABASE_URL'] = f'sqlite:///{_db_dir}/spatial.db'
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import numpy as np  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+
+import app as backend  # noqa: E402
+
+SCENE_SIZE = 10000
+WINDOW = 500  # bbox query side, 0.25% of the scene
+K = 10
+CLASSES = ['truck', 'warehouse']
+
+
+def seed(count, rng, chunk=100000):
+    """Insert count random detections across 1000 images (the triggers fill the R*Tree)"""
+    db = backend.db
+    if not db.session.query(backend.DetectionImage.id).first():
+        db.session.execute(insert(backend.DetectionImage), [{
+            'filename': f'seed_{i}.jpg', 'original_filename': f'seed_{i}.jpg',
+            'file_size': 0, 'file_path': '/dev/null', 'detection_processed': True
+        } for i in range(1000)])
+    for offset in range(0, count, chunk):
+        size = min(chunk, count - offset)
+        xy = rng.uniform(0, SCENE_SIZE - 100, size=(size, 2)).tolist()
+        wh = rng.uniform(10, 100, size=(size, 2)).tolist()
+        confidences = rng.uniform(0.5, 1.0, size=size).tolist()
+        class_ids = rng.integers(0, len(CLASSES), size=size).tolist()
+        db.session.execute(insert(backend.Detection), [{
+            'image_id': 1 + (offset + i) % 1000,
+            'class_name': CLASSES[class_ids[i]],
+            'confidence': confidences[i],
+            'x_min': xy[i][0], 'y_min': xy[i][1],
+            'x_max': xy[i][0] + wh[i][0], 'y_max': xy[i][1] + wh[i][1]
+        } for i in range(size)])
+    db.session.commit()
+
+
+def timed(function, repeat):
+    function()
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), result
+
+
+def brute_force_nearest(x, y, k):
+    """Load every truck box and rank them all (what a client had to do before)"""
+    rows = backend.db.session.query(
+        backend.Detection.id, backend.Detection.x_min, backend.Detection.y_min,
+        backend.Detection.x_max, backend.Detection.y_max
+    ).filter(backend.Detection.class_name == 'truck').all()
+    distances = backend.box_distances(rows, x, y)
+    order = np.lexsort(([row.id for row in rows], distances))[:k]
+    return [rows[i].id for i in order]
+
+
+def run(sizes, repeat):
+    rng = np.random.default_rng(0)
+    results = []
+    seeded = 0
+    for size in sizes:
+        started = time.perf_counter()
+        seed(size - seeded, rng)
+        seeded = size
+        print(f"  seeded {size} detections in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+        x, y = rng.uniform(WINDOW, SCENE_SIZE - WINDOW, size=2).tolist()
+        bbox = (x, y, x + WINDOW, y + WINDOW)
+        query = backend.Detection.query.filter(backend.Detection.class_name == 'truck')
+
+        indexed_ms, indexed = timed(
+            lambda: [d.id for d in backend.intersecting(query, bbox, 'rtree').order_by(backend.Detection.id)], repeat)
+        scan_ms, scanned = timed(
+            lambda: [d.id for d in backend.intersecting(query, bbox, 'none').order_by(backend.Detection.id)], repeat)
+        assert indexed == scanned, 'R*Tree and full-scan results differ'
+
+        knn_ms, nearest = timed(
+            lambda: [d.id for d, _ in backend.nearest_detections(query, x, y, K, 'rtree')], repeat)
+        brute_ms, expected = timed(lambda: brute_force_nearest(x, y, K), max(1, repeat // 5))
+        assert nearest == expected, 'kNN results differ from brute force'
+
+        results.append({
+            'detections': size,
+            'bbox_matches': len(indexed),
+            'bbox_rtree_ms': round(indexed_ms, 2),
+            'bbox_full_scan_ms': round(scan_ms, 2),
+            'knn_rtree_ms': round(knn_ms, 2),
+            'knn_brute_force_ms': round(brute_ms, 2)
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', default='100000,1000000', help='comma-separated detection counts')
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    backend.logger.setLevel('WARNING')
+    backend.init_db()
+    try:
+        with backend.app.app_context():
+            assert backend.spatial_index_kind() == 'rtree', 'SQLite was built without R*Tree support'
+            results = run(sorted(int(size) for size in args.sizes.split(',')), args.repeat)
+    finally:
+        shutil.rmtree(_db_dir, ignore_errors=True)
+
+    print(f"{'detections':>11} {'matches':>8} {'bbox rtree':>11} {'bbox scan':>10} {'knn rtree':>10} {'knn brute':>10}")
+    for row in results:
+        print(f"{row['detections']:>11} {row['bbox_matches']:>8} {row['bbox_rtree_ms']:>9}ms "
+              f"{row['bbox_full_scan_ms']:>8}ms {row['knn_rtree_ms']:>8}ms {row['knn_brute_force_ms']:>8}ms")
+
+    if args.json:
+        Path(args.json).write_text(json.dumps({'benchmark': 'spatial', 'results': results}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
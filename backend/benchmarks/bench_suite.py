@@ -0,0 +1,316 @@
+"""
+Benchmark suite: inference, uploads and database-heavy endpoints
+Runs offline: a tiny randomly initialised YOLOv8n (built from its bundled
+config, so nothing is downloaded) on synthetic images, and a throwaway SQLite
+database. Three groups, each selectable with --only:
+
+  inference  process_image_with_yolo latency per scene resolution, and
+             forward-pass latency/throughput per batch size
+  upload     end-to-end POST /api/upload per scene resolution
+  endpoints  /api/statistics, /api/images and /api/alerts after seeding
+             10^3 to 10^6 detections (each with its alert)
+
+Results go to --json with the commit and environment they were measured on;
+--compare prints each metric's change against an earlier file.
+
+    cd backend && python benchmarks/bench_suite.py [--quick] [--json out.json] [--compare baseline.json]
+"""
+
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+_work_dir = tempfile.mkdtemp(prefix='bench_suite_')
+os.environ['DATABASE_URL'] = f'sqlite:///{_work_dir}/bench.db'
+os.environ['MODEL_PATH'] = f'{_work_dir}/tiny.pt'
+os.environ.setdefault('INFERENCE_BACKEND', 'pytorch')
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import cv2  # noqa: E402
+import numpy as np  # noqa: E402
+from sqlalchemy import func, insert, select  # noqa: E402
+
+RESOLUTIONS = [(640, 480), (1280, 720), (1920, 1080), (4000, 3000)]
+BATCH_SIZES = [1, 2, 4, 8, 16]
+ROW_COUNTS = [10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6]
+DETECTIONS_PER_IMAGE = 20
+CLASSES = ['truck', 'warehouse']
+
+# (label, url, STATISTICS_SUMMARY); '{last_page}' is filled in after seeding
+ENDPOINTS = [
+    ('statistics', '/api/statistics', False),
+    ('statistics (summary)', '/api/statistics', True),
+    ('images first page', '/api/images?per_page=12', False),
+    ('images last page', '/api/images?per_page=12&page={last_page}', False),
+    ('alerts first page', '/api/alerts?per_page=50', False),
+    ('alerts high severity', '/api/alerts?per_page=50&severity=high', False),
+    ('alerts cursor', '/api/alerts?per_page=50&cursor=', False)
+]
+
+
+def build_tiny_model(path):
+    """Save a randomly initialised YOLOv8n; its config ships with ultralytics"""
+    from ultralytics import YOLO
+
+    YOLO('yolov8n.yaml').save(path)
+
+
+def synthetic_image(width, height, rng):
+    """Blurred noise with a few bright rectangles, so decoders and NMS do real work"""
+    image = cv2.GaussianBlur(rng.integers(0, 256, size=(height, width, 3), dtype=np.uint8), (5, 5), 0)
+    for _ in range(10):
+        x, y = int(rng.integers(0, width - 40)), int(rng.integers(0, height - 40))
+        image[y:y + 40, x:x + 60] = 255
+    return image
+
+
+def summarize(timings_ms):
+    timings_ms = sorted(timings_ms)
+    return {
+        'median_ms': round(statistics.median(timings_ms), 2),
+        'p90_ms': round(timings_ms[min(len(timings_ms) - 1, int(len(timings_ms) * 0.9))], 2),
+        'min_ms': round(timings_ms[0], 2),
+        'runs': len(timings_ms)
+    }
+
+
+def timed(function, repeat):
+    """Milliseconds per call over repeat calls, after one untimed warm-up call"""
+    function()
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def bench_inference(backend, rng, repeat):
+    results = []
+    for width, height in RESOLUTIONS:
+        path = Path(_work_dir) / f'scene_{width}x{height}.png'
+        cv2.imwrite(str(path), synthetic_image(width, height, rng))
+        timings = timed(lambda: backend.process_image_with_yolo(path), repeat)
+        results.append({'name': 'process_image_with_yolo', 'resolution': f'{width}x{height}',
+                        'tiled': backend.should_tile_image(path), **summarize(timings)})
+
+    tile = synthetic_image(backend.TILE_SIZE, backend.TILE_SIZE, rng)
+    for batch_size in BATCH_SIZES:
+        sources = [tile] * batch_size
+        timings = timed(lambda: backend.predict_batch(sources, [backend.CONFIDENCE_THRESHOLD] * batch_size), repeat)
+        summary = summarize(timings)
+        results.append({'name': 'predict_batch', 'resolution': f'{backend.TILE_SIZE}x{backend.TILE_SIZE}',
+                        'batch_size': batch_size, **summary,
+                        'images_per_second': round(batch_size * 1000 / summary['median_ms'], 2)})
+    return results
+
+
+def bench_upload(backend, rng, repeat):
+    client = backend.app.test_client()
+    results = []
+    for width, height in RESOLUTIONS:
+        # A fresh image per request, so the duplicate-upload cache never answers
+        payloads = [cv2.imencode('.jpg', synthetic_image(width, height, rng))[1].tobytes()
+                    for _ in range(repeat + 1)]
+
+        def upload():
+            response = client.post('/api/upload', data={'image': (io.BytesIO(payloads.pop()), 'bench.jpg')},
+                                   content_type='multipart/form-data')
+            assert response.status_code == 201, response.get_json()
+
+        timings = timed(upload, repeat)
+        backend.background_writer.flush()
+        summary = summarize(timings)
+        results.append({'name': 'upload', 'resolution': f'{width}x{height}', **summary,
+                        'requests_per_second': round(1000 / summary['median_ms'], 2)})
+    return results
+
+
+def seed(backend, detections, rng):
+    """Bulk insert processed images, detections and their alerts spread over 30 days"""
+    db = backend.db
+    images = max(1, detections // DETECTIONS_PER_IMAGE)
+    now = datetime.utcnow()
+    start_image = db.session.scalar(select(func.coalesce(func.max(backend.DetectionImage.id), 0)))
+    db.session.execute(insert(backend.DetectionImage), [{
+        'filename': f'seed_{start_image + i}.jpg',
+        'original_filename': f'seed_{start_image + i}.jpg',
+        'upload_timestamp': now - timedelta(minutes=int(i % 43200)),
+        'file_size': 0,
+        'file_path': '/dev/null',
+        'detection_processed': True
+    } for i in range(images)])
+    image_ids = db.session.scalars(
+        select(backend.DetectionImage.id).where(backend.DetectionImage.id > start_image)
+    ).all()
+
+    chunk = 50000
+    for offset in range(0, detections, chunk):
+        count = min(chunk, detections - offset)
+        start_detection = db.session.scalar(select(func.coalesce(func.max(backend.Detection.id), 0)))
+        class_ids = rng.integers(0, len(CLASSES), size=count)
+        confidences = rng.uniform(0.5, 1.0, size=count).tolist()
+        xy = rng.uniform(0, 4000, size=(count, 2)).tolist()
+        minutes = rng.integers(0, 43200, size=count).tolist()
+        rows = [{
+            'image_id': image_ids[(offset + i) % len(image_ids)],
+            'class_name': CLASSES[class_ids[i]],
+            'confidence': confidences[i],
+            'x_min': xy[i][0], 'y_min': xy[i][1], 'x_max': xy[i][0] + 40, 'y_max': xy[i][1] + 40,
+            'detection_timestamp': now - timedelta(minutes=minutes[i])
+        } for i in range(count)]
+        db.session.execute(insert(backend.Detection), rows)
+        detection_ids = db.session.scalars(
+            select(backend.Detection.id).where(backend.Detection.id > start_detection).order_by(backend.Detection.id)
+        ).all()
+        db.session.execute(insert(backend.Alert), [{
+            'detection_id': detection_id,
+            'alert_timestamp': row['detection_timestamp'],
+            'acknowledged': random.random() < 0.3,
+            **backend.build_alert_fields(row['class_name'], row['confidence'], 'seed.jpg')
+        } for detection_id, row in zip(detection_ids, rows)])
+    db.session.commit()
+
+
+def bench_endpoints(backend, rng, repeat, row_counts):
+    client = backend.app.test_client()
+    results = []
+    seeded = 0
+    for rows in row_counts:
+        started = time.perf_counter()
+        with backend.app.app_context():
+            seed(backend, rows - seeded, rng)
+            backend.rebuild_statistics_summary()
+            images = backend.db.session.scalar(select(func.count(backend.DetectionImage.id)))
+        seeded = rows
+        print(f"  seeded {rows} detections in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+        last_page = max(1, -(-images // 12))
+        for label, url, summary_counters in ENDPOINTS:
+            url = url.format(last_page=last_page)
+            backend.STATISTICS_SUMMARY = summary_counters
+
+            def get():
+                response = client.get(url)
+                assert response.status_code == 200, response.get_json()
+
+            timings = timed(get, repeat)
+            results.append({'name': label, 'url': url, 'detections': rows, **summarize(timings)})
+        backend.STATISTICS_SUMMARY = False
+    return results
+
+
+def environment(backend):
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                                cwd=Path(__file__).parent, check=True).stdout.strip()
+    except Exception:
+        commit = None
+    import torch
+
+    return {
+        'commit': commit,
+        'timestamp': datetime.utcnow().isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'torch': torch.__version__,
+        'torch_threads': torch.get_num_threads(),
+        'inference_backend': backend.MODEL_BACKEND
+    }
+
+
+def result_key(result):
+    """Identity of a measurement across runs"""
+    return tuple((key, result[key]) for key in ('name', 'resolution', 'batch_size', 'url', 'detections')
+                 if key in result)
+
+
+def compare(current, baseline_path):
+    """Print the median change of every measurement also in the baseline"""
+    baseline = json.loads(Path(baseline_path).read_text())
+    print(f"\nChange vs {baseline_path} ({(baseline['environment'].get('commit') or '?')[:10]}):")
+    for group, results in current['results'].items():
+        previous = {result_key(result): result for result in baseline['results'].get(group, [])}
+        for result in results:
+            before = previous.get(result_key(result))
+            if before is None:
+                continue
+            change = (result['median_ms'] - before['median_ms']) / before['median_ms'] * 100
+            label = ' '.join(str(value) for _, value in result_key(result))
+            print(f"  {group:<10} {label:<66} {before['median_ms']:>9.2f} -> {result['median_ms']:>9.2f} ms "
+                  f"({change:+.1f}%)")
+
+
+def print_table(group, results):
+    print(f"\n{group}")
+    for result in results:
+        label = ' '.join(str(value) for _, value in result_key(result))
+        extra = ''.join(f"  {key} {result[key]}" for key in ('images_per_second', 'requests_per_second')
+                        if key in result)
+        print(f"  {label:<66} median {result['median_ms']:>9.2f} ms  p90 {result['p90_ms']:>9.2f} ms{extra}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--only', default='inference,upload,endpoints',
+                        help='comma-separated groups to run (default: all)')
+    parser.add_argument('--repeat', type=int, default=10, help='timed runs per measurement')
+    parser.add_argument('--rows', default=','.join(str(rows) for rows in ROW_COUNTS),
+                        help='detection counts to seed for the endpoint benchmarks')
+    parser.add_argument('--quick', action='store_true', help='3 runs per measurement, at most 10^5 rows')
+    parser.add_argument('--json', help='write results to this file')
+    parser.add_argument('--compare', help='earlier --json output to compare against')
+    args = parser.parse_args()
+
+    groups = [group.strip() for group in args.only.split(',') if group.strip()]
+    repeat = 3 if args.quick else args.repeat
+    row_counts = sorted(int(rows) for rows in args.rows.split(','))
+    if args.quick:
+        row_counts = [rows for rows in row_counts if rows <= 10 ** 5]
+
+    build_tiny_model(os.environ['MODEL_PATH'])
+    import app as backend
+
+    backend.logger.setLevel('WARNING')
+    backend.init_db()
+    backend.UPLOAD_FOLDER = Path(_work_dir) / 'uploads'
+    backend.RESULTS_FOLDER = Path(_work_dir) / 'results'
+    backend.UPLOAD_FOLDER.mkdir(parents=True)
+    backend.RESULTS_FOLDER.mkdir(parents=True)
+    rng = np.random.default_rng(0)
+    random.seed(0)
+
+    output = {'benchmark': 'suite', 'environment': environment(backend), 'results': {}}
+    try:
+        with backend.app.app_context():
+            if 'inference' in groups:
+                output['results']['inference'] = bench_inference(backend, rng, repeat)
+        if 'upload' in groups:
+            output['results']['upload'] = bench_upload(backend, rng, repeat)
+        if 'endpoints' in groups:
+            output['results']['endpoints'] = bench_endpoints(backend, rng, repeat, row_counts)
+    finally:
+        shutil.rmtree(_work_dir, ignore_errors=True)
+
+    for group, results in output['results'].items():
+        print_table(group, results)
+    if args.json:
+        Path(args.json).write_text(json.dumps(output, indent=2))
+    if args.compare:
+        compare(output, args.compare)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+"""
+Benchmark: peak memory and latency of a synchronous /api/upload
+Posts random JPEGs of several sizes through the Flask test client, once via
+the disk path (save, then YOLO decodes the file) and once via the in-memory
+path (one cv2.imdecode for inference, original written in the background).
+Peak memory is what tracemalloc sees during the request: Python and
+NumPy/OpenCV buffers, not torch's internal allocations, which are the same
+for both paths.
+
+    cd backend && python benchmarks/bench_upload_memory.py [--repeat 3] [--json out.json]
+"""
+
+import argparse
+import io
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+_db_dir = tempfile.mkdtemp(prefix='bench_upload_memory_')
+os.environ['DATABASE_URL'] = f'sqlite:///{_db_dir}/bench.db'
+os.environ['TILED_INFERENCE'] = 'never'
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import cv2  # noqa: E402
+import numpy as np  # noqa: E402
+
+import app as backend  # noqa: E402
+
+SIZES = [(640, 480), (1920, 1080), (4000, 3000)]
+
+
+def random_jpeg(width, height, rng):
+    """A noisy JPEG (noise keeps the encoded size realistic for satellite imagery)"""
+    image = rng.integers(0, 256, size=(height, width, 3), dtype=np.uint8)
+    image = cv2.GaussianBlur(image, (5, 5), 0)
+    return cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, 90])[1].tobytes()
+
+
+def timed_upload(client, data):
+    tracemalloc.start()
+    started = time.perf_counter()
+    response = client.post('/api/upload', data={'image': (io.BytesIO(data), 'bench.jpg')},
+                           content_type='multipart/form-data')
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert response.status_code == 201, response.get_json()
+    return elapsed_ms, peak / (1024 * 1024)
+
+
+def run(repeat):
+    client = backend.app.test_client()
+    rng = np.random.default_rng(0)
+    memory_limit = backend.UPLOAD_MEMORY_LIMIT
+
+    # First inference pays one-off setup; keep it out of the numbers
+    timed_upload(client, random_jpeg(320, 240, rng))
+
+    results = []
+    for width, height in SIZES:
+        for path, limit in (('disk', 0), ('in_memory', memory_limit)):
+            backend.UPLOAD_MEMORY_LIMIT = limit
+            timings, peaks = [], []
+            for _ in range(repeat):
+                data = random_jpeg(width, height, rng)
+                elapsed_ms, peak_mb = timed_upload(client, data)
+                timings.append(elapsed_ms)
+                peaks.append(peak_mb)
+            backend.background_writer.flush()
+            results.append({
+                'size': f'{width}x{height}',
+                'path': path,
+                'encoded_mb': round(len(data) / (1024 * 1024), 2),
+                'wall_ms_median': round(statistics.median(timings), 1),
+                'peak_traced_mb_max': round(max(peaks), 1)
+            })
+    backend.UPLOAD_MEMORY_LIMIT = memory_limit
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    backend.logger.setLevel('WARNING')
+    with backend.app.app_context():
+        backend.db.create_all()
+    backend.model_loader.load(warmup=False)
+
+    # Keep this run's uploads and results out of the real folders
+    backend.UPLOAD_FOLDER = Path(_db_dir) / 'uploads'
+    backend.RESULTS_FOLDER = Path(_db_dir) / 'results'
+    backend.UPLOAD_FOLDER.mkdir(parents=True)
+    backend.RESULTS_FOLDER.mkdir(parents=True)
+    try:
+        results = run(args.repeat)
+    finally:
+        shutil.rmtree(_db_dir, ignore_errors=True)
+
+    print(f"{'size':>10} {'path':>10} {'encoded MB':>11} {'median ms':>10} {'peak MB':>8}")
+    for row in results:
+        print(f"{row['size']:>10} {row['path']:>10} {row['encoded_mb']:>11} {row['wall_ms_median']:>10} "
+              f"{row['peak_traced_mb_max']:>8}")
+
+    if args.json:
+        Path(args.json).write_text(json.dumps({'benchmark': 'upload_memory', 'results': results}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
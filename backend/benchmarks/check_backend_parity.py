@@ -0,0 +1,140 @@
+"""
+Check: ONNX Runtime outputs match the PyTorch model
+Runs the same images through the eager PyTorch model and its ONNX export and
+matches boxes one-to-one (same class, highest IoU). Every PyTorch box must
+have an ONNX match within the IoU and confidence tolerances; the quantized
+export is checked with looser defaults. Exits non-zero on a mismatch.
+
+    cd backend && python benchmarks/check_backend_parity.py [--quantized] [--images DIR] [--json out.json]
+
+Export first with `flask --app app export-model` (add --quantize for INT8).
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import numpy as np  # noqa: E402
+
+from boxes import box_iou  # noqa: E402
+from detections import Detections  # noqa: E402
+from inference_backends import OnnxRuntimeBackend, UltralyticsBackend, onnx_export_path  # noqa: E402
+
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+DEFAULT_WEIGHTS = BASE_DIR / 'runs/detect/train/weights/best.pt'
+
+# (min IoU, max confidence difference, min fraction of boxes matched)
+TOLERANCES = {
+    'fp32': (0.95, 0.01, 0.98),
+    'int8': (0.7, 0.1, 0.8)
+}
+
+
+def load_images(images_dir, count, seed=0):
+    """Images from a directory, or random scenes of assorted sizes"""
+    if images_dir:
+        return sorted(str(p) for p in Path(images_dir).iterdir()
+                      if p.suffix.lower() in ('.jpg', '.jpeg', '.png', '.tif', '.tiff'))[:count]
+    rng = np.random.default_rng(seed)
+    shapes = [(480, 640), (640, 640), (720, 1280), (512, 384)]
+    return [rng.integers(0, 256, size=(*shapes[i % len(shapes)], 3), dtype=np.uint8) for i in range(count)]
+
+
+def match_boxes(reference, candidate, min_iou, max_conf_diff):
+    """
+    Greedily pair reference boxes (highest confidence first) with candidate boxes
+    Returns: (matched count, max coordinate difference in px over matched pairs)
+    """
+    if len(reference) == 0 or len(candidate) == 0:
+        return 0, 0.0
+    ious = box_iou(reference.xyxy, candidate.xyxy)
+    ious[reference.cls[:, None] != candidate.cls[None, :]] = 0
+    used = np.zeros(len(candidate), dtype=bool)
+    matched, max_diff = 0, 0.0
+    for i in np.argsort(-reference.conf):
+        scores = np.where(used, 0, ious[i])
+        j = int(np.argmax(scores))
+        if scores[j] < min_iou or abs(reference.conf[i] - candidate.conf[j]) > max_conf_diff:
+            continue
+        used[j] = True
+        matched += 1
+        max_diff = max(max_diff, float(np.abs(reference.xyxy[i] - candidate.xyxy[j]).max()))
+    return matched, max_diff
+
+
+def timed_predict(backend, image, conf):
+    started = time.perf_counter()
+    result = backend.predict([image], conf)[0]
+    return Detections.from_result(result, backend.names), (time.perf_counter() - started) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--weights', default=str(DEFAULT_WEIGHTS if DEFAULT_WEIGHTS.exists() else BASE_DIR / 'yolov8n.pt'))
+    parser.add_argument('--quantized', action='store_true', help='check the dynamic-INT8 export')
+    parser.add_argument('--images', help='directory of images (default: synthetic scenes)')
+    parser.add_argument('--count', type=int, default=8)
+    parser.add_argument('--conf', type=float, default=0.25)
+    parser.add_argument('--threads', type=int, default=0, help='ONNX Runtime intra-op threads')
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    min_iou, max_conf_diff, min_match = TOLERANCES['int8' if args.quantized else 'fp32']
+    onnx_path = onnx_export_path(args.weights, args.quantized)
+    if not onnx_path.exists():
+        print(f'No ONNX export at {onnx_path}')
+        sys.exit(1)
+
+    reference_backend = UltralyticsBackend(args.weights)
+    onnx_backend = OnnxRuntimeBackend(onnx_path, intra_op_threads=args.threads)
+
+    rows, torch_ms, onnx_ms = [], [], []
+    for index, image in enumerate(load_images(args.images, args.count)):
+        reference, reference_ms = timed_predict(reference_backend, image, args.conf)
+        candidate, candidate_ms = timed_predict(onnx_backend, image, args.conf)
+        matched, max_diff = match_boxes(reference, candidate, min_iou, max_conf_diff)
+        torch_ms.append(reference_ms)
+        onnx_ms.append(candidate_ms)
+        rows.append({
+            'image': image if isinstance(image, str) else f'synthetic_{index}',
+            'pytorch_boxes': len(reference),
+            'onnx_boxes': len(candidate),
+            'matched': matched,
+            'match_rate': round(matched / len(reference), 4) if len(reference) else 1.0,
+            'max_coord_diff_px': round(max_diff, 3)
+        })
+
+    print(f"{'image':<16} {'pytorch':>8} {'onnx':>8} {'matched':>8} {'max px diff':>12}")
+    for row in rows:
+        print(f"{Path(row['image']).name:<16} {row['pytorch_boxes']:>8} {row['onnx_boxes']:>8} "
+              f"{row['matched']:>8} {row['max_coord_diff_px']:>12}")
+    print(f"median ms/image: pytorch {statistics.median(torch_ms):.1f}, onnxruntime {statistics.median(onnx_ms):.1f}")
+
+    total = sum(row['pytorch_boxes'] for row in rows)
+    match_rate = sum(row['matched'] for row in rows) / total if total else 1.0
+    passed = match_rate >= min_match
+    print(f"{'PASS' if passed else 'FAIL'}: {match_rate:.2%} of {total} boxes matched "
+          f"(need {min_match:.0%} at IoU >= {min_iou}, |conf diff| <= {max_conf_diff})")
+
+    if args.json:
+        Path(args.json).write_text(json.dumps({
+            'check': 'backend_parity',
+            'onnx_model': str(onnx_path),
+            'match_rate': round(match_rate, 4),
+            'passed': passed,
+            'pytorch_ms_median': round(statistics.median(torch_ms), 3),
+            'onnxruntime_ms_median': round(statistics.median(onnx_ms), 3),
+            'results': rows
+        }, indent=2))
+
+    if not passed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+"""
+Stress test: concurrent writers on one database
+Starts N worker processes (like N gunicorn workers) against the same
+database. Each one mixes storing detections and alerts for new images,
+acknowledging random alerts through the API, and reading the alert feed and
+statistics, for a fixed time. Any "database is locked" (or other) error fails
+the run. --legacy repeats it with the settings the app used to run with
+(rollback journal, full sync, the driver's 5 s busy timeout) for comparison.
+
+    cd backend && python benchmarks/stress_writers.py [--workers 8] [--seconds 20] [--legacy] [--json out.json]
+
+Point DATABASE_URL at an empty PostgreSQL database to stress that instead
+of a throwaway SQLite file (--legacy only applies to SQLite).
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+CLASSES = ['truck', 'warehouse']
+SEED_IMAGES = 50
+
+TUNED = {}
+LEGACY = {'SQLITE_JOURNAL_MODE': 'delete', 'SQLITE_SYNCHRONOUS': 'full', 'SQLITE_BUSY_TIMEOUT_MS': '5000'}
+
+
+def load_backend(settings):
+    os.environ.update(settings)
+    sys.path.insert(0, str(BACKEND_DIR))
+    import app as backend
+    backend.logger.setLevel('CRITICAL')
+    return backend
+
+
+def store_image(backend, rng):
+    """What an upload writes: the image row, then its detections, alerts and counters"""
+    from detections import Detections
+
+    image_record = backend.DetectionImage(
+        filename=f'stress_{os.getpid()}_{time.perf_counter_ns()}.jpg', original_filename='stress.jpg',
+        file_size=0, file_path='/dev/null', content_hash=None
+    )
+    backend.db.session.add(image_record)
+    backend.db.session.commit()
+    count = rng.randint(1, 10)
+    xy = [(rng.uniform(0, 1000), rng.uniform(0, 1000)) for _ in range(count)]
+    detections = Detections([(x, y, x + 50, y + 30) for x, y in xy], [rng.uniform(0.5, 1) for _ in range(count)],
+                            [rng.randrange(len(CLASSES)) for _ in range(count)], dict(enumerate(CLASSES)))
+    backend.persist_detections(image_record, detections)
+
+
+def run_worker(settings, seconds, seed, results):
+    backend = load_backend(settings)
+    rng = random.Random(seed)
+    client = backend.app.test_client()
+    counts = {'store': 0, 'acknowledge': 0, 'read': 0}
+    errors = []
+    deadline = time.monotonic() + seconds
+    with backend.app.app_context():
+        max_alert_id = backend.db.session.query(backend.func.max(backend.Alert.id)).scalar()
+        while time.monotonic() < deadline:
+            operation = rng.choices(['store', 'acknowledge', 'read'], weights=[5, 3, 2])[0]
+            try:
+                if operation == 'store':
+                    store_image(backend, rng)
+                elif operation == 'acknowledge':
+                    response = client.put(f'/api/alerts/{rng.randint(1, max_alert_id)}/acknowledge')
+                    if response.status_code != 200:
+                        raise RuntimeError(response.get_json().get('error'))
+                else:
+                    for url in ('/api/alerts?per_page=50', '/api/statistics'):
+                        response = client.get(url)
+                        if response.status_code != 200:
+                            raise RuntimeError(response.get_json().get('error'))
+                counts[operation] += 1
+            except Exception as e:
+                backend.db.session.rollback()
+                errors.append(str(e).splitlines()[0][:200])
+    results.put({'counts': counts, 'errors': errors})
+
+
+def prepare(settings):
+    """Migrate the schema and seed alerts to acknowledge"""
+    backend = load_backend(settings)
+    backend.init_db()
+    with backend.app.app_context():
+        rng = random.Random(0)
+        for _ in range(SEED_IMAGES):
+            store_image(backend, rng)
+
+
+def run(label, settings, workers, seconds):
+    # Everything touching the app runs in spawned processes, so each config gets a fresh import
+    context = multiprocessing.get_context('spawn')
+    setup = context.Process(target=prepare, args=(settings,))
+    setup.start()
+    setup.join()
+    if setup.exitcode != 0:
+        raise RuntimeError(f'Preparing the {label} database failed')
+
+    results = context.Queue()
+    processes = [context.Process(target=run_worker, args=(settings, seconds, seed, results))
+                 for seed in range(workers)]
+    for process in processes:
+        process.start()
+    outcomes = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+
+    operations = sum(sum(outcome['counts'].values()) for outcome in outcomes)
+    errors = [error for outcome in outcomes for error in outcome['errors']]
+    return {
+        'config': label,
+        'workers': workers,
+        'seconds': seconds,
+        'operations': operations,
+        'operations_per_second': round(operations / seconds, 1),
+        'writes': sum(outcome['counts']['store'] + outcome['counts']['acknowledge'] for outcome in outcomes),
+        'errors': len(errors),
+        'lock_errors': sum('locked' in error for error in errors),
+        'sample_errors': sorted(set(errors))[:3]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=20)
+    parser.add_argument('--legacy', action='store_true', help='also run with the old SQLite settings')
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    configs = [('tuned', TUNED)] + ([('legacy', LEGACY)] if args.legacy else [])
+    results = []
+    for label, settings in configs:
+        work_dir = None
+        if 'DATABASE_URL' not in os.environ:
+            work_dir = tempfile.mkdtemp(prefix='stress_writers_')
+            settings = {**settings, 'DATABASE_URL': f'sqlite:///{work_dir}/stress.db'}
+        try:
+            results.append(run(label, settings, args.workers, args.seconds))
+        finally:
+            if work_dir:
+                shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(f"{'config':<8} {'workers':>7} {'ops/s':>8} {'writes':>7} {'errors':>7} {'locked':>7}")
+    for row in results:
+        print(f"{row['config']:<8} {row['workers']:>7} {row['operations_per_second']:>8} {row['writes']:>7} "
+              f"{row['errors']:>7} {row['lock_errors']:>7}")
+        for error in row['sample_errors']:
+            print(f"         {error}")
+
+    if args.json:
+        Path(args.json).write_text(json.dumps({'benchmark': 'stress_writers', 'results': results}, indent=2))
+    sys.exit(1 if results[0]['errors'] else 0)
+
+
+if __name__ == '__main__':
+    main()
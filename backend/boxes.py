@@ -0,0 +1,204 @@
+"""
+Vectorized bounding box helpers shared by the detection pipeline
+Boxes are float arrays of shape (N, 4) in (x_min, y_min, x_max, y_max) pixels
+"""
+
+import numpy as np
+
+
+def as_boxes(boxes):
+    """Coerce any box-like input to a float32 (N, 4) array"""
+    return np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+
+
+def box_area(boxes):
+    """Area of each box, clipped at zero for degenerate boxes"""
+    boxes = as_boxes(boxes)
+    return np.clip(boxes[:, 2] - boxes[:, 0], 0, None) * np.clip(boxes[:, 3] - boxes[:, 1], 0, None)
+
+
+def box_iou(boxes_a, boxes_b):
+    """
+    Pairwise intersection-over-union between two sets of boxes
+    Returns: (N, M) float32 matrix
+    """
+    boxes_a = as_boxes(boxes_a)
+    boxes_b = as_boxes(boxes_b)
+
+    top_left = np.maximum(boxes_a[:, None, :2], boxes_b[None, :, :2])
+    bottom_right = np.minimum(boxes_a[:, None, 2:], boxes_b[None, :, 2:])
+    wh = np.clip(bottom_right - top_left, 0, None)
+    intersection = wh[..., 0] * wh[..., 1]
+
+    union = box_area(boxes_a)[:, None] + box_area(boxes_b)[None, :] - intersection
+    return np.where(union > 0, intersection / np.maximum(union, 1e-9), 0.0).astype(np.float32)
+
+
+def nms(boxes, scores, iou_threshold=0.5, classes=None):
+    """
+    Greedy non-maximum suppression, class-aware when classes are given
+    Boxes of different classes are shifted apart so they never suppress
+    each other, letting a single pass handle every class at once.
+    Returns: indices of kept boxes, highest score first
+    """
+    boxes = as_boxes(boxes)
+    scores = np.asarray(scores, dtype=np.float32).reshape(-1)
+    if len(boxes) == 0:
+        return np.empty(0, dtype=np.int64)
+
+    if classes is not None:
+        offset = float(boxes.max()) + 1.0
+        boxes = boxes + (np.asarray(classes, dtype=np.float32).reshape(-1, 1) * offset)
+
+    areas = box_area(boxes)
+    order = np.argsort(-scores, kind='stable')
+    keep = []
+
+    while order.size > 0:
+        best = order[0]
+        keep.append(best)
+        rest = order[1:]
+        if rest.size == 0:
+            break
+
+        top_left = np.maximum(boxes[best, :2], boxes[rest, :2])
+        bottom_right = np.minimum(boxes[best, 2:], boxes[rest, 2:])
+        wh = np.clip(bottom_right - top_left, 0, None)
+        intersection = wh[:, 0] * wh[:, 1]
+        union = areas[best] + areas[rest] - intersection
+        iou = np.where(union > 0, intersection / np.maximum(union, 1e-9), 0.0)
+
+        order = rest[iou <= iou_threshold]
+
+    return np.asarray(keep, dtype=np.int64)
+
+
+def overlapping_pairs(boxes_a, boxes_b, iou_threshold, chunk_size=256):
+    """
+    Pairs of boxes with IoU >= iou_threshold, without the full N x M IoU matrix
+    Both sets are sorted by x_min; each chunk of boxes_a is compared only with
+    the slice of boxes_b that can overlap it horizontally (x_min between the
+    chunk's smallest x_min less the widest b box, and its largest x_max), so
+    thousands of boxes per scene cost a few small IoU blocks instead of one
+    N x M matrix.
+    Returns: (indices into boxes_a, indices into boxes_b, IoUs)
+    """
+    boxes_a = as_boxes(boxes_a)
+    boxes_b = as_boxes(boxes_b)
+    if len(boxes_a) == 0 or len(boxes_b) == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+    order_a = np.argsort(boxes_a[:, 0], kind='stable')
+    order_b = np.argsort(boxes_b[:, 0], kind='stable')
+    sorted_b = boxes_b[order_b]
+    widest_b = float((sorted_b[:, 2] - sorted_b[:, 0]).max())
+
+    rows, cols, ious = [], [], []
+    for start in range(0, len(order_a), chunk_size):
+        chunk = order_a[start:start + chunk_size]
+        chunk_boxes = boxes_a[chunk]
+        low = np.searchsorted(sorted_b[:, 0], chunk_boxes[:, 0].min() - widest_b, side='left')
+        high = np.searchsorted(sorted_b[:, 0], chunk_boxes[:, 2].max(), side='left')
+        if low >= high:
+            continue
+        iou = box_iou(chunk_boxes, sorted_b[low:high])
+        chunk_rows, slice_cols = np.nonzero(iou >= iou_threshold)
+        rows.append(chunk[chunk_rows])
+        cols.append(order_b[low + slice_cols])
+        ious.append(iou[chunk_rows, slice_cols])
+    if not rows:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+    return np.concatenate(rows), np.concatenate(cols), np.concatenate(ious)
+
+
+def match_boxes(boxes_a, boxes_b, iou_threshold=0.3, classes_a=None, classes_b=None):
+    """
+    Greedy one-to-one matching of two sets of boxes, highest IoU first
+    Pairs below iou_threshold, or of different classes when classes are
+    given, never match. Candidate pairs come from overlapping_pairs (per
+    class), so only pairs that clear the threshold are visited in Python.
+    Returns: (indices into boxes_a, indices into boxes_b) of matched pairs
+    """
+    boxes_a = as_boxes(boxes_a)
+    boxes_b = as_boxes(boxes_b)
+    if classes_a is None or classes_b is None:
+        rows, cols, ious = overlapping_pairs(boxes_a, boxes_b, iou_threshold)
+    else:
+        classes_a = np.asarray(classes_a).reshape(-1)
+        classes_b = np.asarray(classes_b).reshape(-1)
+        parts = []
+        for class_id in np.intersect1d(classes_a, classes_b):
+            index_a = np.flatnonzero(classes_a == class_id)
+            index_b = np.flatnonzero(classes_b == class_id)
+            class_rows, class_cols, class_ious = overlapping_pairs(boxes_a[index_a], boxes_b[index_b], iou_threshold)
+            parts.append((index_a[class_rows], index_b[class_cols], class_ious))
+        rows, cols, ious = (np.concatenate(column) for column in zip(*parts)) if parts else \
+            (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32))
+    order = np.argsort(-ious, kind='stable')
+
+    used_a = np.zeros(len(boxes_a), dtype=bool)
+    used_b = np.zeros(len(boxes_b), dtype=bool)
+    matched_a, matched_b = [], []
+    for row, col in zip(rows[order].tolist(), cols[order].tolist()):
+        if not used_a[row] and not used_b[col]:
+            used_a[row] = used_b[col] = True
+            matched_a.append(row)
+            matched_b.append(col)
+    return np.asarray(matched_a, dtype=np.int64), np.asarray(matched_b, dtype=np.int64)
+
+
+def weighted_boxes_fusion(boxes, scores, classes, groups, group_count, iou_threshold=0.55):
+    """
+    Weighted boxes fusion of detections from several views of one image
+    Boxes are taken highest score first and joined to the fused box of the
+    same class they overlap most, if by more than iou_threshold; a fused box is
+    the score-weighted average of its members rather than the single best
+    one, as NMS would keep. Its score is the members' mean score scaled by
+    the share of the group_count views (groups) that found it, so objects
+    seen by only one view are down-weighted.
+    Returns: (fused boxes, fused scores, fused classes), highest score first
+    """
+    boxes = as_boxes(boxes).astype(np.float64)
+    scores = np.asarray(scores, dtype=np.float64).reshape(-1)
+    classes = np.asarray(classes, dtype=np.int64).reshape(-1)
+    groups = np.asarray(groups, dtype=np.int64).reshape(-1)
+    if len(boxes) == 0:
+        return np.empty((0, 4), dtype=np.float32), np.empty(0, dtype=np.float32), np.empty(0, dtype=np.int64)
+
+    order = np.argsort(-scores, kind='stable')
+    weighted_sums = np.zeros((len(boxes), 4))  # per fused box: sum of score * coordinates
+    weights = np.zeros(len(boxes))
+    fused_classes = np.zeros(len(boxes), dtype=np.int64)
+    members = []
+    count = 0
+
+    for index in order:
+        if count:
+            fused = weighted_sums[:count] / weights[:count, None]
+            top_left = np.maximum(fused[:, :2], boxes[index, :2])
+            bottom_right = np.minimum(fused[:, 2:], boxes[index, 2:])
+            wh = np.clip(bottom_right - top_left, 0, None)
+            intersection = wh[:, 0] * wh[:, 1]
+            union = box_area(fused) + box_area(boxes[index:index + 1])[0] - intersection
+            iou = np.where(union > 0, intersection / np.maximum(union, 1e-9), 0.0)
+            iou[fused_classes[:count] != classes[index]] = 0.0
+            match = int(np.argmax(iou))
+            if iou[match] > iou_threshold:
+                weighted_sums[match] += scores[index] * boxes[index]
+                weights[match] += scores[index]
+                members[match].append(index)
+                continue
+
+        weighted_sums[count] = scores[index] * boxes[index]
+        weights[count] = scores[index]
+        fused_classes[count] = classes[index]
+        members.append([index])
+        count += 1
+
+    fused_boxes = weighted_sums[:count] / weights[:count, None]
+    fused_scores = np.array([
+        scores[cluster].mean() * min(len(np.unique(groups[cluster])), group_count) / group_count
+        for cluster in members
+    ])
+    order = np.argsort(-fused_scores, kind='stable')
+    return fused_boxes[order].astype(np.float32), fused_scores[order].astype(np.float32), fused_classes[:count][order]
@@ -0,0 +1,202 @@
+"""
+Columnar export of detections and alerts
+Rows arrive in chunks (a list of values per column) and each chunk is
+written out before the next is read, so memory is bounded by the chunk size
+however many rows are exported. Formats:
+
+- npy: a directory with one .npy file per column plus meta.json. Columns are
+  plain fixed-width arrays, ready for np.load(path, mmap_mode='r').
+  Low-cardinality strings (class names, alert types, severities) are stored
+  as int32 codes into meta.json's categories; missing integers are -1 and
+  missing timestamps NaT. Each file's header reserves room for the final row
+  count, which is written when the export closes.
+- arrow: Arrow IPC (the stream format over HTTP, the file format on disk)
+- parquet: one row group per chunk
+
+arrow and parquet need pyarrow (in requirements.txt); npy needs only NumPy.
+"""
+
+import json
+import struct
+import zipfile
+from pathlib import Path
+
+import numpy as np
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    from pyarrow import ipc
+except ImportError:
+    pa = None
+
+FORMATS = ('npy', 'arrow', 'parquet')
+NPY_HEADER_BYTES = 128  # magic, version and length, then the padded header dict
+
+# Column kinds: NumPy dtype, value stored for NULL in .npy files, Arrow type name
+KINDS = {
+    'int64': ('<i8', -1, 'int64'),
+    'float32': ('<f4', np.nan, 'float32'),
+    'bool': ('|b1', False, 'bool_'),
+    'timestamp': ('<M8[us]', None, 'timestamp'),
+    'category': ('<i4', -1, 'string')
+}
+
+
+def arrow_available():
+    return pa is not None
+
+
+def npy_header(dtype, count):
+    """A version 1.0 .npy header of exactly NPY_HEADER_BYTES for a 1-D array"""
+    header = repr({'descr': np.lib.format.dtype_to_descr(np.dtype(dtype)), 'fortran_order': False,
+                   'shape': (count,)})
+    header = header.ljust(NPY_HEADER_BYTES - 10 - 1) + '\n'
+    return b'\x93NUMPY\x01\x00' + struct.pack('<H', len(header)) + header.encode('latin1')
+
+
+class NpyWriter:
+    """Writes chunks to one .npy file per column in directory"""
+
+    def __init__(self, directory, columns):
+        """columns: (name, kind) pairs"""
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.columns = columns
+        self.rows = 0
+        self.categories = {name: {} for name, kind in columns if kind == 'category'}
+        self._files = {}
+        for name, kind in columns:
+            out = open(self.directory / f'{name}.npy', 'wb')
+            out.write(npy_header(KINDS[kind][0], 0))
+            self._files[name] = out
+
+    def to_array(self, name, kind, values):
+        dtype, null, _ = KINDS[kind]
+        if kind == 'category':
+            codes = self.categories[name]
+            return np.array([-1 if value is None else codes.setdefault(value, len(codes)) for value in values],
+                            dtype=dtype)
+        if kind == 'timestamp':
+            return np.array(values, dtype=dtype)  # None becomes NaT
+        return np.array([null if value is None else value for value in values], dtype=dtype)
+
+    def write(self, chunk):
+        count = None
+        for name, kind in self.columns:
+            array = self.to_array(name, kind, chunk[name])
+            count = len(array)
+            array.tofile(self._files[name])
+        self.rows += count or 0
+
+    def close(self, meta=None):
+        """Write each header's final row count, then meta.json (with meta added)"""
+        for name, kind in self.columns:
+            out = self._files[name]
+            out.seek(0)
+            out.write(npy_header(KINDS[kind][0], self.rows))
+            out.close()
+        (self.directory / 'meta.json').write_text(json.dumps({
+            **(meta or {}),
+            'rows': self.rows,
+            'columns': {name: KINDS[kind][0] for name, kind in self.columns},
+            'categories': {name: list(codes) for name, codes in self.categories.items()},
+            'null_values': {name: KINDS[kind][1] for name, kind in self.columns if kind in ('int64', 'category')}
+        }, indent=2))
+
+
+class ArrowWriter:
+    """Writes chunks as Arrow IPC record batches or Parquet row groups to sink"""
+
+    def __init__(self, sink, columns, export_format, ipc_file=False):
+        if pa is None:
+            raise RuntimeError(f'{export_format} export needs pyarrow (pip install pyarrow)')
+        self.columns = columns
+        self.rows = 0
+        self.schema = pa.schema([(name, self.arrow_type(kind)) for name, kind in columns])
+        self.parquet = export_format == 'parquet'
+        if self.parquet:
+            self._writer = pq.ParquetWriter(sink, self.schema)
+        elif ipc_file:
+            self._writer = ipc.new_file(sink, self.schema)
+        else:
+            self._writer = ipc.new_stream(sink, self.schema)
+
+    @staticmethod
+    def arrow_type(kind):
+        if kind == 'timestamp':
+            return pa.timestamp('us')
+        return getattr(pa, KINDS[kind][2])()
+
+    def write(self, chunk):
+        batch = pa.record_batch([pa.array(chunk[name], type=field.type)
+                                 for (name, _), field in zip(self.columns, self.schema)], schema=self.schema)
+        if self.parquet:
+            self._writer.write_table(pa.Table.from_batches([batch]))  # one row group per chunk
+        else:
+            self._writer.write_batch(batch)
+        self.rows += batch.num_rows
+
+    def close(self, meta=None):
+        self._writer.close()
+
+
+class ChunkSink:
+    """Write-only file object collecting output until the response drains it"""
+
+    def __init__(self):
+        self._parts = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data):
+        data = bytes(data)
+        self._parts.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def writable(self):
+        return True
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b''.join(self._parts)
+        self._parts = []
+        return data
+
+
+class _StreamOnly:
+    """Hides tell() so zipfile writes data descriptors instead of seeking back"""
+
+    def __init__(self, sink):
+        self._sink = sink
+
+    def write(self, data):
+        return self._sink.write(data)
+
+    def flush(self):
+        pass
+
+
+def stream_npz(directory, block_size=1024 * 1024):
+    """
+    An uncompressed .npz (zip) of a directory's .npy files and meta.json,
+    produced block by block
+    Stored (not deflated) members, so an unzipped copy can be memory-mapped.
+    """
+    sink = ChunkSink()
+    with zipfile.ZipFile(_StreamOnly(sink), 'w', compression=zipfile.ZIP_STORED, allowZip64=True) as archive:
+        for path in sorted(Path(directory).iterdir()):
+            with open(path, 'rb') as source, archive.open(path.name, 'w', force_zip64=True) as member:
+                for block in iter(lambda: source.read(block_size), b''):
+                    member.write(block)
+                    yield sink.drain()
+    yield sink.drain()
@@ -0,0 +1,89 @@
+"""
+Columnar container for detection results
+YOLO results are pulled out once per image as contiguous NumPy arrays and
+stay that way through merging, caching, annotation and persistence; per-box
+dicts are only built at the API boundary.
+"""
+
+import numpy as np
+
+from boxes import as_boxes
+
+
+class Detections:
+    """
+    Detections as parallel arrays
+    xyxy: (N, 4) float32 boxes, conf: (N,) float32 scores, cls: (N,) int64
+    class ids, names: the model's {class id: class name} mapping
+    """
+
+    __slots__ = ('xyxy', 'conf', 'cls', 'names')
+
+    def __init__(self, xyxy, conf, cls, names):
+        self.xyxy = as_boxes(xyxy)
+        self.conf = np.asarray(conf, dtype=np.float32).reshape(-1)
+        self.cls = np.asarray(cls, dtype=np.int64).reshape(-1)
+        self.names = names
+
+    @classmethod
+    def empty(cls, names):
+        return cls(np.empty((0, 4)), np.empty(0), np.empty(0), names)
+
+    @classmethod
+    def from_result(cls, result, names=None):
+        """
+        Extract one Ultralytics Results object with a single device-to-host copy
+        boxes.data rows are (x_min, y_min, x_max, y_max, [track id,] conf, cls).
+        """
+        data = result.boxes.data.cpu().numpy()
+        names = result.names if names is None else names
+        if len(data) == 0:
+            return cls.empty(names)
+        return cls(data[:, :4], data[:, -2], data[:, -1], names)
+
+    @classmethod
+    def concatenate(cls, parts, names):
+        parts = [part for part in parts if len(part)]
+        if not parts:
+            return cls.empty(names)
+        return cls(
+            np.concatenate([part.xyxy for part in parts]),
+            np.concatenate([part.conf for part in parts]),
+            np.concatenate([part.cls for part in parts]),
+            names
+        )
+
+    def __len__(self):
+        return len(self.conf)
+
+    def __getitem__(self, index):
+        """Subset by boolean mask or index array"""
+        return Detections(self.xyxy[index], self.conf[index], self.cls[index], self.names)
+
+    def shifted(self, dx, dy):
+        """Copy with every box translated by (dx, dy)"""
+        offset = np.array([dx, dy, dx, dy], dtype=np.float32)
+        return Detections(self.xyxy + offset, self.conf, self.cls, self.names)
+
+    def class_names(self):
+        """Class name of every detection, looked up once per distinct class"""
+        unique, inverse = np.unique(self.cls, return_inverse=True)
+        lookup = np.array([self.names[int(c)] for c in unique], dtype=object)
+        return lookup[inverse].tolist()
+
+    def to_dicts(self):
+        """Per-detection dicts (API boundary only)"""
+        return [
+            {
+                'class_id': class_id,
+                'class_name': class_name,
+                'confidence': confidence,
+                'x_min': box[0],
+                'y_min': box[1],
+                'x_max': box[2],
+                'y_max': box[3]
+            }
+            for class_id, class_name, confidence, box in zip(
+                self.cls.tolist(), self.class_names(), self.conf.tolist(), self.xyxy.tolist()
+            )
+        ]
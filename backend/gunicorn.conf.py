@@ -0,0 +1,56 @@
+"""
+Gunicorn hooks for schema migrations, model loading and metrics
+With --preload the app is imported once in the master; the PyTorch weights
+are then loaded there too, before workers are forked, so every worker maps
+the same weight pages copy-on-write instead of loading its own copy. Each
+worker then finishes its own setup (or the whole load, without --preload or
+for a runtime that can't be forked) in the background, and reports ready on
+/api/ready when done.
+
+With METRICS_ENABLED, PROMETHEUS_MULTIPROC_DIR must point at a directory
+shared by the workers; the master clears old metric files from it on start
+and drops each dead worker's live gauges.
+
+    cd backend && gunicorn --preload -c gunicorn.conf.py app:app
+"""
+
+import gc
+import os
+import sys
+
+
+def on_starting(server):
+    """Master, before any worker starts: forget metrics from earlier runs"""
+    from metrics import clear_multiprocess_dir
+    clear_multiprocess_dir(keep_pid=os.getpid())
+
+
+def when_ready(server):
+    """Master, after --preload imported the app and before any worker forks"""
+    backend = sys.modules.get('app')
+    if backend is None:
+        return
+    from inference_backends import FORK_SAFE_BACKENDS
+    if backend.MODEL_BACKEND not in FORK_SAFE_BACKENDS:
+        server.log.info(f"{backend.MODEL_BACKEND} models can't be shared across fork; workers load their own")
+        return
+    backend.model_loader.load(warmup=False)
+    # Keep the collector from touching (and so copying) the preloaded objects' pages
+    gc.freeze()
+
+
+def post_worker_init(worker):
+    """
+    Worker, once the app is loaded: apply pending schema migrations (workers
+    take turns on the migration lock), then load or warm up the model without
+    blocking requests
+    """
+    backend = sys.modules['app']
+    backend.init_db()
+    backend.model_loader.start()
+
+
+def child_exit(server, worker):
+    """Master, after a worker exits"""
+    from metrics import mark_process_dead
+    mark_process_dead(worker.pid)
@@ -0,0 +1,278 @@
+"""
+Interchangeable inference backends for the detection model
+Every backend takes a list of images (paths or BGR arrays) and returns one
+Ultralytics Results object per image, so the rest of the app doesn't care
+whether boxes came from eager PyTorch, ONNX Runtime or OpenVINO.
+
+The ONNX Runtime backend runs the session directly rather than through
+Ultralytics, so intra/inter-op thread counts can be set for CPU-only nodes;
+pre- and post-processing reuse Ultralytics' own letterbox, NMS and box
+rescaling so outputs match the PyTorch model.
+
+torch, Ultralytics and the runtimes are only imported when a backend is
+constructed, so importing this module (and the app) stays cheap.
+"""
+
+import ast
+import importlib.util
+import logging
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ('pytorch', 'onnxruntime', 'openvino')
+
+# Backends whose loaded state survives fork(): ONNX Runtime and OpenVINO start
+# thread pools when a model is loaded, which a forked child doesn't inherit
+FORK_SAFE_BACKENDS = ('pytorch',)
+
+# Ultralytics predict() defaults, mirrored so every backend filters alike
+NMS_IOU = 0.7
+MAX_DETECTIONS = 300
+
+
+def onnx_export_path(weights_path, quantize=False):
+    """Where export_onnx writes the ONNX model for a .pt file"""
+    weights_path = Path(weights_path)
+    return weights_path.with_suffix('.int8.onnx' if quantize else '.onnx')
+
+
+def openvino_export_path(weights_path):
+    """Where Ultralytics writes the OpenVINO model directory for a .pt file"""
+    weights_path = Path(weights_path)
+    return weights_path.parent / f'{weights_path.stem}_openvino_model'
+
+
+def _allow_ultralytics_checkpoints():
+    """Let torch.load unpickle Ultralytics checkpoints under PyTorch 2.6+"""
+    import torch
+    from ultralytics.nn.tasks import DetectionModel
+
+    if getattr(torch.load, '_allows_ultralytics', False):
+        return
+    try:
+        # PyTorch 2.6 introduced weights_only default; allow Ultralytics model class
+        torch.serialization.add_safe_globals([DetectionModel])
+        # Additionally patch torch.load to default weights_only=False for broader compatibility
+        _orig_torch_load = torch.load
+        def _patched_torch_load(*args, **kwargs):
+            if 'weights_only' not in kwargs:
+                kwargs['weights_only'] = False
+            return _orig_torch_load(*args, **kwargs)
+        _patched_torch_load._allows_ultralytics = True
+        torch.load = _patched_torch_load
+    except Exception as e:
+        logger.warning(f"Could not configure PyTorch serialization compatibility: {e}")
+
+
+def _yolo(weights_path):
+    _allow_ultralytics_checkpoints()
+    from ultralytics import YOLO
+    return YOLO(str(weights_path), task='detect')
+
+
+class UltralyticsBackend:
+    """Backends Ultralytics runs itself: eager PyTorch, or an OpenVINO export"""
+
+    def __init__(self, weights_path, name='pytorch'):
+        self.name = name
+        self.weights_path = Path(weights_path)
+        self.model = _yolo(self.weights_path)
+        if name == 'openvino':
+            # OpenVINO models are loaded on first predict; load now so startup fails fast
+            self.model.predict(np.zeros((32, 32, 3), dtype=np.uint8), verbose=False)
+        else:
+            # Fuse conv+batchnorm now rather than on first predict, so weights
+            # loaded before a fork stay shared instead of being rebuilt per worker
+            self.model.model.fuse(verbose=False)
+        self.names = self.model.names
+
+    def predict(self, sources, conf):
+        return self.model(list(sources), conf=conf, iou=NMS_IOU, max_det=MAX_DETECTIONS, verbose=False)
+
+    def info(self):
+        return {'name': self.name, 'weights': str(self.weights_path)}
+
+
+class OnnxRuntimeBackend:
+    """
+    YOLO detection model exported to ONNX, run by ONNX Runtime on CPU
+    intra_op_threads/inter_op_threads: 0 leaves ONNX Runtime's defaults
+    """
+
+    name = 'onnxruntime'
+
+    def __init__(self, onnx_path, intra_op_threads=0, inter_op_threads=0):
+        import onnxruntime
+
+        self.weights_path = Path(onnx_path)
+        self.intra_op_threads = intra_op_threads
+        self.inter_op_threads = inter_op_threads
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.intra_op_num_threads = intra_op_threads
+        options.inter_op_num_threads = inter_op_threads
+        if inter_op_threads > 1:
+            options.execution_mode = onnxruntime.ExecutionMode.ORT_PARALLEL
+        self.session = onnxruntime.InferenceSession(
+            str(self.weights_path), options, providers=['CPUExecutionProvider']
+        )
+
+        # Ultralytics stores names, stride and imgsz in the export's metadata
+        metadata = self.session.get_modelmeta().custom_metadata_map
+        self.names = ast.literal_eval(metadata['names'])
+        self.stride = int(metadata.get('stride', 32))
+        self.imgsz = ast.literal_eval(metadata.get('imgsz', '[640, 640]'))
+        self.quantized = self.weights_path.name.endswith('.int8.onnx')
+
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        # A dynamic export accepts any batch size and rectangular inputs
+        self.dynamic = not all(isinstance(dim, int) for dim in model_input.shape)
+
+    def _load(self, source):
+        if isinstance(source, np.ndarray):
+            return source
+        image = cv2.imread(str(source))
+        if image is None:
+            raise FileNotFoundError(f"Could not read image {source}")
+        return image
+
+    def _preprocess(self, images):
+        """Letterbox as Ultralytics does, then stack into an RGB float NCHW batch"""
+        from ultralytics.data.augment import LetterBox
+
+        same_shapes = len({image.shape for image in images}) == 1
+        letterbox = LetterBox(self.imgsz, auto=same_shapes and self.dynamic, stride=self.stride)
+        batch = np.stack([letterbox(image=image) for image in images])
+        batch = batch[..., ::-1].transpose(0, 3, 1, 2)
+        return np.ascontiguousarray(batch, dtype=np.float32) / 255.0
+
+    def _run(self, batch):
+        if self.dynamic:
+            return self.session.run(None, {self.input_name: batch})[0]
+        # Static exports take one image at a time
+        return np.concatenate([
+            self.session.run(None, {self.input_name: batch[i:i + 1]})[0] for i in range(len(batch))
+        ])
+
+    def predict(self, sources, conf):
+        import torch
+        from ultralytics.engine.results import Results
+        from ultralytics.utils import ops
+        try:
+            from ultralytics.utils.nms import non_max_suppression
+        except ImportError:  # older Ultralytics releases keep NMS in ops
+            from ultralytics.utils.ops import non_max_suppression
+
+        sources = list(sources)
+        images = [self._load(source) for source in sources]
+        batch = self._preprocess(images)
+        predictions = non_max_suppression(
+            torch.from_numpy(self._run(batch)), conf, NMS_IOU, max_det=MAX_DETECTIONS
+        )
+
+        results = []
+        for source, image, boxes in zip(sources, images, predictions):
+            boxes[:, :4] = ops.scale_boxes(batch.shape[2:], boxes[:, :4], image.shape)
+            path = '' if isinstance(source, np.ndarray) else str(source)
+            results.append(Results(image, path=path, names=self.names, boxes=boxes))
+        return results
+
+    def info(self):
+        return {
+            'name': self.name,
+            'weights': str(self.weights_path),
+            'quantized': self.quantized,
+            'dynamic': self.dynamic,
+            'intra_op_threads': self.intra_op_threads,
+            'inter_op_threads': self.inter_op_threads,
+            'providers': self.session.get_providers()
+        }
+
+
+def select_backend(name, weights_path, quantize=False):
+    """
+    Resolve the requested backend to one that can actually run
+    The ONNX/OpenVINO exports are looked up next to weights_path (see
+    export_onnx/export_openvino); a missing export or runtime only logs a
+    warning and selects PyTorch. Nothing heavy is imported.
+    Returns: (backend name, path of the model it loads)
+    """
+    if name == 'onnxruntime':
+        onnx_path = onnx_export_path(weights_path, quantize)
+        if importlib.util.find_spec('onnxruntime') is None:
+            logger.warning("onnxruntime is not installed, falling back to PyTorch")
+        elif not onnx_path.exists():
+            logger.warning(f"ONNX export not found at {onnx_path}, falling back to PyTorch")
+        else:
+            return name, onnx_path
+    elif name == 'openvino':
+        openvino_path = openvino_export_path(weights_path)
+        if importlib.util.find_spec('openvino') is None:
+            logger.warning("openvino is not installed, falling back to PyTorch")
+        elif not openvino_path.exists():
+            logger.warning(f"OpenVINO export not found at {openvino_path}, falling back to PyTorch")
+        else:
+            return name, openvino_path
+    elif name != 'pytorch':
+        logger.warning(f"Unknown inference backend {name!r} (expected one of {', '.join(BACKENDS)}), "
+                       f"using PyTorch")
+
+    return 'pytorch', Path(weights_path)
+
+
+def weights_file(path):
+    """The file whose contents determine a model's outputs (the .bin of an OpenVINO directory)"""
+    path = Path(path)
+    if path.is_dir():
+        return next(path.glob('*.bin'))
+    return path
+
+
+def load_backend(name, path, intra_op_threads=0, inter_op_threads=0):
+    """
+    Construct a backend chosen by select_backend
+    Returns: backend object
+    """
+    if name == 'onnxruntime':
+        return OnnxRuntimeBackend(path, intra_op_threads, inter_op_threads)
+    return UltralyticsBackend(path, name)
+
+
+def export_onnx(weights_path, quantize=False, imgsz=640):
+    """
+    Export a .pt model to ONNX with dynamic batch and image size
+    quantize: also write a dynamic-INT8 (weights-only) copy for ONNX Runtime
+    Returns: path of the model load_backend will use
+    """
+    onnx_path = Path(_yolo(weights_path).export(format='onnx', dynamic=True, simplify=False, imgsz=imgsz))
+    if not quantize:
+        return onnx_path
+
+    import onnx
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    quantized_path = onnx_export_path(weights_path, quantize=True)
+    quantize_dynamic(str(onnx_path), str(quantized_path), weight_type=QuantType.QUInt8)
+
+    # Keep the class names and input size Ultralytics stored in the metadata
+    source, quantized = onnx.load(str(onnx_path)), onnx.load(str(quantized_path))
+    existing = {prop.key for prop in quantized.metadata_props}
+    for prop in source.metadata_props:
+        if prop.key not in existing:
+            quantized.metadata_props.append(prop)
+    onnx.save(quantized, str(quantized_path))
+    return quantized_path
+
+
+def export_openvino(weights_path, imgsz=640):
+    """
+    Export a .pt model to OpenVINO IR
+    Returns: path of the model directory
+    """
+    return Path(_yolo(weights_path).export(format='openvino', dynamic=True, imgsz=imgsz))
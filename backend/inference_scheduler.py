@@ -0,0 +1,155 @@
+"""
+Micro-batching inference scheduler
+Concurrent callers submit single images; a background thread gathers them
+into one batch (up to max_batch_size, or whatever arrived within max_wait_ms
+of the first request) and runs a single forward pass for all of them.
+"""
+
+import logging
+import os
+import queue
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import Future
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class _InferenceRequest:
+    __slots__ = ('source', 'conf', 'future', 'enqueued_at')
+
+    def __init__(self, source, conf):
+        self.source = source
+        self.conf = conf
+        self.future = Future()
+        self.enqueued_at = time.perf_counter()
+
+
+class InferenceScheduler:
+    """
+    Gathers concurrent inference requests into batched forward passes
+    run_batch(sources, confs) must return one result per source, already
+    filtered to that caller's confidence threshold.
+    """
+
+    def __init__(self, run_batch, max_batch_size=8, max_wait_ms=10, latency_window=1000):
+        self._run_batch = run_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+
+        self._queue = queue.Queue()
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+        self._requests_total = 0
+        self._batches_total = 0
+        self._errors_total = 0
+        self._batch_sizes = Counter()
+        self._queue_wait_ms = deque(maxlen=latency_window)
+        self._latency_ms = deque(maxlen=latency_window)
+        self._batch_ms = deque(maxlen=latency_window)
+
+    def _ensure_started(self):
+        """Start the batching thread lazily, and again in each forked worker"""
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            self._queue = queue.Queue()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._loop, name='inference-scheduler', daemon=True)
+            self._thread.start()
+            logger.info(f"Inference scheduler started (max_batch_size={self.max_batch_size}, "
+                        f"max_wait_ms={self.max_wait_ms})")
+
+    def submit(self, source, conf):
+        """
+        Queue one image for the next batch
+        Returns: Future resolving to that image's result
+        """
+        self._ensure_started()
+        request = _InferenceRequest(source, conf)
+        self._queue.put(request)
+        return request.future
+
+    def predict(self, sources, conf, timeout=None):
+        """Submit several images and block until all of their results are ready"""
+        futures = [self.submit(source, conf) for source in sources]
+        return [future.result(timeout=timeout) for future in futures]
+
+    @property
+    def queue_depth(self):
+        """Images waiting for a batch in this process"""
+        return self._queue.qsize()
+
+    def _collect_batch(self):
+        """Block for the first request, then gather more until the batch is full or the wait expires"""
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait_ms / 1000.0
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _loop(self):
+        while True:
+            batch = self._collect_batch()
+            started = time.perf_counter()
+            try:
+                results = self._run_batch([r.source for r in batch], [r.conf for r in batch])
+            except Exception as e:
+                logger.error(f"Batched inference failed for {len(batch)} requests: {str(e)}")
+                for request in batch:
+                    request.future.set_exception(e)
+                with self._stats_lock:
+                    self._errors_total += len(batch)
+                continue
+
+            finished = time.perf_counter()
+            for request, result in zip(batch, results):
+                request.future.set_result(result)
+
+            with self._stats_lock:
+                self._requests_total += len(batch)
+                self._batches_total += 1
+                self._batch_sizes[len(batch)] += 1
+                self._batch_ms.append((finished - started) * 1000)
+                for request in batch:
+                    self._queue_wait_ms.append((started - request.enqueued_at) * 1000)
+                    self._latency_ms.append((finished - request.enqueued_at) * 1000)
+
+    @staticmethod
+    def _percentiles(samples):
+        if not samples:
+            return {'p50': None, 'p90': None, 'p99': None}
+        p50, p90, p99 = np.percentile(np.fromiter(samples, dtype=np.float64), [50, 90, 99])
+        return {'p50': round(float(p50), 3), 'p90': round(float(p90), 3), 'p99': round(float(p99), 3)}
+
+    def stats(self):
+        """Snapshot of queue depth, batch-size distribution and latency percentiles"""
+        with self._stats_lock:
+            return {
+                'running': self._thread is not None and self._thread.is_alive() and self._pid == os.getpid(),
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait_ms,
+                'queue_depth': self.queue_depth,
+                'requests_total': self._requests_total,
+                'batches_total': self._batches_total,
+                'errors_total': self._errors_total,
+                'mean_batch_size': round(self._requests_total / self._batches_total, 3) if self._batches_total else None,
+                'batch_size_histogram': {str(size): count for size, count in sorted(self._batch_sizes.items())},
+                'queue_wait_ms': self._percentiles(self._queue_wait_ms),
+                'batch_inference_ms': self._percentiles(self._batch_ms),
+                'latency_ms': self._percentiles(self._latency_ms)
+            }
@@ -0,0 +1,418 @@
+"""
+Batch ingest
+Loads a directory, zip or tar of images straight into the database, for
+backfills too large to push through /api/upload one request at a time:
+
+    cd backend && python ingest.py ../satellite_dataset/images --decode-workers 4
+
+Images flow through a pipeline with a bounded queue between each stage, so a
+slow stage applies back-pressure instead of letting memory grow:
+
+    read (thread) -> decode (processes) -> inference (batched) -> write (thread)
+
+The reader streams files out of the source (tar archives are read
+sequentially, never extracted). Decode workers hash each file, skip hashes
+already in the checkpoint, store the original and decode it. Inference runs
+BATCH_SIZE images per forward pass, and the writer stores COMMIT_EVERY images
+per transaction. A hash is appended to the checkpoint only after its image
+is committed, so an interrupted run resumes where it stopped.
+"""
+
+import argparse
+import logging
+import multiprocessing
+import os
+import queue
+import tarfile
+import threading
+import time
+import zipfile
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger('ingest')
+
+_DONE = None  # end-of-stream marker passed down every queue
+
+
+class StageStats:
+    """Items handled and time spent working (not waiting on queues) by one stage"""
+
+    def __init__(self, name, workers=1):
+        self.name = name
+        self.workers = workers
+        self.items = 0
+        self.busy_seconds = 0.0
+
+    def add(self, items, busy_seconds):
+        self.items += items
+        self.busy_seconds += busy_seconds
+
+    @property
+    def capacity(self):
+        """Items per second the stage could sustain if it never waited"""
+        if not self.busy_seconds:
+            return None
+        return self.items / self.busy_seconds * self.workers
+
+
+def iter_source(source, allowed_extensions):
+    """
+    Yield (name, bytes) for every image in a directory, zip or tar archive
+    Tar archives (optionally compressed) are streamed in a single pass.
+    """
+    def allowed(name):
+        return '.' in name and name.rsplit('.', 1)[1].lower() in allowed_extensions
+
+    path = Path(source)
+    if path.is_dir():
+        for file in sorted(path.rglob('*')):
+            if file.is_file() and allowed(file.name):
+                yield str(file.relative_to(path)), file.read_bytes()
+    elif zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as archive:
+            for info in archive.infolist():
+                if not info.is_dir() and allowed(info.filename):
+                    yield info.filename, archive.read(info)
+    elif tarfile.is_tarfile(path):
+        with tarfile.open(path, mode='r|*') as archive:
+            for member in archive:
+                if member.isfile() and allowed(member.name):
+                    yield member.name, archive.extractfile(member).read()
+    else:
+        raise ValueError(f"{source} is not a directory, zip or tar archive")
+
+
+def load_checkpoint(path):
+    """Content hashes already ingested by previous runs"""
+    if not path.exists():
+        return set()
+    with open(path) as checkpoint:
+        return {line.strip() for line in checkpoint if line.strip()}
+
+
+def decode_worker(raw_queue, decoded_queue, done_hashes):
+    """
+    Decode process: hash, skip already ingested images, store the original and decode it
+    Puts one dict per input on decoded_queue: status is 'decoded', 'tiled' (too
+    large to decode whole; inferred from the stored file), 'skipped' or 'failed'.
+    """
+    import hashlib
+
+    import cv2
+    import numpy as np
+
+    import app as backend
+
+    # Parallelism comes from the worker processes; keep OpenCV from adding threads
+    cv2.setNumThreads(1)
+    while True:
+        item = raw_queue.get()
+        if item is _DONE:
+            decoded_queue.put(_DONE)
+            return
+
+        name, data = item
+        started = time.perf_counter()
+        result = {'name': name, 'status': 'decoded', 'image': None}
+        try:
+            content_hash = hashlib.sha256(data).hexdigest()
+            result['content_hash'] = content_hash
+            if content_hash in done_hashes:
+                result['status'] = 'skipped'
+            else:
+                size = backend.get_encoded_image_size(data)
+                if size is not None and not backend.should_tile_image(None, size):
+                    image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+                    if image is None:
+                        raise ValueError('could not decode image')
+                    result['image'] = image
+
+                file_path = backend.content_path(content_hash, name.rsplit('.', 1)[1].lower())
+                backend.write_file_atomic(file_path, data)
+                result.update(file_path=str(file_path), file_size=len(data))
+                if result['image'] is None:
+                    # Past the decompression-bomb limit, or not an image at all
+                    try:
+                        backend.get_image_size(file_path)
+                    except Exception:
+                        file_path.unlink(missing_ok=True)
+                        raise
+                    result['status'] = 'tiled'
+        except Exception as e:
+            result.update(status='failed', error=str(e))
+        result['busy_seconds'] = time.perf_counter() - started
+        decoded_queue.put(result)
+
+
+class Ingest:
+    """One ingest run: owns the queues, stage threads/processes, stats and checkpoint"""
+
+    def __init__(self, backend, source, checkpoint_path, decode_workers=4, batch_size=8,
+                 commit_every=64, queue_size=64, report_every=10.0):
+        self.backend = backend
+        self.source = source
+        self.checkpoint_path = Path(checkpoint_path)
+        self.decode_workers = decode_workers
+        self.batch_size = batch_size
+        self.commit_every = commit_every
+        self.report_every = report_every
+
+        # Spawn (not fork) so decode workers never inherit torch state
+        self.ctx = multiprocessing.get_context('spawn')
+        self.raw_queue = self.ctx.Queue(maxsize=queue_size)
+        self.decoded_queue = self.ctx.Queue(maxsize=queue_size)
+        self.write_queue = queue.Queue(maxsize=queue_size)
+
+        self.stats = {
+            'read': StageStats('read'),
+            'decode': StageStats('decode', decode_workers),
+            'inference': StageStats('inference'),
+            'write': StageStats('write')
+        }
+        self.counts = Counter()
+        self.started = None
+        self._last_report = 0.0
+        self._error = None
+        self._workers = []
+
+    def run(self):
+        done_hashes = load_checkpoint(self.checkpoint_path)
+        if done_hashes:
+            logger.info(f"Resuming: {len(done_hashes)} images already ingested per {self.checkpoint_path}")
+
+        self._workers = workers = [
+            self.ctx.Process(target=decode_worker, args=(self.raw_queue, self.decoded_queue, done_hashes),
+                             name=f'ingest-decode-{index}', daemon=True)
+            for index in range(self.decode_workers)
+        ]
+        for worker in workers:
+            worker.start()
+
+        # Load the model while the workers start up, and keep one-off setup out of the stage timings
+        self.backend.warm_up_model(self.backend.model_loader.load(warmup=False))
+
+        self.started = time.perf_counter()
+        reader = threading.Thread(target=self._read, name='ingest-read', daemon=True)
+        writer = threading.Thread(target=self._write, name='ingest-write', daemon=True)
+        reader.start()
+        writer.start()
+        try:
+            self._infer()
+        finally:
+            self.write_queue.put(_DONE)
+            writer.join()
+            for worker in workers:
+                worker.join(timeout=5)
+                if worker.is_alive():
+                    worker.terminate()
+
+        if self._error is not None:
+            raise self._error
+        self.report(final=True)
+
+    def _read(self):
+        """Reader thread: stream files out of the source into the decode queue"""
+        try:
+            source = iter_source(self.source, self.backend.ALLOWED_EXTENSIONS)
+            while True:
+                started = time.perf_counter()
+                item = next(source, _DONE)
+                if item is _DONE:
+                    break
+                self.stats['read'].add(1, time.perf_counter() - started)
+                self.raw_queue.put(item)
+        except Exception as e:
+            logger.error(f"Reading {self.source} failed: {str(e)}")
+            self._error = e
+        finally:
+            for _ in range(self.decode_workers):
+                self.raw_queue.put(_DONE)
+
+    def _next_batch(self, open_workers):
+        """
+        Up to batch_size decoded images; blocks for the first only
+        Returns: (decoded items, decode workers still running)
+        """
+        batch = []
+        while open_workers and len(batch) < self.batch_size:
+            try:
+                item = self.decoded_queue.get(timeout=1.0 if not batch else 0.05)
+            except queue.Empty:
+                if batch:
+                    break
+                if not any(worker.is_alive() for worker in self._workers):
+                    raise RuntimeError('Decode workers exited unexpectedly')
+                continue
+            if item is _DONE:
+                open_workers -= 1
+                continue
+            self.stats['decode'].add(1, item.pop('busy_seconds'))
+            if item['status'] in ('decoded', 'tiled'):
+                batch.append(item)
+            else:
+                self.counts[item['status']] += 1
+                if item['status'] == 'failed':
+                    logger.warning(f"Skipping {item['name']}: {item['error']}")
+        return batch, open_workers
+
+    def _infer(self):
+        """Main thread: batched inference on decoded images, tiled inference on large scenes"""
+        backend = self.backend
+        seen = set()  # hashes queued for writing in this run
+        open_workers = self.decode_workers
+        while open_workers:
+            batch, open_workers = self._next_batch(open_workers)
+            fresh = []
+            for item in batch:
+                if item['content_hash'] in seen:
+                    self.counts['duplicate'] += 1
+                else:
+                    seen.add(item['content_hash'])
+                    fresh.append(item)
+            if not fresh:
+                continue
+
+            started = time.perf_counter()
+            decoded = [item for item in fresh if item['status'] == 'decoded']
+            if decoded:
+                names = backend.model_loader.get().names
+                results = backend.run_inference([item['image'] for item in decoded])
+                for item, result in zip(decoded, results):
+                    item['detections'] = backend.Detections.from_result(result, names)
+            for item in fresh:
+                item['image'] = None
+                if item['status'] == 'tiled':
+                    detections, success, message = backend.process_image_with_yolo(Path(item['file_path']), tiled=True)
+                    if not success:
+                        self.counts['failed'] += 1
+                        logger.warning(f"Skipping {item['name']}: {message}")
+                        continue
+                    item['detections'] = detections
+                self.write_queue.put(item)
+            self.stats['inference'].add(len(fresh), time.perf_counter() - started)
+            self.maybe_report()
+
+    def _write(self):
+        """Writer thread: store images in transactions of commit_every and checkpoint them"""
+        with self.backend.app.app_context(), open(self.checkpoint_path, 'a') as checkpoint:
+            pending = []
+            while True:
+                item = self.write_queue.get()
+                if item is not _DONE:
+                    pending.append(item)
+                    if len(pending) < self.commit_every:
+                        continue
+                if pending:
+                    started = time.perf_counter()
+                    try:
+                        self._store(pending)
+                        checkpoint.write(''.join(f"{item['content_hash']}\n" for item in pending))
+                        checkpoint.flush()
+                        os.fsync(checkpoint.fileno())
+                        self.counts['ingested'] += len(pending)
+                    except Exception as e:
+                        self.counts['failed'] += len(pending)
+                        logger.error(f"Storing {len(pending)} images failed: {str(e)}")
+                    self.stats['write'].add(len(pending), time.perf_counter() - started)
+                    pending = []
+                if item is _DONE:
+                    return
+
+    def _store(self, items):
+        """Insert image rows, their detections and alerts, and counters in one transaction"""
+        backend = self.backend
+        db = backend.db
+        now = datetime.utcnow()
+        records = []
+        for item in items:
+            original_filename = Path(item['name']).name
+            records.append(backend.DetectionImage(
+                filename=backend.secure_filename(f"{now.timestamp()}_{item['content_hash'][:8]}_{original_filename}"),
+                original_filename=original_filename,
+                upload_timestamp=now,
+                file_size=item['file_size'],
+                file_path=item['file_path'],
+                content_hash=item['content_hash']
+            ))
+        try:
+            db.session.add_all(records)
+            db.session.flush()
+            backend.increment_statistics(Counter({('images', '', now): len(records)}))
+            alerts = []
+            for record, item in zip(records, items):
+                alerts.extend(backend.persist_detections(record, item['detections'], commit=False)[1])
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        finally:
+            db.session.expunge_all()
+        if alerts:
+            backend.alert_hub.publish(alerts)
+
+    def maybe_report(self):
+        now = time.perf_counter()
+        if now - self._last_report >= self.report_every:
+            self._last_report = now
+            self.report()
+
+    def report(self, final=False):
+        """Log progress, per-stage throughput and the stage limiting it"""
+        elapsed = time.perf_counter() - self.started
+        processed = self.counts['ingested']
+        counts = ', '.join(f"{key} {value}" for key, value in sorted(self.counts.items()))
+        logger.info(f"{'Finished' if final else 'Progress'}: {counts or 'nothing yet'} in {elapsed:.1f}s "
+                    f"({processed / elapsed if elapsed else 0:.1f} images/s stored)")
+
+        lines = []
+        for stage in self.stats.values():
+            capacity = stage.capacity
+            lines.append(f"  {stage.name:<10} {stage.items:>8} items  busy {stage.busy_seconds:>8.1f}s  "
+                         f"capacity {capacity if capacity is not None else 0:>8.1f}/s ({stage.workers} worker"
+                         f"{'s' if stage.workers != 1 else ''})")
+        logger.info("Stages:\n" + '\n'.join(lines) + '\n' + f"  queues: {self._queue_depths()}")
+
+        measured = [stage for stage in self.stats.values() if stage.capacity]
+        if measured:
+            bottleneck = min(measured, key=lambda stage: stage.capacity)
+            logger.info(f"Bottleneck: {bottleneck.name} ({bottleneck.capacity:.1f} images/s)")
+
+    def _queue_depths(self):
+        depths = []
+        for name, stage_queue in (('raw', self.raw_queue), ('decoded', self.decoded_queue),
+                                  ('write', self.write_queue)):
+            try:
+                depths.append(f"{name} {stage_queue.qsize()}")
+            except NotImplementedError:  # multiprocessing queues on macOS
+                pass
+        return ', '.join(depths)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Ingest a directory, zip or tar of images')
+    parser.add_argument('source', help='directory, .zip or .tar[.gz|.bz2|.xz] of images')
+    parser.add_argument('--checkpoint', help='file of ingested content hashes (default: <source>.ingest-checkpoint)')
+    parser.add_argument('--decode-workers', type=int, default=max(1, (os.cpu_count() or 2) // 2),
+                        help='decode processes (default: half the CPUs)')
+    parser.add_argument('--batch-size', type=int, default=int(os.getenv('INFERENCE_MAX_BATCH_SIZE', 8)),
+                        help='images per forward pass (default: INFERENCE_MAX_BATCH_SIZE or 8)')
+    parser.add_argument('--commit-every', type=int, default=64, help='images per database transaction')
+    parser.add_argument('--queue-size', type=int, default=64, help='capacity of each queue between stages')
+    parser.add_argument('--report-every', type=float, default=10.0, help='seconds between progress reports')
+    args = parser.parse_args()
+
+    # Batches are formed here; the web app's micro-batching scheduler would only add latency
+    os.environ['INFERENCE_BATCHING'] = 'false'
+    import app as backend
+    backend.init_db()
+
+    checkpoint = args.checkpoint or f"{str(args.source).rstrip('/')}.ingest-checkpoint"
+    Ingest(backend, args.source, checkpoint, decode_workers=args.decode_workers, batch_size=args.batch_size,
+           commit_every=args.commit_every, queue_size=args.queue_size, report_every=args.report_every).run()
+
+
+if __name__ == '__main__':
+    main()
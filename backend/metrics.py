@@ -0,0 +1,185 @@
+"""
+Request stage timings and Prometheus metrics
+Code marks the stages of a request with `with metrics.stage('inference'):`.
+Each stage's duration is observed in a Prometheus histogram (served on
+/metrics) and, with Server-Timing on, listed in that response's
+Server-Timing header alongside the request's SQL statement count and time.
+
+Under gunicorn every worker is its own process, so metrics use
+prometheus_client's multiprocess mode when PROMETHEUS_MULTIPROC_DIR is set:
+each worker writes its values to files in that directory and whichever
+worker answers /metrics adds them all up. With both features off, stage()
+hands back one shared no-op context manager and no hooks are installed.
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+try:
+    import prometheus_client
+    from prometheus_client import multiprocess
+except ImportError:
+    prometheus_client = None
+
+_NO_OP = nullcontext()
+
+# Seconds; request stages range from sub-millisecond lookups to tiled scenes
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+STATEMENT_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100, 250)
+
+
+class Metrics:
+    """Stage timer and Prometheus metrics for one process"""
+
+    def __init__(self, enabled=False, server_timing=False):
+        self.enabled = enabled and prometheus_client is not None
+        self.server_timing = server_timing
+        self.active = self.enabled or self.server_timing
+        self._local = threading.local()
+        if self.enabled:
+            self._create_metrics()
+
+    def _create_metrics(self):
+        Histogram, Counter, Gauge = prometheus_client.Histogram, prometheus_client.Counter, prometheus_client.Gauge
+        self.request_seconds = Histogram('http_request_duration_seconds', 'Request latency',
+                                         ['endpoint', 'method', 'status'], buckets=LATENCY_BUCKETS)
+        self.stage_seconds = Histogram('request_stage_duration_seconds', 'Time spent in each request stage',
+                                       ['stage'], buckets=LATENCY_BUCKETS)
+        self.db_statements = Histogram('db_statements_per_request', 'SQL statements executed per request',
+                                       ['endpoint'], buckets=STATEMENT_BUCKETS)
+        self.db_seconds = Histogram('db_duration_seconds_per_request', 'SQL execution time per request',
+                                    ['endpoint'], buckets=LATENCY_BUCKETS)
+        self.batch_size = Histogram('inference_batch_size', 'Images per forward pass', buckets=BATCH_SIZE_BUCKETS)
+        self.batch_seconds = Histogram('inference_batch_duration_seconds', 'Forward pass latency',
+                                       buckets=LATENCY_BUCKETS)
+        self.queue_depth = Gauge('inference_queue_depth', 'Images waiting for the micro-batching scheduler',
+                                 multiprocess_mode='livesum')
+        self.model_load_seconds = Gauge('model_load_seconds', 'Model load time by step', ['step'],
+                                        multiprocess_mode='max')
+        self.cache_lookups = Counter('cache_lookups_total', 'Cache lookups', ['cache', 'result'])
+        self.alert_candidates = Counter('alert_candidates_total', 'Alert candidates by what the alert rules did with them',
+                                        ['outcome'])
+
+    # Request lifecycle (installed as Flask hooks only while active)
+
+    def begin_request(self):
+        self._local.stages = []
+        self._local.statements = 0
+        self._local.db_seconds = 0.0
+        self._local.started = time.perf_counter()
+
+    def end_request(self, endpoint, method, status):
+        """
+        Observe the finished request
+        Returns: Server-Timing header value, or None when Server-Timing is off
+        """
+        started = getattr(self._local, 'started', None)
+        if started is None:
+            return None
+        self._local.started = None
+        elapsed = time.perf_counter() - started
+        stages, statements, db_seconds = self._local.stages, self._local.statements, self._local.db_seconds
+
+        if self.enabled:
+            self.request_seconds.labels(endpoint, method, status).observe(elapsed)
+            self.db_statements.labels(endpoint).observe(statements)
+            self.db_seconds.labels(endpoint).observe(db_seconds)
+
+        if not self.server_timing:
+            return None
+        entries = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in stages]
+        entries.append(f'db;dur={db_seconds * 1000:.1f};desc="{statements} statements"')
+        entries.append(f"total;dur={elapsed * 1000:.1f}")
+        return ', '.join(entries)
+
+    def stage(self, name):
+        """Context manager timing one stage of the current request (a shared no-op when inactive)"""
+        if not self.active:
+            return _NO_OP
+        return self._timed_stage(name)
+
+    @contextmanager
+    def _timed_stage(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            stages = getattr(self._local, 'stages', None)
+            if stages is not None:
+                stages.append((name, elapsed))
+            if self.enabled:
+                self.stage_seconds.labels(name).observe(elapsed)
+
+    def statement_started(self, conn, cursor, statement, parameters, context, executemany):
+        """SQLAlchemy before_cursor_execute listener"""
+        self._local.statement_started = time.perf_counter()
+
+    def statement_finished(self, conn, cursor, statement, parameters, context, executemany):
+        """SQLAlchemy after_cursor_execute listener"""
+        started = getattr(self._local, 'statement_started', None)
+        if started is None or getattr(self._local, 'started', None) is None:
+            return
+        self._local.statements += 1
+        self._local.db_seconds += time.perf_counter() - started
+
+    # Process-level metrics
+
+    def observe_batch(self, size, seconds, queue_depth=None):
+        if not self.enabled:
+            return
+        self.batch_size.observe(size)
+        self.batch_seconds.observe(seconds)
+        if queue_depth is not None:
+            self.queue_depth.set(queue_depth)
+
+    def observe_model_load(self, timings_ms):
+        if not self.enabled:
+            return
+        for key, value in timings_ms.items():
+            self.model_load_seconds.labels(key[:-3]).set(value / 1000)
+
+    def cache_lookup(self, cache, hit):
+        if self.enabled:
+            self.cache_lookups.labels(cache, 'hit' if hit else 'miss').inc()
+
+    def alert_outcomes(self, outcomes):
+        if not self.enabled:
+            return
+        for outcome in ('aggregated', 'duplicates', 'rate_limited', 'below_rules'):
+            if outcomes[outcome]:
+                self.alert_candidates.labels(outcome).inc(outcomes[outcome])
+        if outcomes['alerts']:
+            self.alert_candidates.labels('alerted').inc(outcomes['alerts'])
+
+    def exposition(self):
+        """
+        Current metrics in the Prometheus text format, summed over every worker
+        in multiprocess mode
+        Returns: (body, content type)
+        """
+        if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+            registry = prometheus_client.CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+        else:
+            registry = prometheus_client.REGISTRY
+        return prometheus_client.generate_latest(registry), prometheus_client.CONTENT_TYPE_LATEST
+
+
+def clear_multiprocess_dir(keep_pid=None):
+    """Remove metric files left by earlier runs (gunicorn's master calls this on start)"""
+    directory = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if not directory or not os.path.isdir(directory):
+        return
+    for name in os.listdir(directory):
+        if name.endswith('.db') and not name.endswith(f'_{keep_pid}.db'):
+            os.unlink(os.path.join(directory, name))
+
+
+def mark_process_dead(pid):
+    """Drop a dead worker's live gauges (gunicorn's child_exit hook)"""
+    if prometheus_client is not None and os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        multiprocess.mark_process_dead(pid)
@@ -0,0 +1,103 @@
+"""
+Versioned schema migrations
+Each migration is a function of a connection, registered with a version
+number, and runs once per database: versions are recorded in the
+schema_migrations table in the same transaction as the migration's DDL.
+Version 1 creates the tables from the current models, so later migrations
+must tolerate finding their change already made.
+
+Every process that starts the app (gunicorn workers, detection workers, the
+ingest CLI) upgrades the schema, so concurrent upgrades are serialized with a
+database lock: BEGIN IMMEDIATE on SQLite, a transaction-level advisory lock on
+PostgreSQL. Whoever gets the lock second finds nothing left to do.
+"""
+
+import logging
+from contextlib import contextmanager
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, select, text
+
+logger = logging.getLogger(__name__)
+
+# Arbitrary application-wide key for pg_advisory_xact_lock
+POSTGRES_LOCK_KEY = 7251001
+
+schema_migrations = Table(
+    'schema_migrations', MetaData(),
+    Column('version', Integer, primary_key=True),
+    Column('description', String(255), nullable=False),
+    Column('applied_timestamp', DateTime, nullable=False)
+)
+
+
+class Migrations:
+    """Ordered registry of schema migrations"""
+
+    def __init__(self):
+        self._migrations = {}
+
+    def register(self, version, description):
+        """Decorator adding function(conn) as migration version"""
+        def decorator(function):
+            if version in self._migrations:
+                raise ValueError(f"Duplicate migration version {version}")
+            self._migrations[version] = (description, function)
+            return function
+        return decorator
+
+    @property
+    def latest(self):
+        return max(self._migrations, default=0)
+
+    def current_version(self, engine):
+        """Highest applied version (0 for a database that was never migrated)"""
+        with engine.connect() as conn:
+            if not engine.dialect.has_table(conn, schema_migrations.name):
+                return 0
+            versions = conn.execute(select(schema_migrations.c.version)).scalars().all()
+        return max(versions, default=0)
+
+    def upgrade(self, engine):
+        """
+        Apply every migration the database hasn't had yet, in one locked transaction
+        Returns: list of the versions applied
+        """
+        applied = []
+        with locked_transaction(engine) as conn:
+            schema_migrations.create(conn, checkfirst=True)
+            done = set(conn.execute(select(schema_migrations.c.version)).scalars())
+            for version in sorted(self._migrations):
+                if version in done:
+                    continue
+                description, function = self._migrations[version]
+                function(conn)
+                conn.execute(schema_migrations.insert().values(
+                    version=version, description=description, applied_timestamp=datetime.utcnow()
+                ))
+                logger.info(f"Applied migration {version}: {description}")
+                applied.append(version)
+        return applied
+
+
+@contextmanager
+def locked_transaction(engine):
+    """A transaction that holds the database's migration lock until it ends"""
+    if engine.dialect.name == 'sqlite':
+        # pysqlite runs DDL outside any transaction by default; take over
+        # transaction control so the DDL and the version rows commit together
+        with engine.connect() as conn:
+            conn.execution_options(isolation_level='AUTOCOMMIT')
+            conn.exec_driver_sql('BEGIN IMMEDIATE')
+            try:
+                yield conn
+            except BaseException:
+                conn.exec_driver_sql('ROLLBACK')
+                raise
+            conn.exec_driver_sql('COMMIT')
+        return
+
+    with engine.begin() as conn:
+        if engine.dialect.name == 'postgresql':
+            conn.execute(text('SELECT pg_advisory_xact_lock(:key)'), {'key': POSTGRES_LOCK_KEY})
+        yield conn
@@ -0,0 +1,138 @@
+"""
+Lazy, once-per-process loading of the inference backend
+Importing the app no longer loads the model. It is loaded on first use, in a
+background thread when a worker starts, or in the gunicorn master with
+--preload so forked workers share the weights copy-on-write. Readiness and a
+startup-time breakdown are tracked here for /api/ready and the boot log.
+"""
+
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class ModelLoader:
+    """
+    Holds the process's inference backend
+    load(timings) must return the backend, recording any sub-steps it times
+    (in ms) in timings; warmup(backend), if given, runs one throwaway inference.
+    """
+
+    def __init__(self, load, warmup=None):
+        self._load = load
+        self._warmup = warmup
+        self._lock = threading.Lock()
+        self._loaded = threading.Event()
+        self._thread = None
+        self._pid = None
+        self.backend = None
+        self.state = 'not_loaded'  # 'loading', 'warming_up', 'ready' or 'failed'
+        self.error = None
+        self.timings = {}
+
+    def get(self, timeout=None):
+        """
+        The loaded backend, loading it in this thread if nobody has started yet
+        Raises RuntimeError if loading failed or didn't finish within timeout.
+        """
+        if self.backend is not None:
+            return self.backend
+        if self._claim():
+            self._load_now(warmup=False)
+        elif not self._loaded.wait(timeout):
+            raise RuntimeError('Model is still loading')
+        if self.backend is None:
+            raise RuntimeError(f"Model failed to load: {self.error}")
+        return self.backend
+
+    def load(self, warmup=True):
+        """Load synchronously in this thread (a no-op once loaded)"""
+        if self._claim():
+            self._load_now(warmup)
+        return self.get()
+
+    def start(self):
+        """Load in a background thread; in an already-loaded process only the warm-up runs"""
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._background_load, name='model-loader', daemon=True)
+            self._thread.start()
+
+    @property
+    def ready(self):
+        return self.state == 'ready'
+
+    def status(self):
+        return {
+            'state': self.state,
+            'backend': self.backend.name if self.backend is not None else None,
+            'error': self.error,
+            'timings_ms': dict(self.timings)
+        }
+
+    def record_inference(self, elapsed_ms):
+        """
+        Note the first inference's latency, which includes one-off lazy setup
+        Returns: True if this was the first inference
+        """
+        if 'first_inference_ms' not in self.timings:
+            self.timings['first_inference_ms'] = round(elapsed_ms, 1)
+            logger.info(f"First inference took {elapsed_ms / 1000:.2f}s")
+            return True
+        return False
+
+    def _claim(self):
+        with self._lock:
+            if self.state in ('not_loaded', 'failed'):
+                self.state = 'loading'
+                self._loaded.clear()
+                return True
+            return False
+
+    def _background_load(self):
+        if self._claim():
+            self._load_now(warmup=True)
+        elif self.backend is not None and 'first_inference_ms' not in self.timings:
+            # Inherited from a preloading parent: warm up this worker's own runtime state
+            self._run_warmup()
+
+    def _load_now(self, warmup):
+        started = time.perf_counter()
+        try:
+            timings = {}
+            backend = self._load(timings)
+            timings['load_ms'] = round((time.perf_counter() - started) * 1000, 1)
+            self.timings.update(timings)
+            self.backend = backend
+            self.state = 'warming_up' if warmup and self._warmup is not None else 'ready'
+            self.error = None
+            breakdown = ', '.join(f"{key[:-3].replace('_', ' ')} {value / 1000:.2f}s" for key, value in timings.items())
+            logger.info(f"Model loaded in process {os.getpid()} ({breakdown})")
+        except Exception as e:
+            self.state = 'failed'
+            self.error = str(e)
+            logger.error(f"Error loading model: {str(e)}")
+        finally:
+            self._loaded.set()
+
+        if warmup and self.backend is not None:
+            self._run_warmup()
+
+    def _run_warmup(self):
+        """Run the warm-up inference; the process only reports ready once it's done"""
+        if self._warmup is None:
+            return
+        self.state = 'warming_up'
+        started = time.perf_counter()
+        try:
+            self._warmup(self.backend)
+            self.record_inference((time.perf_counter() - started) * 1000)
+        except Exception as e:
+            logger.warning(f"Model warm-up failed: {str(e)}")
+        finally:
+            self.state = 'ready'
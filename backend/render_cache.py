@@ -0,0 +1,113 @@
+"""
+Size-bounded disk cache for rendered images
+Entries are plain files named by their key, shared by every process on the
+host. Recency lives in the files' mtimes (a hit touches the file), so LRU
+eviction works across processes: when the cache grows past max_bytes the
+directory is rescanned and the least recently used files are removed until
+it is back under low_water of the limit.
+"""
+
+import logging
+import os
+import threading
+from pathlib import Path
+
+from background_writer import write_file_atomic
+
+logger = logging.getLogger(__name__)
+
+
+class RenderCache:
+    """Disk LRU cache of rendered outputs, bounded by total size in bytes"""
+
+    # Rescan at least this often, so writes by other processes are counted
+    RESCAN_EVERY = 100
+
+    def __init__(self, directory, max_bytes, low_water=0.9):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.low_water = low_water
+        self._lock = threading.Lock()
+        self._total_bytes = None  # estimate; refreshed by _scan
+        self._puts_since_scan = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def path_for(self, key, extension):
+        return self.directory / key[:2] / f'{key}.{extension}'
+
+    def get(self, key, extension):
+        """Path of a cached entry (marking it most recently used), or None"""
+        path = self.path_for(key, extension)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return path
+
+    def put(self, key, extension, data):
+        """Store an entry, evicting least recently used entries past max_bytes"""
+        path = self.path_for(key, extension)
+        write_file_atomic(path, data)
+        with self._lock:
+            if self._total_bytes is None or self._puts_since_scan >= self.RESCAN_EVERY:
+                self._scan()
+            else:
+                self._total_bytes += len(data)
+                self._puts_since_scan += 1
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+        return path
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'bytes': self._total_bytes,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else None
+        }
+
+    def _entries(self):
+        """(mtime, size, path) of every cached file"""
+        entries = []
+        if not self.directory.exists():
+            return entries
+        for shard in os.scandir(self.directory):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.startswith('.tmp-'):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue  # evicted by another process
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def _scan(self):
+        self._total_bytes = sum(size for _, size, _ in self._entries())
+        self._puts_since_scan = 0
+
+    def _evict(self):
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * self.low_water
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.unlink(path)
+                self.evictions += 1
+            except FileNotFoundError:
+                pass
+            total -= size
+        self._total_bytes = total
+        self._puts_since_scan = 0
+        logger.info(f"Render cache trimmed to {total / (1024 * 1024):.1f}MB")
@@ -0,0 +1,70 @@
+"""
+Shared fixtures: the app against a throwaway SQLite database and storage
+folders, with inference replaced by a fixed result so no model is needed
+
+    cd backend && python -m pytest tests
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+_data_dir = Path(tempfile.mkdtemp(prefix='backend_tests_'))
+os.environ['DATABASE_URL'] = f'sqlite:///{_data_dir}/tests.db'
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import cv2  # noqa: E402
+import numpy as np  # noqa: E402
+
+import app as backend_app  # noqa: E402
+from detections import Detections  # noqa: E402
+
+NAMES = {0: 'truck', 1: 'warehouse'}
+
+
+@pytest.fixture
+def backend(tmp_path, monkeypatch):
+    """The app module with empty tables and caches, storing files under tmp_path"""
+    (tmp_path / 'uploads').mkdir()
+    monkeypatch.setattr(backend_app, 'UPLOAD_FOLDER', tmp_path / 'uploads')
+    monkeypatch.setattr(backend_app.upload_sessions, 'root', tmp_path / 'uploads' / 'sessions')
+    backend_app.init_db()
+    with backend_app.app.app_context():
+        for table in reversed(backend_app.db.metadata.sorted_tables):
+            backend_app.db.session.execute(table.delete())
+        backend_app.db.session.commit()
+    backend_app.result_cache.clear()
+    return backend_app
+
+
+@pytest.fixture
+def client(backend):
+    return backend.app.test_client()
+
+
+@pytest.fixture
+def inference(backend, monkeypatch):
+    """
+    Replace inference with one truck detection per image
+    Returns: list of the images inference ran on
+    """
+    calls = []
+
+    def detect(image, **options):
+        calls.append(image)
+        return Detections([[10, 10, 50, 50]], [0.9], [0], NAMES), True, 'ok'
+
+    monkeypatch.setattr(backend, 'process_image_with_yolo', detect)
+    return calls
+
+
+@pytest.fixture
+def make_png():
+    """Function of a seed returning the bytes of a small PNG whose content depends on it"""
+    def make(seed=0, size=32):
+        pixels = np.random.default_rng(seed).integers(0, 255, (size, size, 3), dtype=np.uint8)
+        return cv2.imencode('.png', pixels)[1].tobytes()
+    return make
@@ -0,0 +1,154 @@
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from alert_rules import AlertEngine, SeverityRules
+from conftest import NAMES
+from detections import Detections
+
+
+@pytest.fixture
+def engine(backend, monkeypatch):
+    engine = AlertEngine(SeverityRules(), rate_per_minute=10)
+    monkeypatch.setattr(backend, 'alert_engine', engine)
+    return engine
+
+
+def test_alerts_rolled_back_with_their_transaction_are_raised_on_retry(backend, engine, monkeypatch):
+    with backend.app.app_context():
+        image = backend.DetectionImage(filename='scene.png', original_filename='scene.png', file_path='/x/scene.png',
+                                       content_hash='ab' * 32)
+        backend.db.session.add(image)
+        backend.db.session.commit()
+        detections = Detections([[0, 0, 8, 8]], [0.95], [0], NAMES)
+
+        commit = backend.db.session.commit
+
+        def locked():
+            raise OperationalError('COMMIT', {}, Exception('database is locked'))
+
+        monkeypatch.setattr(backend.db.session, 'commit', locked)
+        with pytest.raises(OperationalError):
+            backend.persist_detections(image, detections)
+        monkeypatch.setattr(backend.db.session, 'commit', commit)
+
+        _, alerts = backend.persist_detections(image, detections)
+
+    assert len(alerts) == 1
+    assert engine.stats()['duplicates'] == 0
+    assert engine.stats()['alerts'] == 1
+
+
+def test_images_stored_in_one_transaction_are_deduplicated_against_each_other(backend, engine):
+    with backend.app.app_context():
+        images = [backend.DetectionImage(filename=f'frame_{i}.png', original_filename=f'frame_{i}.png',
+                                         file_path=f'/x/frame_{i}.png', site_key='depot') for i in range(2)]
+        backend.db.session.add_all(images)
+        backend.db.session.commit()
+
+        alerts = [backend.persist_detections(image, Detections([[0, 0, 8, 8]], [0.95], [0], NAMES), commit=False)[1]
+                  for image in images]
+        assert engine.stats()['alerts'] == 0  # nothing recorded before the commit
+        backend.db.session.commit()
+
+    assert [len(image_alerts) for image_alerts in alerts] == [1, 0]
+    assert engine.stats()['alerts'] == 1
+    assert engine.stats()['duplicates'] == 1
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def raise_alerts(engine, candidates, place='depot'):
+    alerts, outcomes, decision = engine.evaluate(candidates, place)
+    engine.apply(decision)
+    return alerts, outcomes
+
+
+def test_repeat_in_the_same_cell_is_suppressed_until_the_window_ends():
+    clock = FakeClock()
+    engine = AlertEngine(dedup_window_seconds=300, cell_size=100, clock=clock)
+    truck = ('new', 1, 'truck', 0.8, (10, 10, 30, 30))
+
+    assert len(raise_alerts(engine, [truck])[0]) == 1
+    clock.now += 299
+    alerts, outcomes = raise_alerts(engine, [('new', 2, 'truck', 0.8, (20, 20, 40, 40))])
+    assert alerts == [] and outcomes['duplicates'] == 1
+    assert len(raise_alerts(engine, [truck], place='harbour')[0]) == 1
+    assert len(raise_alerts(engine, [('new', 3, 'truck', 0.8, (210, 10, 230, 30))])[0]) == 1
+
+    clock.now += 1
+    assert len(raise_alerts(engine, [truck])[0]) == 1
+
+
+def test_evaluate_alone_records_nothing():
+    engine = AlertEngine(rate_per_minute=1, clock=FakeClock())
+    truck = ('new', 1, 'truck', 0.8, (10, 10, 30, 30))
+
+    for _ in range(3):
+        alerts, _, _ = engine.evaluate([truck], 'depot')
+        assert len(alerts) == 1
+    assert engine.stats()['alerts'] == 0
+    assert engine.stats()['recent_keys'] == 0
+
+
+def test_candidates_of_one_class_become_one_summary():
+    engine = AlertEngine(SeverityRules({'truck': {'escalate_count': 3}}), cell_size=10, clock=FakeClock())
+    candidates = [('new', detection_id, 'truck', confidence, (x, 0, x + 5, 5))
+                  for detection_id, confidence, x in [(1, 0.6, 0), (2, 0.75, 100), (3, 0.5, 200)]]
+
+    alerts, outcomes = raise_alerts(engine, candidates + [('new', 4, 'car', 0.95, (300, 0, 305, 5))])
+
+    assert [(alert['class_name'], alert['count'], alert['detection_id'], alert['severity']) for alert in alerts] == \
+        [('car', 1, 4, 'high'), ('truck', 3, 2, 'high')]
+    assert outcomes['aggregated'] == 2
+
+
+def test_without_aggregation_each_candidate_alerts():
+    engine = AlertEngine(aggregate=False, cell_size=10, clock=FakeClock())
+    candidates = [('new', detection_id, 'truck', 0.8, (detection_id * 100, 0, detection_id * 100 + 5, 5))
+                  for detection_id in range(3)]
+
+    assert len(raise_alerts(engine, candidates)[0]) == 3
+
+
+def test_rate_limit_keeps_the_most_severe_and_refills_over_time():
+    clock = FakeClock()
+    engine = AlertEngine(rate_per_minute=2, dedup_window_seconds=0, clock=clock)
+    candidates = [('new', 1, 'car', 0.5, (0, 0, 5, 5)), ('new', 2, 'truck', 0.95, (0, 0, 5, 5)),
+                  ('new', 3, 'ship', 0.8, (0, 0, 5, 5))]
+
+    alerts, outcomes = raise_alerts(engine, candidates)
+    assert [alert['class_name'] for alert in alerts] == ['truck', 'ship']
+    assert outcomes['rate_limited'] == 1
+    assert raise_alerts(engine, candidates)[0] == []
+
+    clock.now += 30
+    assert [alert['class_name'] for alert in raise_alerts(engine, candidates)[0]] == ['truck']
+    clock.now += 3600
+    assert len(raise_alerts(engine, candidates)[0]) == 2
+
+
+def test_pending_decisions_use_up_keys_and_tokens():
+    engine = AlertEngine(rate_per_minute=2, clock=FakeClock())
+    first = engine.evaluate([('new', 1, 'truck', 0.8, (0, 0, 5, 5))], 'depot')[2]
+
+    alerts, outcomes, _ = engine.evaluate([('new', 2, 'truck', 0.8, (0, 0, 5, 5)),
+                                           ('new', 3, 'car', 0.8, (0, 0, 5, 5)),
+                                           ('new', 4, 'ship', 0.8, (0, 0, 5, 5))], 'depot', pending=[first])
+
+    assert outcomes['duplicates'] == 1
+    assert len(alerts) == 1 and outcomes['rate_limited'] == 1
+
+
+def test_recent_keys_stay_bounded():
+    engine = AlertEngine(max_keys=5, cell_size=10, clock=FakeClock())
+
+    for x in range(10):
+        raise_alerts(engine, [('new', x, 'truck', 0.8, (x * 100, 0, x * 100 + 5, 5))])
+
+    assert engine.stats()['recent_keys'] == 5
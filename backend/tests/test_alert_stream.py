@@ -0,0 +1,61 @@
+import pytest
+
+from alert_stream import AlertHub
+
+
+def alert(alert_id):
+    return {'id': alert_id, 'severity': 'medium', 'message': f'alert {alert_id}'}
+
+
+def event_id(event):
+    return int(event.split('\n')[0].removeprefix('id: '))
+
+
+@pytest.fixture
+def hub(backend, monkeypatch):
+    """A hub whose poller finds nothing, so the test decides what is published"""
+    hub = AlertHub(lambda after_id, limit: [], lambda: 0, buffer_size=1)
+    monkeypatch.setattr(backend, 'alert_hub', hub)
+    return hub
+
+
+def test_alert_committed_after_a_higher_id_is_streamed(backend, hub):
+    events = backend.generate_alert_events(None, None)
+    assert next(events).startswith('retry:')
+
+    hub.publish([alert(5)])
+    assert event_id(next(events)) == 5
+    hub.publish([alert(4)])
+    assert event_id(next(events)) == 4
+    events.close()
+
+
+def test_catch_up_after_lag_replays_late_alerts_once(backend, hub, monkeypatch):
+    stored = [alert(4), alert(5), alert(6), alert(7)]  # 4 committed after 5 was streamed
+    monkeypatch.setattr(backend, 'fetch_alerts_since', lambda after_id, limit, severities=None: [
+        a for a in stored if a['id'] > after_id][:limit])
+    events = backend.generate_alert_events(None, None)
+    next(events)
+
+    hub.publish([alert(5)])
+    assert event_id(next(events)) == 5
+    hub.publish([alert(6), alert(7)])  # overflows the one-alert buffer
+
+    assert [event_id(next(events)) for _ in range(3)] == [4, 6, 7]
+    events.close()
+
+
+def test_last_event_id_replays_only_later_alerts(backend, hub, monkeypatch):
+    stored = [alert(1), alert(2), alert(3)]
+    monkeypatch.setattr(backend, 'fetch_alerts_since', lambda after_id, limit, severities=None: [
+        a for a in stored if a['id'] > after_id][:limit])
+    monkeypatch.setattr(backend, 'ALERT_STREAM_KEEPALIVE_SECONDS', 0.01)
+    events = backend.generate_alert_events(None, 1)
+    next(events)
+
+    assert [event_id(next(events)) for _ in range(2)] == [2, 3]
+    hub.publish([alert(3)])  # already replayed
+    assert next(events) == ': keep-alive\n\n'
+    hub.publish([alert(4)])
+    assert event_id(next(events)) == 4
+    events.close()
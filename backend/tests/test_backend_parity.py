@@ -0,0 +1,56 @@
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+pytest.importorskip('ultralytics')
+pytest.importorskip('onnxruntime')
+
+from boxes import match_boxes  # noqa: E402
+from detections import Detections  # noqa: E402
+from inference_backends import OnnxRuntimeBackend, UltralyticsBackend, export_onnx  # noqa: E402
+
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+
+# Same fp32 tolerances as benchmarks/check_backend_parity.py
+MIN_IOU, MAX_CONF_DIFF, MIN_MATCHED = 0.95, 0.01, 0.98
+
+
+@pytest.fixture(scope='module')
+def backends(tmp_path_factory):
+    weights = BASE_DIR / 'yolov8n.pt'
+    if not weights.exists():
+        pytest.skip('yolov8n.pt is not available')
+    # Export next to a copy so the test never writes into the repository
+    copy = tmp_path_factory.mktemp('weights') / weights.name
+    shutil.copy(weights, copy)
+    return UltralyticsBackend(str(copy)), OnnxRuntimeBackend(str(export_onnx(copy)))
+
+
+def images():
+    rng = np.random.default_rng(0)
+    scenes = [rng.integers(0, 256, size=(*shape, 3), dtype=np.uint8) for shape in [(480, 640), (720, 1280)]]
+    bus = BASE_DIR / 'bus.jpg'
+    return ([str(bus)] if bus.exists() else []) + scenes
+
+
+def predict(backend, image):
+    return Detections.from_result(backend.predict([image], 0.25)[0], backend.names)
+
+
+@pytest.mark.parametrize('index', range(3))
+def test_onnx_boxes_match_pytorch(backends, index):
+    scenes = images()
+    if index >= len(scenes):
+        pytest.skip('bus.jpg is not available')
+    torch_backend, onnx_backend = backends
+
+    reference = predict(torch_backend, scenes[index])
+    candidate = predict(onnx_backend, scenes[index])
+
+    rows, cols = match_boxes(reference.xyxy, candidate.xyxy, MIN_IOU, reference.cls, candidate.cls)
+    within = np.abs(reference.conf[rows] - candidate.conf[cols]) <= MAX_CONF_DIFF
+    assert len(candidate) <= len(reference) + max(1, len(reference) // 50)
+    if len(reference):
+        assert within.sum() / len(reference) >= MIN_MATCHED
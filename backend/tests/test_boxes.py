@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+from boxes import box_iou, match_boxes, overlapping_pairs
+
+
+def random_boxes(rng, count, size=1000, max_side=120):
+    top_left = rng.uniform(0, size, size=(count, 2))
+    sides = rng.uniform(1, max_side, size=(count, 2))
+    return np.hstack([top_left, top_left + sides]).astype(np.float32)
+
+
+def brute_force_pairs(boxes_a, boxes_b, iou_threshold):
+    iou = box_iou(boxes_a, boxes_b)
+    rows, cols = np.nonzero(iou >= iou_threshold)
+    return {(row, col): iou[row, col] for row, col in zip(rows.tolist(), cols.tolist())}
+
+
+def brute_force_match(boxes_a, boxes_b, iou_threshold, classes_a=None, classes_b=None):
+    iou = box_iou(boxes_a, boxes_b)
+    if classes_a is not None:
+        iou[classes_a[:, None] != classes_b[None, :]] = 0
+    matched, used_a, used_b = set(), set(), set()
+    for flat in np.argsort(-iou, axis=None, kind='stable'):
+        row, col = np.unravel_index(flat, iou.shape)
+        if iou[row, col] < iou_threshold:
+            break
+        if row not in used_a and col not in used_b:
+            used_a.add(row)
+            used_b.add(col)
+            matched.add((int(row), int(col)))
+    return matched
+
+
+@pytest.mark.parametrize('seed', range(5))
+@pytest.mark.parametrize('chunk_size', [1, 7, 256])
+def test_overlapping_pairs_match_the_full_iou_matrix(seed, chunk_size):
+    rng = np.random.default_rng(seed)
+    boxes_a, boxes_b = random_boxes(rng, 300), random_boxes(rng, 250)
+
+    rows, cols, ious = overlapping_pairs(boxes_a, boxes_b, 0.1, chunk_size=chunk_size)
+
+    expected = brute_force_pairs(boxes_a, boxes_b, 0.1)
+    assert dict(zip(zip(rows.tolist(), cols.tolist()), ious.tolist())) == pytest.approx(expected)
+
+
+def test_overlapping_pairs_keep_a_wide_box_far_to_the_left():
+    boxes_a = np.array([[900, 0, 960, 50]], dtype=np.float32)
+    boxes_b = np.array([[0, 0, 1000, 50], [950, 0, 990, 50]], dtype=np.float32)
+
+    rows, cols, _ = overlapping_pairs(boxes_a, boxes_b, 0.01)
+
+    assert sorted(zip(rows.tolist(), cols.tolist())) == [(0, 0), (0, 1)]
+
+
+@pytest.mark.parametrize('seed', range(5))
+@pytest.mark.parametrize('with_classes', [False, True])
+def test_match_boxes_agrees_with_greedy_over_the_full_matrix(seed, with_classes):
+    rng = np.random.default_rng(seed)
+    boxes_a = random_boxes(rng, 200)
+    boxes_b = np.vstack([boxes_a[:150] + rng.normal(0, 4, size=(150, 4)), random_boxes(rng, 60)]).astype(np.float32)
+    classes_a = rng.integers(0, 3, size=len(boxes_a)) if with_classes else None
+    classes_b = rng.integers(0, 3, size=len(boxes_b)) if with_classes else None
+
+    rows, cols = match_boxes(boxes_a, boxes_b, 0.3, classes_a, classes_b)
+
+    assert len(set(rows.tolist())) == len(rows) and len(set(cols.tolist())) == len(cols)
+    assert set(zip(rows.tolist(), cols.tolist())) == brute_force_match(boxes_a, boxes_b, 0.3, classes_a, classes_b)
+
+
+def test_match_boxes_with_nothing_to_match():
+    rows, cols = match_boxes(np.empty((0, 4)), [[0, 0, 10, 10]])
+
+    assert rows.tolist() == [] and cols.tolist() == []
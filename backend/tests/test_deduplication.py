@@ -0,0 +1,45 @@
+import io
+
+
+def upload(client, data, **form):
+    return client.post('/api/upload', data={'image': (io.BytesIO(data), 'scene.png'), **form},
+                       content_type='multipart/form-data')
+
+
+def test_repeat_upload_is_deduplicated_after_cache_is_cleared(backend, client, inference, make_png):
+    data = make_png(1)
+    first = upload(client, data)
+    assert first.status_code == 201, first.get_json()
+
+    # Another worker, or this one after a restart or eviction
+    backend.result_cache.clear()
+    second = upload(client, data)
+
+    assert second.status_code == 200, second.get_json()
+    assert second.get_json()['deduplicated'] is True
+    assert second.get_json()['image_id'] == first.get_json()['image_id']
+    assert len(inference) == 1
+
+
+def test_async_repeat_upload_is_deduplicated_after_cache_is_cleared(backend, client, inference, make_png):
+    data = make_png(2)
+    assert upload(client, data).status_code == 201
+    backend.result_cache.clear()
+
+    response = upload(client, data, **{'async': 'true'})
+
+    assert response.status_code == 202
+    assert response.get_json()['deduplicated'] is True
+    assert response.get_json()['status'] == 'completed'
+
+
+def test_other_options_are_not_deduplicated(backend, client, inference, make_png):
+    data = make_png(3)
+    assert upload(client, data).status_code == 201
+    backend.result_cache.clear()
+
+    response = upload(client, data, conf='0.8')
+
+    assert response.status_code == 201
+    assert 'deduplicated' not in response.get_json()
+    assert len(inference) == 2
@@ -0,0 +1,75 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+TIES = datetime(2026, 3, 1, 12, 0, 0, 250000)
+
+
+@pytest.fixture
+def detections(backend):
+    """Seven detections, five sharing one timestamp; returns their ids newest first"""
+    with backend.app.app_context():
+        image = backend.DetectionImage(filename='scene.png', original_filename='scene.png', file_path='/x/scene.png')
+        backend.db.session.add(image)
+        backend.db.session.flush()
+        timestamps = [TIES - timedelta(minutes=1), TIES, TIES, TIES, TIES, TIES, TIES + timedelta(minutes=1)]
+        rows = [backend.Detection(image_id=image.id, class_name='truck' if i % 3 else 'warehouse', confidence=0.9,
+                                  x_min=0, y_min=0, x_max=8, y_max=8, detection_timestamp=timestamp)
+                for i, timestamp in enumerate(timestamps)]
+        backend.db.session.add_all(rows)
+        backend.db.session.commit()
+        return [row.id for row in sorted(rows, key=lambda row: (row.detection_timestamp, row.id), reverse=True)]
+
+
+def test_cursor_round_trips(backend):
+    cursor = backend.encode_cursor(TIES, 42)
+
+    assert backend.decode_cursor(cursor) == (TIES, 42)
+    assert '=' not in cursor
+
+
+@pytest.mark.parametrize('cursor', ['not a cursor', 'MjAyNi0wMy0wMQ', ''])
+def test_malformed_cursor_is_rejected(backend, cursor):
+    with pytest.raises(ValueError):
+        backend.decode_cursor(cursor)
+
+
+def walk(client, per_page, **filters):
+    ids, cursor, pages = [], '', 0
+    while cursor is not None:
+        body = client.get('/api/detections', query_string={**filters, 'per_page': per_page, 'cursor': cursor}).get_json()
+        ids.extend(detection['id'] for detection in body['detections'])
+        cursor = body['next_cursor']
+        assert body['has_more'] == (cursor is not None)
+        pages += 1
+    return ids, pages
+
+
+@pytest.mark.parametrize('per_page', [1, 2, 3, 7, 10])
+def test_keyset_pages_through_tied_timestamps_without_gaps_or_repeats(client, detections, per_page):
+    ids, pages = walk(client, per_page)
+
+    assert ids == detections
+    assert pages == max(1, -(-len(detections) // per_page))
+
+
+def test_keyset_pages_match_offset_pages(client, detections):
+    offset_ids = [detection['id'] for page in (1, 2, 3)
+                  for detection in client.get('/api/detections',
+                                              query_string={'per_page': 3, 'page': page}).get_json()['detections']]
+
+    assert walk(client, 3)[0] == offset_ids
+
+
+def test_keyset_pages_a_filtered_feed(client, backend, detections):
+    ids, _ = walk(client, 2, **{'class': 'truck'})
+
+    with backend.app.app_context():
+        trucks = {row.id for row in backend.Detection.query.filter_by(class_name='truck')}
+    assert ids == [detection_id for detection_id in detections if detection_id in trucks]
+
+
+def test_invalid_cursor_is_a_bad_request(client, detections):
+    response = client.get('/api/detections', query_string={'cursor': 'not a cursor'})
+
+    assert response.status_code == 400
@@ -0,0 +1,46 @@
+"""
+SQL statements per request for the image endpoints: each has a fixed budget
+that must hold whatever the page size or detection count
+"""
+
+import numpy as np
+import pytest
+
+from conftest import NAMES
+from detections import Detections
+
+# Page count + page; image + detections + alerts
+IMAGES_BUDGET = 2
+IMAGE_DETAIL_BUDGET = 3
+
+
+def seed(backend, images, detections_per_image):
+    """Add processed images with random detections and alerts; returns their ids"""
+    rng = np.random.default_rng(images * 1000 + detections_per_image)
+    image_ids = []
+    for i in range(images):
+        image_record = backend.DetectionImage(filename=f'seed_{i}.jpg', original_filename=f'seed_{i}.jpg',
+                                              file_size=0, file_path='/dev/null')
+        backend.db.session.add(image_record)
+        backend.db.session.commit()
+        xy = rng.uniform(0, 1000, size=(detections_per_image, 2))
+        detections = Detections(np.hstack([xy, xy + 20]), rng.uniform(0.5, 1.0, size=detections_per_image),
+                                rng.integers(0, 2, size=detections_per_image), NAMES)
+        backend.persist_detections(image_record, detections)
+        image_ids.append(image_record.id)
+    return image_ids
+
+
+@pytest.mark.parametrize('images, detections_per_image', [(1, 0), (10, 5), (50, 50)])
+def test_image_endpoints_run_a_fixed_number_of_statements(backend, client, images, detections_per_image):
+    with backend.app.app_context():
+        image_ids = seed(backend, images, detections_per_image)
+
+    with backend.count_queries(max_queries=IMAGES_BUDGET):
+        response = client.get(f'/api/images?per_page={images}')
+    assert response.status_code == 200
+    assert len(response.get_json()['images']) == images
+
+    with backend.count_queries(max_queries=IMAGE_DETAIL_BUDGET):
+        response = client.get(f'/api/images/{image_ids[-1]}')
+    assert response.status_code == 200
@@ -0,0 +1,71 @@
+import io
+from collections import Counter
+from datetime import datetime
+
+import pytest
+
+from conftest import NAMES
+from detections import Detections
+
+
+@pytest.fixture
+def summary_counters(backend, monkeypatch):
+    monkeypatch.setattr(backend, 'STATISTICS_SUMMARY', True)
+
+
+def statistics(backend, client, monkeypatch, summary):
+    monkeypatch.setattr(backend, 'STATISTICS_SUMMARY', summary)
+    response = client.get('/api/statistics')
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def test_recovered_job_does_not_double_count(backend, client, inference, summary_counters, monkeypatch, make_png):
+    response = client.post('/api/upload', data={'image': (io.BytesIO(make_png(10)), 'scene.png'), 'async': 'true'},
+                           content_type='multipart/form-data')
+    assert response.status_code == 202
+
+    with backend.app.app_context():
+        job = backend.claim_next_job('crashed-worker')
+        # The crashed attempt stored its rows but never finished
+        backend.persist_detections(job.image, Detections([[0, 0, 8, 8], [20, 20, 30, 30]], [0.9, 0.8], [0, 1], NAMES))
+        job.image.detection_processed = False
+        backend.db.session.commit()
+
+        assert backend.process_detection_job(job)
+
+    counted = statistics(backend, client, monkeypatch, summary=True)
+    aggregated = statistics(backend, client, monkeypatch, summary=False)
+    assert counted == aggregated
+    assert counted['total_detections'] == 1
+    assert counted['class_statistics'] == {'truck': 1}
+
+
+@pytest.mark.parametrize('since, until', [
+    ('2026-03-01T10:20:00', '2026-03-01T12:30:00'),
+    ('2026-03-01T10:00:00', '2026-03-01T12:00:00'),
+    ('2026-03-01T09:59:59', '2026-03-01T11:00:01'),
+])
+def test_timeseries_range_is_the_same_whole_buckets_in_both_modes(backend, client, summary_counters, monkeypatch,
+                                                                 since, until):
+    uploaded = [datetime(2026, 3, 1, hour, minute) for hour, minute in [(9, 50), (10, 5), (10, 40), (11, 15),
+                                                                         (12, 10), (12, 45)]]
+    with backend.app.app_context():
+        for i, timestamp in enumerate(uploaded):
+            backend.db.session.add(backend.DetectionImage(filename=f'{i}.png', original_filename=f'{i}.png',
+                                                          file_path=f'/x/{i}.png', upload_timestamp=timestamp))
+        backend.increment_statistics(Counter(('images', '', timestamp) for timestamp in uploaded))
+        backend.db.session.commit()
+
+    series = {}
+    for summary in (True, False):
+        monkeypatch.setattr(backend, 'STATISTICS_SUMMARY', summary)
+        response = client.get('/api/statistics/timeseries', query_string={'bucket': 'hour', 'since': since,
+                                                                          'until': until})
+        assert response.status_code == 200
+        series[summary] = {entry['bucket_start']: entry['total_images'] for entry in response.get_json()['series']}
+
+    assert series[True] == series[False]
+    start, end = int(since[11:13]), int(until[11:13])
+    assert list(series[True]) == [f'2026-03-01T{hour:02d}:00:00' for hour in range(start, end)
+                                  if any(timestamp.hour == hour for timestamp in uploaded)]
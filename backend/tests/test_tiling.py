@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from tiling import _to_bgr_uint8, tile_windows, value_range
+
+
+@pytest.mark.parametrize('bands', [1, 2])
+def test_one_or_two_bands_become_grey(bands):
+    pixels = np.zeros((bands, 4, 4), dtype=np.uint8)
+    pixels[0] = 100
+    if bands == 2:
+        pixels[1] = 255  # alpha
+
+    tile = _to_bgr_uint8(pixels)
+
+    assert tile.shape == (4, 4, 3)
+    assert (tile == 100).all()
+
+
+def test_first_three_of_four_bands_become_bgr():
+    pixels = np.stack([np.full((4, 4), value, dtype=np.uint8) for value in (10, 20, 30, 40)])
+
+    tile = _to_bgr_uint8(pixels)
+
+    assert tile.shape == (4, 4, 3)
+    assert tile[0, 0].tolist() == [30, 20, 10]
+
+
+def test_12_bit_scene_is_stretched_over_its_range():
+    rng = np.random.default_rng(0)
+    pixels = rng.integers(0, 4096, (3, 64, 64)).astype(np.uint16)
+
+    low, high = value_range(pixels)
+    tile = _to_bgr_uint8(pixels, (low, high))
+
+    assert high <= 4095
+    assert tile.max() == 255
+    assert tile.mean() > 100
+
+
+def test_value_range_ignores_nodata_and_nan():
+    pixels = np.ma.masked_equal(np.array([[[0, 0, 1000, 2000, 3000]]], dtype=np.uint16), 0)
+    assert value_range(pixels)[0] >= 1000
+
+    low, high = value_range(np.array([[[np.nan, 0.1, 0.5]]], dtype=np.float32))
+    assert np.isfinite([low, high]).all()
+
+
+def test_windows_cover_the_scene_with_full_size_tiles():
+    windows = tile_windows(1500, 700, tile_size=640, overlap=128)
+
+    assert max(x_max for _, _, x_max, _ in windows) == 1500
+    assert max(y_max for _, _, _, y_max in windows) == 700
+    assert {(x_max - x_min, y_max - y_min) for x_min, y_min, x_max, y_max in windows} == {(640, 640)}
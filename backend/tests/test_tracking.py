@@ -0,0 +1,103 @@
+from types import SimpleNamespace
+
+import numpy as np
+
+from detections import Detections
+from tracking import IoUTracker
+from video_ingest import _DONE, VideoIngest
+
+BOX = [10, 10, 50, 50]
+SHIFTED = [12, 11, 52, 51]
+
+
+def test_track_is_confirmed_once_at_min_hits():
+    tracker = IoUTracker(min_hits=3)
+    frames = [[BOX], [SHIFTED], [BOX], [SHIFTED], [BOX]]
+
+    results = [tracker.update(boxes, [0]) for boxes in frames]
+
+    assert [ids.tolist() for ids, _ in results] == [[1]] * 5
+    assert [confirmed.tolist() for _, confirmed in results] == [[False], [False], [True], [False], [False]]
+
+
+def test_min_hits_of_one_confirms_new_tracks():
+    tracker = IoUTracker(min_hits=1)
+
+    ids, confirmed = tracker.update([BOX, [100, 100, 140, 140]], [0, 1])
+    _, again = tracker.update([BOX], [0])
+
+    assert ids.tolist() == [1, 2]
+    assert confirmed.tolist() == [True, True]
+    assert again.tolist() == [False]
+
+
+def test_other_class_starts_a_new_track():
+    tracker = IoUTracker(min_hits=2)
+    tracker.update([BOX], [0])
+
+    ids, confirmed = tracker.update([BOX], [1])
+
+    assert ids.tolist() == [2]
+    assert confirmed.tolist() == [False]
+
+
+def test_unmatched_track_ages_out_after_max_age():
+    tracker = IoUTracker(max_age=2, min_hits=2)
+    tracker.update([BOX], [0])
+    for _ in range(2):
+        tracker.update(np.empty((0, 4)), [])
+    assert len(tracker) == 1
+
+    tracker.update(np.empty((0, 4)), [])
+    ids, _ = tracker.update([BOX], [0])
+
+    assert len(tracker) == 1
+    assert ids.tolist() == [2]
+
+
+def test_match_within_max_age_keeps_the_track():
+    tracker = IoUTracker(max_age=2, min_hits=2)
+    tracker.update([BOX], [0])
+    tracker.update(np.empty((0, 4)), [])
+    tracker.update(np.empty((0, 4)), [])
+
+    ids, confirmed = tracker.update([SHIFTED], [0])
+
+    assert ids.tolist() == [1]
+    assert confirmed.tolist() == [True]
+
+
+def test_unconfirmed_track_confirms_again_at_its_next_match():
+    tracker = IoUTracker(min_hits=2)
+    tracker.update([BOX, [100, 100, 140, 140]], [0, 0])
+    _, confirmed = tracker.update([BOX, [100, 100, 140, 140]], [0, 0])
+    assert confirmed.tolist() == [True, True]
+
+    tracker.unconfirm([1, 99])
+    _, confirmed = tracker.update([SHIFTED, [100, 100, 140, 140]], [0, 0])
+
+    assert confirmed.tolist() == [True, False]
+
+
+def test_tracks_confirmed_in_frames_that_failed_to_store_alert_later(backend, monkeypatch):
+    tracker = IoUTracker(min_hits=2)
+    ingest = VideoIngest(SimpleNamespace(app=backend.app), 'site_a', conf=0.5, tracker=tracker)
+    frames = []
+    for index in range(2):
+        detections = Detections([BOX], [0.9], [0], {0: 'truck'})
+        track_ids, confirmed = tracker.update(detections.xyxy, detections.cls)
+        frames.append({'index': index, 'frame': None, 'detections': detections,
+                       'track_ids': track_ids, 'confirmed': confirmed})
+    assert frames[1]['confirmed'].tolist() == [True]
+
+    def fail(items):
+        raise RuntimeError('database is locked')
+
+    monkeypatch.setattr(ingest, '_store', fail)
+    for item in frames + [_DONE]:
+        ingest.write_queue.put(item)
+    ingest._write()
+
+    assert ingest.counts['failed'] == 2
+    _, confirmed = tracker.update([SHIFTED], [0])
+    assert confirmed.tolist() == [True]
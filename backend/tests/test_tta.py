@@ -0,0 +1,36 @@
+import numpy as np
+from werkzeug.datastructures import MultiDict
+
+from tta import CostEstimate, iter_view_batches, plan_views
+
+
+def test_budget_zero_or_too_large_is_clamped_to_the_server_maximum(backend, monkeypatch):
+    monkeypatch.setattr(backend, 'TTA_MAX_BUDGET_MS', 3000)
+    for requested, expected in (('0', 3000), ('100000', 3000), ('500', 500)):
+        options = backend.parse_detection_options(MultiDict({'mode': 'accurate', 'budget_ms': requested}))
+        assert options['budget_ms'] == expected
+
+
+def test_view_cap_applies_without_a_budget():
+    cost = CostEstimate(initial_ms=10)
+    assert cost.max_views(0, limit=16) == 16
+    assert cost.max_views(50, limit=16) == 5
+    assert cost.max_views(0) is None
+
+    views = plan_views(2048, 2048, 640, 128, cost.max_views(0, limit=16))
+    assert 0 < len(views) <= 16
+    assert len(plan_views(2048, 2048, 640, 128)) > 16
+
+
+def test_views_are_rendered_in_batches():
+    image = np.zeros((1000, 1200, 3), dtype=np.uint8)
+    views = plan_views(1200, 1000, 640, 128)
+
+    batches = list(iter_view_batches(image, views, batch_size=4))
+
+    assert [len(batch_views) for batch_views, _ in batches][:-1] == [4] * (len(batches) - 1)
+    assert sum(len(pixels) for _, pixels in batches) == len(views)
+    for batch_views, pixels in batches:
+        for view, view_pixels in zip(batch_views, pixels):
+            x_min, y_min, x_max, y_max = view.window
+            assert view_pixels.shape == (y_max - y_min, x_max - x_min, 3)
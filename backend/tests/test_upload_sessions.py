@@ -0,0 +1,81 @@
+import hashlib
+import io
+
+import pytest
+
+from upload_sessions import UploadSessions
+
+DATA = bytes(range(256)) * 40 + b'tail'  # 10244 bytes: three 4 KiB chunks, the last one short
+CHUNK_SIZE = 4096
+
+
+@pytest.fixture
+def session(tmp_path):
+    return UploadSessions(tmp_path / 'sessions').create('scene.tif', len(DATA), CHUNK_SIZE, {})
+
+
+def send(session, index, data=DATA):
+    chunk = data[index * CHUNK_SIZE:(index + 1) * CHUNK_SIZE]
+    return session.write_chunk(index, io.BytesIO(chunk), len(chunk))
+
+
+def test_chunks_sent_out_of_order_assemble_the_file(session, tmp_path):
+    for index in (2, 0):
+        send(session, index)
+    assert session.missing() == [1]
+    with pytest.raises(ValueError, match='1 chunks missing'):
+        session.assemble(lambda content_hash: tmp_path / 'store' / content_hash)
+
+    send(session, 1)
+    content_hash, path = session.assemble(lambda content_hash: tmp_path / 'store' / content_hash)
+
+    assert content_hash == hashlib.sha256(DATA).hexdigest()
+    assert path.read_bytes() == DATA
+    assert session.received() == [0, 1, 2]
+
+
+def test_resent_chunk_rewrites_the_same_bytes(session, tmp_path):
+    first = send(session, 1)
+    assert send(session, 1) == first
+    for index in (0, 2, 1):
+        send(session, index)
+
+    assert session.received() == [0, 1, 2]
+    _, path = session.assemble(lambda content_hash: tmp_path / 'store' / content_hash)
+    assert path.read_bytes() == DATA
+
+
+def test_assembling_again_returns_the_stored_file(session, tmp_path):
+    for index in range(3):
+        send(session, index)
+    first = session.assemble(lambda content_hash: tmp_path / 'store' / content_hash)
+
+    assert session.assemble(lambda content_hash: tmp_path / 'elsewhere' / content_hash) == first
+
+
+def test_chunk_after_finalize_is_refused(session, tmp_path):
+    for index in range(3):
+        send(session, index)
+    session.assemble(lambda content_hash: tmp_path / 'store' / content_hash)
+
+    with pytest.raises(FileNotFoundError):
+        send(session, 0, data=b'x' * len(DATA))
+    assert (tmp_path / 'store' / hashlib.sha256(DATA).hexdigest()).read_bytes() == DATA
+
+
+def test_chunk_during_finalize_is_refused(session):
+    with session.finalizing():
+        with pytest.raises(BlockingIOError):
+            send(session, 0)
+    assert session.missing() == [0, 1, 2]
+
+
+def test_chunk_of_the_wrong_length_or_hash_is_not_marked_received(session):
+    with pytest.raises(ValueError, match='must be 4096 bytes'):
+        session.write_chunk(0, io.BytesIO(b'short'), 5)
+    with pytest.raises(ValueError, match='ended after'):
+        session.write_chunk(0, io.BytesIO(b'short'), CHUNK_SIZE)
+    with pytest.raises(ValueError, match='SHA-256 mismatch'):
+        session.write_chunk(2, io.BytesIO(DATA[2 * CHUNK_SIZE:]), len(DATA) - 2 * CHUNK_SIZE, expected_sha256='0' * 64)
+
+    assert session.received() == []
@@ -0,0 +1,52 @@
+import io
+import mmap
+
+import cv2
+import numpy as np
+import pytest
+from flask import request
+
+
+@pytest.mark.parametrize('size', [32, 600])  # spooled in memory, and to a temporary file
+def test_synchronous_upload_is_decoded_from_the_spooled_body(backend, client, inference, make_png, size):
+    data = make_png(20 + size, size)
+
+    response = client.post('/api/upload', data={'image': (io.BytesIO(data), 'scene.png')},
+                           content_type='multipart/form-data')
+
+    assert response.status_code == 201, response.get_json()
+    assert np.array_equal(inference[0], cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR))
+    backend.background_writer.flush()
+    image_id = response.get_json()['image_id']
+    with backend.app.app_context():
+        stored = backend.db.session.get(backend.DetectionImage, image_id).file_path
+    assert open(stored, 'rb').read() == data
+
+
+def test_large_upload_is_memory_mapped(backend, make_png):
+    data = make_png(30, 600)
+    assert len(data) > 500 * 1024
+    with backend.app.test_request_context('/api/upload', method='POST',
+                                          data={'image': (io.BytesIO(data), 'scene.png')}):
+        mapped, content_hash = backend.read_upload(request.files['image'], request.content_length)
+
+    assert isinstance(mapped, mmap.mmap)
+    assert mapped[:] == data
+    assert backend.get_encoded_image_size(mapped) == (600, 600)
+
+
+def test_result_of_an_original_not_on_disk_yet_is_retried_not_gone(backend, client, tmp_path):
+    with backend.app.app_context():
+        image = backend.DetectionImage(filename='pending.png', original_filename='pending.png',
+                                       file_path=str(tmp_path / 'pending.png'), detection_processed=True)
+        backend.db.session.add(image)
+        backend.db.session.commit()
+
+        # Another worker may still be writing it
+        response = client.get('/api/results/result_pending.jpg')
+        assert response.status_code == 503
+        assert int(response.headers['Retry-After']) > 0
+
+        image.storage_error = 'disk full'
+        backend.db.session.commit()
+        assert client.get('/api/results/result_pending.jpg').status_code == 410
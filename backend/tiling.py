@@ -0,0 +1,218 @@
+"""
+Sliding-window tiling for large satellite scenes
+Splits a scene into overlapping tiles that are read from disk in batches,
+so only one batch of tiles is ever held in memory at a time.
+"""
+
+import io
+import logging
+import warnings
+
+import cv2
+import numpy as np
+from PIL import Image
+
+try:
+    import rasterio
+    from rasterio.errors import NotGeoreferencedWarning
+    from rasterio.windows import Window
+except ImportError:  # without rasterio, scenes are decoded whole (see open_scene)
+    rasterio = None
+
+logger = logging.getLogger(__name__)
+
+# Longest side of the preview a scene's value range is sampled from
+PREVIEW_SIDE = 1024
+
+
+def get_image_size(image_path):
+    """
+    Read the scene dimensions from the file header without decoding pixels
+    Returns: (width, height), or None if the scene is past Pillow's
+    decompression-bomb limit (which is only ever the case for huge scenes)
+    """
+    if rasterio is not None:
+        try:
+            with open_raster(image_path) as src:
+                return src.width, src.height
+        except Exception:
+            pass
+
+    try:
+        with Image.open(str(image_path)) as img:
+            return img.size
+    except Image.DecompressionBombError:
+        return None
+
+
+def get_encoded_image_size(data):
+    """
+    Read the dimensions of an in-memory encoded image from its header
+    data: bytes, or a file-like buffer such as an mmap (read in place)
+    Returns: (width, height), or None if the header can't be read or the image
+    is past Pillow's decompression-bomb limit
+    """
+    try:
+        with Image.open(data if hasattr(data, 'read') else io.BytesIO(data)) as img:
+            return img.size
+    except Exception:
+        return None
+
+
+def _axis_starts(length, tile_size, stride):
+    """Tile start offsets along one axis, with the last tile flush to the edge"""
+    if length <= tile_size:
+        return [0]
+    starts = list(range(0, length - tile_size, stride))
+    starts.append(length - tile_size)
+    return starts
+
+
+def tile_windows(width, height, tile_size=640, overlap=128):
+    """
+    Compute overlapping tile windows covering the whole scene
+    Edge tiles are shifted back inside the scene rather than padded, so every
+    tile has the same shape unless the scene itself is smaller than a tile.
+    Returns: list of (x_min, y_min, x_max, y_max) windows
+    """
+    if overlap >= tile_size:
+        raise ValueError(f"Tile overlap ({overlap}) must be smaller than tile size ({tile_size})")
+
+    stride = tile_size - overlap
+    windows = []
+    for y in _axis_starts(height, tile_size, stride):
+        for x in _axis_starts(width, tile_size, stride):
+            windows.append((x, y, min(x + tile_size, width), min(y + tile_size, height)))
+    return windows
+
+
+def value_range(pixels):
+    """
+    Range of a raster's values that 8-bit tiles are stretched over: the 1st
+    to 99th percentile, ignoring masked (nodata) and non-finite values
+    Sensors rarely fill their storage type (12-bit data in uint16, reflectance
+    in float), so scaling by the type's maximum would leave tiles nearly black.
+    Returns: (low, high)
+    """
+    values = np.ma.compressed(pixels) if np.ma.isMaskedArray(pixels) else np.ravel(pixels)
+    values = values[np.isfinite(values)] if values.dtype.kind == 'f' else values
+    if not values.size:
+        return 0.0, 1.0
+    low, high = np.percentile(values, (1, 99))
+    if high <= low:
+        low, high = float(values.min()), float(values.max())
+    return float(low), float(max(high, low + 1e-6))
+
+
+def _to_bgr_uint8(pixels, pixel_range=None):
+    """
+    Convert a (bands, H, W) raster window to an OpenCV-style BGR uint8 tile
+    One or two bands (grey, grey + alpha) become grey; otherwise the first
+    three are taken as RGB.
+    pixel_range: (low, high) stretched to 0-255 for non-8-bit rasters; the
+    scene's, from value_range, so every tile is scaled alike (default: the
+    window's own)
+    """
+    if pixels.dtype != np.uint8:
+        low, high = pixel_range if pixel_range is not None else value_range(pixels)
+        scaled = (np.asarray(pixels, dtype=np.float32) - low) * (255.0 / (high - low))
+        pixels = np.clip(np.nan_to_num(scaled), 0, 255).astype(np.uint8)
+
+    if pixels.shape[0] < 3:
+        return cv2.cvtColor(np.ascontiguousarray(pixels[0]), cv2.COLOR_GRAY2BGR)
+    return np.ascontiguousarray(pixels[2::-1].transpose(1, 2, 0))
+
+
+def open_raster(image_path):
+    """rasterio.open, quiet about plain images (PNG, JPEG) having no georeferencing"""
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', NotGeoreferencedWarning)
+        return rasterio.open(str(image_path))
+
+
+class RasterioSceneReader:
+    """
+    Windowed reader that only decodes the requested tile from disk
+    Non-8-bit scenes are stretched to 8 bits over a value range sampled once
+    from a decimated read (the file's overviews, when it has them).
+    """
+
+    def __init__(self, image_path):
+        self._src = open_raster(image_path)
+        self.width = self._src.width
+        self.height = self._src.height
+        self._bands = [1] if self._src.count < 3 else [1, 2, 3]
+        self._range = None
+        if self._src.dtypes[0] != 'uint8':
+            try:
+                self._range = self._sample_range()
+            except Exception:
+                self._src.close()
+                raise
+
+    def _sample_range(self):
+        factor = max(1, -(-max(self.width, self.height) // PREVIEW_SIDE))
+        shape = (len(self._bands), max(1, self.height // factor), max(1, self.width // factor))
+        return value_range(self._src.read(self._bands, out_shape=shape, masked=True))
+
+    def read(self, window):
+        x_min, y_min, x_max, y_max = window
+        pixels = self._src.read(self._bands, window=Window(x_min, y_min, x_max - x_min, y_max - y_min))
+        return _to_bgr_uint8(pixels, self._range)
+
+    def close(self):
+        self._src.close()
+
+
+class OpenCVSceneReader:
+    """
+    Fallback reader for formats without random access (PNG, JPEG)
+    The scene is decoded once and tiles are returned as views into it.
+    """
+
+    def __init__(self, image_path):
+        self._img = cv2.imread(str(image_path))
+        if self._img is None:
+            raise ValueError(f"Could not decode image: {image_path}")
+        self.height, self.width = self._img.shape[:2]
+
+    def read(self, window):
+        x_min, y_min, x_max, y_max = window
+        return self._img[y_min:y_max, x_min:x_max]
+
+    def close(self):
+        self._img = None
+
+
+def open_scene(image_path, warn_above=None):
+    """
+    Open a scene with the most memory-efficient reader available
+    Falling back to OpenCV decodes the whole scene, which defeats tiling's
+    bounded memory, so it is logged as a warning for scenes whose longer side
+    exceeds warn_above.
+    """
+    reason = 'rasterio is not installed'
+    if rasterio is not None:
+        try:
+            return RasterioSceneReader(image_path)
+        except Exception as e:
+            reason = f'rasterio could not open it ({e})'
+
+    size = get_image_size(image_path) if warn_above is not None else None
+    if warn_above is not None and (size is None or max(size) > warn_above):
+        dimensions = f'{size[0]}x{size[1]}' if size else 'very large'
+        logger.warning(f"Decoding all of {image_path} ({dimensions}) into memory for tiling because {reason}; "
+                       f"peak memory grows with the scene")
+    else:
+        logger.debug(f"Reading {image_path} with OpenCV because {reason}")
+    return OpenCVSceneReader(image_path)
+
+
+def iter_tile_batches(reader, windows, batch_size=8):
+    """
+    Stream tiles from the reader in batches
+    Yields: (windows, tiles) for each batch
+    """
+    for start in range(0, len(windows), batch_size):
+        batch_windows = windows[start:start + batch_size]
+        yield batch_windows, [reader.read(window) for window in batch_windows]
@@ -0,0 +1,78 @@
+"""
+IoU tracker for detections in video frames and image sequences
+Each frame's detections are matched to the live tracks of the same class by
+IoU (match_boxes: one vectorized IoU matrix per frame); matched tracks take
+the new box, unmatched detections start new tracks, and tracks unmatched
+for more than max_age frames end. Track state is kept as parallel arrays,
+like Detections.
+"""
+
+import numpy as np
+
+from boxes import as_boxes, match_boxes
+
+
+class IoUTracker:
+    """
+    Links per-frame detections into tracks
+    A track is confirmed once it has been matched in min_hits frames; callers
+    raise one alert per track, at the detection that confirmed it.
+    """
+
+    def __init__(self, iou_threshold=0.3, max_age=5, min_hits=2):
+        self.iou_threshold = iou_threshold
+        self.max_age = max_age
+        self.min_hits = min_hits
+        self.next_id = 1
+        self.boxes = np.empty((0, 4), dtype=np.float32)
+        self.classes = np.empty(0, dtype=np.int64)
+        self.ids = np.empty(0, dtype=np.int64)
+        self.hits = np.empty(0, dtype=np.int64)
+        self.misses = np.empty(0, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def update(self, boxes, classes):
+        """
+        Advance the tracker by one frame
+        Returns: (track id per detection, mask of detections whose track was
+        confirmed by this frame)
+        """
+        boxes = as_boxes(boxes)
+        classes = np.asarray(classes, dtype=np.int64).reshape(-1)
+        track_rows, detection_rows = match_boxes(self.boxes, boxes, self.iou_threshold, self.classes, classes)
+
+        track_ids = np.zeros(len(boxes), dtype=np.int64)
+        track_ids[detection_rows] = self.ids[track_rows]
+        matched = np.zeros(len(self), dtype=bool)
+        matched[track_rows] = True
+        self.boxes[track_rows] = boxes[detection_rows]
+        self.hits[track_rows] += 1
+        self.misses[matched] = 0
+        self.misses[~matched] += 1
+        confirmed = np.zeros(len(boxes), dtype=bool)
+        confirmed[detection_rows] = self.hits[track_rows] == self.min_hits
+
+        new_rows = np.setdiff1d(np.arange(len(boxes)), detection_rows)
+        new_ids = np.arange(self.next_id, self.next_id + len(new_rows), dtype=np.int64)
+        self.next_id += len(new_rows)
+        track_ids[new_rows] = new_ids
+        confirmed[new_rows] = self.min_hits <= 1
+
+        alive = self.misses <= self.max_age
+        self.boxes = np.concatenate([self.boxes[alive], boxes[new_rows]])
+        self.classes = np.concatenate([self.classes[alive], classes[new_rows]])
+        self.ids = np.concatenate([self.ids[alive], new_ids])
+        self.hits = np.concatenate([self.hits[alive], np.ones(len(new_rows), dtype=np.int64)])
+        self.misses = np.concatenate([self.misses[alive], np.zeros(len(new_rows), dtype=np.int64)])
+        return track_ids, confirmed
+
+    def unconfirm(self, track_ids):
+        """
+        Let live tracks be confirmed again, at their next match
+        For detections whose alert was lost (their frame failed to store);
+        tracks that have already ended stay ended.
+        """
+        rows = np.isin(self.ids, np.asarray(track_ids, dtype=np.int64))
+        self.hits[rows] = self.min_hits - 1
@@ -0,0 +1,121 @@
+"""
+Test-time augmentation for the accurate detection mode
+The image is also seen flipped and zoomed in (the zoomed image is cut into
+model-sized tiles, so small objects cover more input pixels); every view
+goes through batched forward passes, and boxes are mapped back to the
+original image before weighted boxes fusion merges them.
+"""
+
+import cv2
+import numpy as np
+
+from tiling import tile_windows
+
+# (name, zoom, flip) in priority order: under a view budget, each is kept if all
+# its views still fit after the ones before it (a cheap one can follow a skipped zoom)
+AUGMENTATIONS = (
+    ('original', 1.0, None),
+    ('hflip', 1.0, 'h'),
+    ('zoom', 1.5, None),
+    ('vflip', 1.0, 'v'),
+    ('zoom_hflip', 1.5, 'h'),
+)
+
+_FLIP_CODES = {'h': 1, 'v': 0}
+
+
+class View:
+    """One model input cut from an augmented image, and how to map its boxes back"""
+
+    __slots__ = ('augmentation', 'group', 'zoom', 'flip', 'window')
+
+    def __init__(self, augmentation, group, zoom, flip, window):
+        self.augmentation = augmentation
+        self.group = group  # index of the augmentation, for fusion
+        self.zoom = zoom
+        self.flip = flip
+        self.window = window  # (x_min, y_min, x_max, y_max) in the zoomed image
+
+    def render(self, image, zoomed):
+        """The view's pixels; zoomed is image already resized by self.zoom (or image itself)"""
+        x_min, y_min, x_max, y_max = self.window
+        view = (zoomed if self.zoom != 1.0 else image)[y_min:y_max, x_min:x_max]
+        if self.flip is not None:
+            view = cv2.flip(view, _FLIP_CODES[self.flip])
+        return np.ascontiguousarray(view)
+
+    def restore(self, detections):
+        """Map detections on this view back to original image coordinates"""
+        if not len(detections):
+            return detections
+        x_min, y_min, x_max, y_max = self.window
+        xyxy = detections.xyxy.copy()
+        if self.flip == 'h':
+            xyxy[:, [0, 2]] = (x_max - x_min) - xyxy[:, [2, 0]]
+        elif self.flip == 'v':
+            xyxy[:, [1, 3]] = (y_max - y_min) - xyxy[:, [3, 1]]
+        xyxy += np.array([x_min, y_min, x_min, y_min], dtype=np.float32)
+        xyxy /= self.zoom
+        return type(detections)(xyxy, detections.conf, detections.cls, detections.names)
+
+
+def plan_views(width, height, tile_size, overlap, max_views=None):
+    """
+    Views of a width x height image, augmentation by augmentation in priority
+    order, keeping each augmentation only if all its views fit in max_views
+    A zoom that leaves the image within one tile adds nothing the model's own
+    resizing wouldn't undo, so it is skipped.
+    Returns: [View]
+    """
+    views = []
+    for group, (name, zoom, flip) in enumerate(AUGMENTATIONS):
+        zoomed_width, zoomed_height = round(width * zoom), round(height * zoom)
+        if zoom == 1.0:
+            windows = [(0, 0, width, height)]
+        elif max(zoomed_width, zoomed_height) <= tile_size:
+            continue
+        else:
+            windows = tile_windows(zoomed_width, zoomed_height, tile_size, overlap)
+        if max_views is not None and views and len(views) + len(windows) > max_views:
+            continue
+        views.extend(View(name, group, zoom, flip, window) for window in windows)
+    return views
+
+
+def iter_view_batches(image, views, batch_size=8):
+    """
+    Render the views batch by batch, resizing the image once per zoom level,
+    so only one batch of view pixels is held at a time
+    Yields: (views, pixels) for each batch
+    """
+    height, width = image.shape[:2]
+    zoomed = {}
+    for view in views:
+        if view.zoom != 1.0 and view.zoom not in zoomed:
+            zoomed[view.zoom] = cv2.resize(image, (round(width * view.zoom), round(height * view.zoom)),
+                                           interpolation=cv2.INTER_LINEAR)
+    for start in range(0, len(views), batch_size):
+        batch = views[start:start + batch_size]
+        yield batch, [view.render(image, zoomed.get(view.zoom)) for view in batch]
+
+
+class CostEstimate:
+    """Moving average of forward-pass milliseconds per image, for budgeting views"""
+
+    def __init__(self, initial_ms=100.0, smoothing=0.2):
+        self.ms_per_image = initial_ms
+        self.smoothing = smoothing
+
+    def update(self, elapsed_ms, images):
+        if images:
+            self.ms_per_image += self.smoothing * (elapsed_ms / images - self.ms_per_image)
+
+    def max_views(self, budget_ms, limit=None):
+        """
+        Views that fit in budget_ms (at least the original), and at most limit;
+        None when neither bounds them
+        """
+        if not budget_ms:
+            return limit
+        fitting = max(1, int(budget_ms // max(self.ms_per_image, 1e-3)))
+        return fitting if limit is None else min(fitting, limit)
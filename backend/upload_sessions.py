@@ -0,0 +1,306 @@
+"""
+Chunked, resumable uploads
+A session is a directory under the sessions root holding the upload's
+manifest, one data file the size of the whole upload, and a marker per
+received chunk. Each chunk is streamed from the request straight into its
+place in the data file (hashed on the way, never held in memory whole), so
+chunks can arrive in any order, from any worker process, and re-sending a
+chunk after a dropped connection simply rewrites the same bytes. The data
+file's space is reserved when the session starts, so an upload that fits
+when it starts can't run out of disk halfway.
+
+Finalizing hashes the data file in one sequential pass and moves it into
+content-addressed storage with a rename. Chunk writes hold the session's
+lock shared and finalize holds it exclusively, so no chunk lands in the file
+while it is hashed or after it has moved. Everything lives on disk: any
+worker can serve any request of a session, and the size limit is the free
+disk space rather than memory.
+"""
+
+import errno
+import hashlib
+import json
+import os
+import shutil
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+from background_writer import write_file_atomic
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to an exclusive lock file
+    fcntl = None
+
+READ_SIZE = 1024 * 1024
+
+
+class UploadSession:
+    """One resumable upload, backed by its session directory"""
+
+    def __init__(self, directory, manifest):
+        self.directory = Path(directory)
+        self.id = manifest['id']
+        self.filename = manifest['filename']
+        self.size = manifest['size']
+        self.chunk_size = manifest['chunk_size']
+        self.options = manifest['options']
+        self.created = manifest['created']
+        self.expires = manifest['expires']
+
+    @property
+    def data_path(self):
+        return self.directory / 'data'
+
+    @property
+    def assembled(self):
+        """Whether finalize has moved the data to content-addressed storage"""
+        return (self.directory / 'assembled.json').exists()
+
+    @property
+    def chunk_count(self):
+        return max(1, -(-self.size // self.chunk_size))
+
+    def chunk_length(self, index):
+        """Bytes chunk index must hold (the last one takes the remainder)"""
+        if not 0 <= index < self.chunk_count:
+            raise ValueError(f'chunk index must be in [0, {self.chunk_count})')
+        return min(self.chunk_size, self.size - index * self.chunk_size)
+
+    def received(self):
+        """Indices of the chunks stored so far"""
+        if self.assembled:
+            return list(range(self.chunk_count))
+        chunk_dir = self.directory / 'chunks'
+        if not chunk_dir.exists():
+            return []
+        return sorted(int(name) for name in os.listdir(chunk_dir) if name.isdigit())
+
+    def missing(self):
+        return sorted(set(range(self.chunk_count)) - set(self.received()))
+
+    def write_chunk(self, index, stream, length, expected_sha256=None):
+        """
+        Stream one chunk from stream into its place in the data file
+        The chunk's marker is only written once its bytes are on disk, so an
+        interrupted write leaves the chunk missing and the client re-sends it.
+        The write holds the finalize lock shared, so it can't overlap a
+        finalize hashing and moving the data file.
+        Returns: the chunk's SHA-256, or raises ValueError when its length or
+        hash doesn't match, BlockingIOError while the upload is being finalized
+        and FileNotFoundError once it has been
+        """
+        expected_length = self.chunk_length(index)
+        if length != expected_length:
+            raise ValueError(f'chunk {index} must be {expected_length} bytes, got {length}')
+
+        with self._lock(shared=True):
+            if self.assembled:
+                raise FileNotFoundError(errno.ENOENT, 'Upload already finalized')
+            return self._write_chunk(index, stream, expected_length, expected_sha256)
+
+    def _write_chunk(self, index, stream, expected_length, expected_sha256):
+        digest = hashlib.sha256()
+        written = 0
+        with open(self.data_path, 'r+b') as out:
+            out.seek(index * self.chunk_size)
+            for block in iter(lambda: stream.read(min(READ_SIZE, expected_length - written)), b''):
+                digest.update(block)
+                out.write(block)
+                written += len(block)
+                if written >= expected_length:
+                    break
+            out.flush()
+            os.fsync(out.fileno())
+        if written != expected_length:
+            raise ValueError(f'chunk {index} ended after {written} of {expected_length} bytes')
+
+        chunk_hash = digest.hexdigest()
+        if expected_sha256 and expected_sha256.lower() != chunk_hash:
+            raise ValueError(f'chunk {index} SHA-256 mismatch')
+        marker = self.directory / 'chunks' / str(index)
+        marker.parent.mkdir(exist_ok=True)
+        marker.write_text(chunk_hash)  # a retried chunk just rewrites it
+        return chunk_hash
+
+    def finalizing(self):
+        """
+        Hold the session's finalize lock; raises BlockingIOError while another
+        finalize holds it or a chunk is being written
+        The lock is an flock on the session's lock file, which the kernel
+        releases if the worker holding it dies mid-finalize (OOM, timeout,
+        deploy), so a killed finalize can simply be retried.
+        """
+        return self._lock(shared=False)
+
+    def detecting(self):
+        """
+        Hold the session's detection lock; raises BlockingIOError while
+        another request is running detection on the finalized upload
+        """
+        return self._lock(shared=False, name='detecting')
+
+    @contextmanager
+    def _lock(self, shared, name='finalizing'):
+        """
+        flock the session's lock file: shared for chunk writes, exclusive for
+        finalize. Never blocks; raises BlockingIOError when it is held.
+        """
+        lock_path = self.directory / name
+        if fcntl is None:
+            if shared:
+                # Without flock, writers only check that no finalize is running
+                if lock_path.exists():
+                    raise BlockingIOError(errno.EAGAIN, 'Upload is being finalized')
+                yield
+                return
+            try:
+                os.close(os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            except FileExistsError:
+                raise BlockingIOError(errno.EAGAIN, 'Upload is being finalized')
+            try:
+                yield
+            finally:
+                os.unlink(lock_path)
+            return
+
+        fd = os.open(lock_path, os.O_CREAT | os.O_WRONLY)
+        try:
+            fcntl.flock(fd, (fcntl.LOCK_SH if shared else fcntl.LOCK_EX) | fcntl.LOCK_NB)  # BlockingIOError when held
+            yield
+        finally:
+            os.close(fd)  # releases the lock; the file stays until the session is removed
+
+    def assemble(self, destination_for):
+        """
+        Hash the complete data file and move it to content-addressed storage
+        Assembling again (a finalize retried after detection failed) returns
+        the stored file.
+        destination_for: function of the content hash returning the final path
+        Returns: (content hash, stored path)
+        """
+        assembled_path = self.directory / 'assembled.json'
+        if assembled_path.exists():
+            assembled = json.loads(assembled_path.read_text())
+            return assembled['content_hash'], Path(assembled['file_path'])
+
+        missing = self.missing()
+        if missing:
+            raise ValueError(f'{len(missing)} chunks missing, first {missing[0]}')
+
+        digest = hashlib.sha256()
+        with open(self.data_path, 'rb') as data:
+            for block in iter(lambda: data.read(READ_SIZE), b''):
+                digest.update(block)
+        content_hash = digest.hexdigest()
+
+        file_path = Path(destination_for(content_hash))
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        if file_path.exists():
+            os.unlink(self.data_path)
+        else:
+            os.replace(self.data_path, file_path)
+        write_file_atomic(assembled_path, json.dumps({'content_hash': content_hash, 'file_path': str(file_path)}).encode())
+        shutil.rmtree(self.directory / 'chunks', ignore_errors=True)
+        return content_hash, file_path
+
+    # Outcome of finalize, kept so a repeated finalize answers the same way
+
+    def result(self):
+        path = self.directory / 'result.json'
+        return json.loads(path.read_text()) if path.exists() else None
+
+    def save_result(self, result):
+        write_file_atomic(self.directory / 'result.json', json.dumps(result).encode())
+
+    def to_dict(self):
+        result = self.result()
+        received = self.received()
+        return {
+            'upload_id': self.id,
+            'filename': self.filename,
+            'size': self.size,
+            'chunk_size': self.chunk_size,
+            'chunk_count': self.chunk_count,
+            'received_chunks': len(received),
+            'missing_chunks': sorted(set(range(self.chunk_count)) - set(received)),
+            'status': 'open' if result is None else 'finalized',
+            'expires_at': datetime.utcfromtimestamp(self.expires).isoformat(),
+            'result': result
+        }
+
+
+class UploadSessions:
+    """Upload sessions stored under root, removed ttl_seconds after they started"""
+
+    def __init__(self, root, ttl_seconds=24 * 3600):
+        self.root = Path(root)
+        self.ttl_seconds = ttl_seconds
+
+    def create(self, filename, size, chunk_size, options, reserve_bytes=0):
+        """
+        Start a session and reserve its disk space
+        Returns: the UploadSession, or raises OSError (ENOSPC) when the upload
+        wouldn't leave reserve_bytes free
+        """
+        self.expire()
+        self.root.mkdir(parents=True, exist_ok=True)
+        if shutil.disk_usage(self.root).free - size < reserve_bytes:
+            raise OSError(errno.ENOSPC, 'Not enough disk space for this upload')
+
+        now = time.time()
+        manifest = {'id': uuid.uuid4().hex, 'filename': filename, 'size': size, 'chunk_size': chunk_size,
+                    'options': options, 'created': now, 'expires': now + self.ttl_seconds}
+        directory = self.root / manifest['id']
+        directory.mkdir()
+        session = UploadSession(directory, manifest)
+        try:
+            with open(session.data_path, 'wb') as data:
+                if hasattr(os, 'posix_fallocate') and size:
+                    try:
+                        os.posix_fallocate(data.fileno(), 0, size)
+                    except OSError as e:
+                        if e.errno == errno.ENOSPC:
+                            raise
+                data.truncate(size)  # without fallocate: a sparse file, filled as chunks arrive
+            write_file_atomic(directory / 'session.json', json.dumps(manifest).encode())
+        except Exception:
+            shutil.rmtree(directory, ignore_errors=True)
+            raise
+        return session
+
+    def get(self, upload_id):
+        """The session, or None for unknown or malformed ids"""
+        if not upload_id.isalnum():
+            return None
+        manifest_path = self.root / upload_id / 'session.json'
+        if not manifest_path.exists():
+            return None
+        return UploadSession(manifest_path.parent, json.loads(manifest_path.read_text()))
+
+    def remove(self, upload_id):
+        if upload_id.isalnum():
+            shutil.rmtree(self.root / upload_id, ignore_errors=True)
+
+    def expire(self):
+        """
+        Remove expired sessions, finished or not
+        Returns: number removed
+        """
+        if not self.root.exists():
+            return 0
+        now = time.time()
+        removed = 0
+        for directory in self.root.iterdir():
+            try:
+                expires = json.loads((directory / 'session.json').read_text())['expires']
+            except FileNotFoundError:
+                # Being created, or its manifest never got written
+                expires = directory.stat().st_mtime + self.ttl_seconds if directory.exists() else now
+            if expires < now:
+                shutil.rmtree(directory, ignore_errors=True)
+                removed += 1
+        return removed
@@ -0,0 +1,392 @@
+"""
+Video and image sequence ingest
+Processes a video file, or a directory of timelapse frames (in name order),
+as one stream, and follows objects from frame to frame so each one raises a
+single alert instead of one per frame:
+
+    cd backend && python video_ingest.py ../site_a/drone.mp4 --sample-fps 2
+
+    read + sample + diff (thread) -> inference (batched) + tracking -> write (thread)
+
+Frames are decoded by a generator; with --sample-fps only the sampled frames
+are decoded, the rest are just grabbed. A sampled frame that barely differs
+from the last kept one (mean absolute difference of small grayscale copies
+below --diff-threshold) is skipped. Kept frames go through the model
+--batch-size at a time, and an IoU tracker links their detections into
+tracks. A track raises its alert in the frame that confirms it (--min-hits
+matches), or in its next frame if that one fails to store. Frames with detections are stored as images, with each detection
+pointing at its track.
+"""
+
+import argparse
+import hashlib
+import logging
+import os
+import queue
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+
+import cv2
+from sqlalchemy import insert, update
+
+from tracking import IoUTracker
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger('video_ingest')
+
+_DONE = None  # end-of-stream marker passed down every queue
+
+
+def iter_frames(source, allowed_extensions, sample_every=1):
+    """
+    Yield (frame index, BGR frame) for every sample_every-th frame of a video
+    file or a directory of images
+    Frames in between are grabbed (demuxed, not decoded to pixels) for video,
+    and never read for image sequences.
+    """
+    path = Path(source)
+    if path.is_dir():
+        files = sorted(file for file in path.iterdir()
+                       if file.is_file() and file.suffix.lower().lstrip('.') in allowed_extensions)
+        for index in range(0, len(files), sample_every):
+            frame = cv2.imread(str(files[index]), cv2.IMREAD_COLOR)
+            if frame is None:
+                logger.warning(f"Skipping unreadable frame {files[index].name}")
+                continue
+            yield index, frame
+        return
+
+    capture = cv2.VideoCapture(str(path))
+    if not capture.isOpened():
+        raise ValueError(f"{source} is not a readable video or a directory of images")
+    try:
+        index = 0
+        while True:
+            if index % sample_every:
+                if not capture.grab():
+                    return
+            else:
+                ok, frame = capture.read()
+                if not ok:
+                    return
+                yield index, frame
+            index += 1
+    finally:
+        capture.release()
+
+
+def source_fps(source):
+    """Frame rate of a video (None for image sequences or when unknown)"""
+    if Path(source).is_dir():
+        return None
+    capture = cv2.VideoCapture(str(source))
+    try:
+        fps = capture.get(cv2.CAP_PROP_FPS)
+    finally:
+        capture.release()
+    return fps if fps and fps > 0 else None
+
+
+class FrameDifference:
+    """Skips frames that barely differ from the last frame kept"""
+
+    def __init__(self, threshold=3.0, max_gap=50, size=64):
+        self.threshold = threshold  # mean absolute difference, in gray levels
+        self.max_gap = max_gap  # frames; past this one is kept regardless
+        self.size = size
+        self._last = None
+        self._last_index = None
+
+    def keep(self, index, frame):
+        small = cv2.resize(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), (self.size, self.size),
+                           interpolation=cv2.INTER_AREA)
+        if (self._last is not None and index - self._last_index < self.max_gap
+                and cv2.absdiff(small, self._last).mean() < self.threshold):
+            return False
+        self._last, self._last_index = small, index
+        return True
+
+
+class VideoIngest:
+    """One ingest run over a video or image sequence"""
+
+    def __init__(self, backend, source, sample_every=1, diff_threshold=3.0, max_gap=50, batch_size=8,
+                 conf=None, tracker=None, commit_every=64, queue_size=32, report_every=10.0):
+        self.backend = backend
+        self.source = source
+        self.name = Path(source).name
+        self.sample_every = sample_every
+        self.difference = FrameDifference(diff_threshold, max_gap)
+        self.batch_size = batch_size
+        self.conf = backend.CONFIDENCE_THRESHOLD if conf is None else conf
+        self.tracker = tracker if tracker is not None else IoUTracker()  # an empty tracker is falsy
+        self.commit_every = commit_every
+        self.report_every = report_every
+
+        self.frame_queue = queue.Queue(maxsize=queue_size)
+        self.write_queue = queue.Queue(maxsize=queue_size)
+        self.counts = Counter()
+        self.busy = Counter()  # seconds spent working per stage
+        self.tracks = {}  # tracker id -> Track row values, for tracks seen this run
+        self._tracker_lock = threading.Lock()  # the writer unconfirms tracks whose alerts failed to store
+        self.started = None
+        self._last_report = 0.0
+        self._error = None
+
+    def run(self):
+        self.backend.warm_up_model(self.backend.model_loader.load(warmup=False))
+
+        self.started = time.perf_counter()
+        reader = threading.Thread(target=self._read, name='video-read', daemon=True)
+        writer = threading.Thread(target=self._write, name='video-write', daemon=True)
+        reader.start()
+        writer.start()
+        try:
+            self._infer()
+        finally:
+            self.write_queue.put(_DONE)
+            writer.join()
+
+        if self._error is not None:
+            raise self._error
+        self.report(final=True)
+
+    def _read(self):
+        """Reader thread: decode sampled frames and drop near-duplicates"""
+        try:
+            frames = iter_frames(self.source, self.backend.ALLOWED_EXTENSIONS, self.sample_every)
+            while True:
+                started = time.perf_counter()
+                item = next(frames, _DONE)
+                if item is _DONE:
+                    break
+                index, frame = item
+                self.counts['sampled'] += 1
+                keep = self.difference.keep(index, frame)
+                self.busy['read'] += time.perf_counter() - started
+                if keep:
+                    self.frame_queue.put(item)
+                else:
+                    self.counts['unchanged'] += 1
+            self.counts['frames'] = index + 1 if self.counts['sampled'] else 0
+        except Exception as e:
+            logger.error(f"Reading {self.source} failed: {str(e)}")
+            self._error = e
+        finally:
+            self.frame_queue.put(_DONE)
+
+    def _next_batch(self):
+        """Up to batch_size kept frames; blocks for the first only. Returns: (frames, more to come)"""
+        batch = [self.frame_queue.get()]
+        while batch[-1] is not _DONE and len(batch) < self.batch_size:
+            try:
+                batch.append(self.frame_queue.get(timeout=0.05))
+            except queue.Empty:
+                break
+        if batch[-1] is _DONE:
+            return batch[:-1], False
+        return batch, True
+
+    def _infer(self):
+        """Main thread: batched inference, then tracking frame by frame in order"""
+        backend = self.backend
+        names = backend.model_loader.get().names
+        more = True
+        while more:
+            batch, more = self._next_batch()
+            if not batch:
+                continue
+            started = time.perf_counter()
+            results = backend.run_inference([frame for _, frame in batch], self.conf)
+            for (index, frame), result in zip(batch, results):
+                detections = backend.Detections.from_result(result, names)
+                with self._tracker_lock:
+                    track_ids, confirmed = self.tracker.update(detections.xyxy, detections.cls)
+                self.counts['inferred'] += 1
+                self.write_queue.put({'index': index, 'frame': frame, 'detections': detections,
+                                      'track_ids': track_ids, 'confirmed': confirmed})
+            self.busy['inference'] += time.perf_counter() - started
+            self.maybe_report()
+
+    def _write(self):
+        """Writer thread: store frames with detections in transactions of commit_every"""
+        with self.backend.app.app_context():
+            pending = []
+            while True:
+                item = self.write_queue.get()
+                if item is not _DONE and len(item['detections']):
+                    pending.append(item)
+                    if len(pending) < self.commit_every:
+                        continue
+                if pending:
+                    started = time.perf_counter()
+                    try:
+                        self._store(pending)
+                        self.counts['stored'] += len(pending)
+                    except Exception as e:
+                        self.counts['failed'] += len(pending)
+                        logger.error(f"Storing {len(pending)} frames failed: {str(e)}")
+                        self._unconfirm(pending)
+                    self.busy['write'] += time.perf_counter() - started
+                    pending = []
+                if item is _DONE:
+                    return
+
+    def _unconfirm(self, items):
+        """
+        Give the tracks confirmed in frames that failed to store another
+        chance: each alerts once, so their next match has to confirm them again
+        """
+        track_ids = [track_id for item in items for track_id in item['track_ids'][item['confirmed']].tolist()]
+        if track_ids:
+            with self._tracker_lock:
+                self.tracker.unconfirm(track_ids)
+
+    def _store(self, items):
+        """
+        Store frames, their detections, new tracks and the alerts of newly
+        confirmed tracks, and update the tracks seen, in one transaction
+        """
+        backend = self.backend
+        db = backend.db
+        now = datetime.utcnow()
+        new_tracks = {}
+        for item in items:
+            detections = item['detections']
+            for track_id, class_name, confidence in zip(item['track_ids'].tolist(), detections.class_names(),
+                                                        detections.conf.tolist()):
+                track = self.tracks.get(track_id) or new_tracks.get(track_id)
+                if track is None:
+                    new_tracks[track_id] = {'source': self.name, 'class_name': class_name,
+                                            'first_frame': item['index'], 'last_frame': item['index'],
+                                            'frame_count': 1, 'max_confidence': confidence}
+                else:
+                    track['last_frame'] = item['index']
+                    track['frame_count'] += 1
+                    track['max_confidence'] = max(track['max_confidence'], confidence)
+
+        try:
+            if new_tracks:
+                rows = db.session.execute(
+                    insert(backend.Track).returning(backend.Track.id, sort_by_parameter_order=True),
+                    list(new_tracks.values())
+                ).all()
+                for track, row in zip(new_tracks.values(), rows):
+                    track['id'] = row.id
+            seen = {track_id for item in items for track_id in item['track_ids'].tolist()}
+            updated = [self.tracks[track_id] for track_id in seen if track_id in self.tracks]
+            if updated:
+                db.session.execute(update(backend.Track), [
+                    {key: track[key] for key in ('id', 'last_frame', 'frame_count', 'max_confidence')}
+                    for track in updated
+                ])
+            self.tracks.update(new_tracks)
+
+            alerts = []
+            for item in items:
+                record = self._image_record(item, now)
+                db_track_ids = [self.tracks[track_id]['id'] for track_id in item['track_ids'].tolist()]
+                alerts.extend(backend.persist_detections(record, item['detections'], commit=False,
+                                                         track_ids=db_track_ids, alert_mask=item['confirmed'])[1])
+            backend.increment_statistics(Counter({('images', '', now): len(items)}))
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            for track_id in new_tracks:
+                self.tracks.pop(track_id, None)
+            raise
+        finally:
+            db.session.expunge_all()
+        self.counts['alerts'] += len(alerts)
+        if alerts:
+            backend.alert_hub.publish(alerts)
+
+    def _image_record(self, item, now):
+        """Write a stored frame to the content store and add its image row"""
+        backend = self.backend
+        ok, encoded = cv2.imencode('.jpg', item['frame'], [cv2.IMWRITE_JPEG_QUALITY, 90])
+        if not ok:
+            raise ValueError(f"Could not encode frame {item['index']}")
+        data = encoded.tobytes()
+        content_hash = hashlib.sha256(data).hexdigest()
+        file_path = backend.content_path(content_hash, 'jpg')
+        backend.write_file_atomic(file_path, data)
+        original_filename = f"{Path(self.name).stem}_frame{item['index']:06d}.jpg"
+        record = backend.DetectionImage(
+            filename=backend.secure_filename(f"{now.timestamp()}_{content_hash[:8]}_{original_filename}"),
+            original_filename=original_filename,
+            upload_timestamp=now,
+            file_size=len(data),
+            file_path=str(file_path),
+            content_hash=content_hash
+        )
+        backend.db.session.add(record)
+        backend.db.session.flush()
+        return record
+
+    def maybe_report(self):
+        now = time.perf_counter()
+        if now - self._last_report >= self.report_every:
+            self._last_report = now
+            self.report()
+
+    def report(self, final=False):
+        """Log progress and throughput in frames per second"""
+        elapsed = time.perf_counter() - self.started
+        counts = ', '.join(f"{key} {value}" for key, value in sorted(self.counts.items()))
+        frames = self.counts['frames'] or self.counts['sampled'] * self.sample_every
+        logger.info(f"{'Finished' if final else 'Progress'}: {counts or 'nothing yet'}, "
+                    f"tracks {self.tracker.next_id - 1} in {elapsed:.1f}s")
+        rates = [f"{frames / elapsed if elapsed else 0:.1f} source frames/s",
+                 f"{self.counts['inferred'] / elapsed if elapsed else 0:.1f} inferred frames/s"]
+        for stage in ('read', 'inference', 'write'):
+            if self.busy[stage]:
+                handled = self.counts['sampled'] if stage == 'read' else \
+                    self.counts['inferred'] if stage == 'inference' else self.counts['stored']
+                rates.append(f"{stage} capacity {handled / self.busy[stage]:.1f} frames/s")
+        logger.info('Throughput: ' + ', '.join(rates))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Ingest a video or image sequence with object tracking')
+    parser.add_argument('source', help='video file, or directory of frames in name order')
+    parser.add_argument('--sample-fps', type=float, help='frames per second to sample from a video (default: all)')
+    parser.add_argument('--every', type=int, default=1, help='use every Nth frame (image sequences, or videos '
+                                                             'without --sample-fps)')
+    parser.add_argument('--diff-threshold', type=float, default=3.0,
+                        help='skip frames whose mean absolute difference from the last kept one is below this')
+    parser.add_argument('--max-gap', type=int, default=50, help='keep a frame at least every N frames')
+    parser.add_argument('--batch-size', type=int, default=int(os.getenv('INFERENCE_MAX_BATCH_SIZE', 8)),
+                        help='frames per forward pass (default: INFERENCE_MAX_BATCH_SIZE or 8)')
+    parser.add_argument('--conf', type=float, help='confidence threshold (default: CONFIDENCE_THRESHOLD)')
+    parser.add_argument('--track-iou', type=float, default=0.3, help='IoU linking a detection to a track')
+    parser.add_argument('--max-age', type=int, default=5, help='inferred frames a track survives unmatched')
+    parser.add_argument('--min-hits', type=int, default=2, help='matched frames before a track raises its alert')
+    parser.add_argument('--commit-every', type=int, default=64, help='stored frames per database transaction')
+    parser.add_argument('--report-every', type=float, default=10.0, help='seconds between progress reports')
+    args = parser.parse_args()
+
+    sample_every = max(1, args.every)
+    if args.sample_fps:
+        fps = source_fps(args.source)
+        if fps is None:
+            parser.error('--sample-fps needs a video with a known frame rate; use --every')
+        sample_every = max(1, round(fps / args.sample_fps))
+        logger.info(f"{fps:.1f} fps source, using every {sample_every} frames")
+
+    # Batches are formed here; the web app's micro-batching scheduler would only add latency
+    os.environ['INFERENCE_BATCHING'] = 'false'
+    import app as backend
+    backend.init_db()
+
+    tracker = IoUTracker(iou_threshold=args.track_iou, max_age=args.max_age, min_hits=args.min_hits)
+    VideoIngest(backend, args.source, sample_every=sample_every, diff_threshold=args.diff_threshold,
+                max_gap=args.max_gap, batch_size=args.batch_size, conf=args.conf, tracker=tracker,
+                commit_every=args.commit_every, report_every=args.report_every).run()
+
+
+if __name__ == '__main__':
+    main()
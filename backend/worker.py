@@ -0,0 +1,123 @@
+"""
+Detection job worker
+Drains the persistent detection_jobs queue filled by asynchronous uploads.
+Runs separately from the web workers so the two can be scaled independently:
+
+    cd backend && python worker.py --workers 2
+"""
+
+import argparse
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+import time
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger('worker')
+
+HEARTBEAT_SECONDS = int(os.getenv('JOB_HEARTBEAT_SECONDS', 15))
+
+
+def _heartbeat_loop(backend, state, stop_event):
+    """Keep the current job's heartbeat fresh while a long inference runs"""
+    while not stop_event.wait(HEARTBEAT_SECONDS):
+        job_id = state.get('job_id')
+        if job_id is None:
+            continue
+        try:
+            with backend.app.app_context():
+                backend.heartbeat_job(job_id)
+        except Exception as e:
+            logger.warning(f"Heartbeat failed for job {job_id}: {str(e)}")
+
+
+def run_worker(worker_id, poll_interval):
+    """Claim and process jobs until SIGTERM/SIGINT; the job in flight is finished first"""
+    import app as backend
+
+    stop_event = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop_event.set())
+    signal.signal(signal.SIGINT, lambda *_: stop_event.set())
+
+    state = {'job_id': None}
+    threading.Thread(target=_heartbeat_loop, args=(backend, state, stop_event), daemon=True).start()
+
+    # Load up front so the first claimed job doesn't also pay for the model
+    backend.model_loader.load()
+    logger.info(f"Worker {worker_id} started")
+    last_recovery = 0.0
+    with backend.app.app_context():
+        while not stop_event.is_set():
+            if time.monotonic() - last_recovery > HEARTBEAT_SECONDS:
+                backend.recover_stale_jobs()
+                last_recovery = time.monotonic()
+
+            job = backend.claim_next_job(worker_id)
+            if job is None:
+                stop_event.wait(poll_interval)
+                continue
+
+            state['job_id'] = job.id
+            try:
+                backend.process_detection_job(job)
+            finally:
+                state['job_id'] = None
+                backend.db.session.remove()
+
+    logger.info(f"Worker {worker_id} stopped")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run detection job workers')
+    parser.add_argument('--workers', type=int, default=int(os.getenv('JOB_WORKERS', 1)),
+                        help='number of worker processes (default: JOB_WORKERS or 1)')
+    parser.add_argument('--poll-interval', type=float, default=1.0,
+                        help='seconds to wait when the queue is empty')
+    args = parser.parse_args()
+
+    import app as backend
+    backend.init_db()
+
+    host = socket.gethostname()
+    if args.workers <= 1:
+        run_worker(f'{host}:{os.getpid()}:0', args.poll_interval)
+        return
+
+    # Spawn (not fork) so each worker loads its own model and torch state cleanly
+    ctx = multiprocessing.get_context('spawn')
+    stopping = threading.Event()
+
+    def start(index):
+        process = ctx.Process(target=run_worker, args=(f'{host}:{os.getpid()}:{index}', args.poll_interval),
+                              name=f'detection-worker-{index}')
+        process.start()
+        return process
+
+    processes = {index: start(index) for index in range(args.workers)}
+
+    def shutdown(*_):
+        stopping.set()
+        for process in processes.values():
+            if process.is_alive():
+                process.terminate()
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+
+    # Supervise: restart workers that die unexpectedly; their jobs are recovered via heartbeats
+    while not stopping.is_set():
+        for index, process in list(processes.items()):
+            if not process.is_alive():
+                logger.warning(f"Worker {index} exited with code {process.exitcode}, restarting")
+                processes[index] = start(index)
+        stopping.wait(2.0)
+
+    for process in processes.values():
+        process.join()
+
+
+if __name__ == '__main__':
+    main()
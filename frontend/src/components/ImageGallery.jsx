@@ -3,6 +3,10 @@ import '../styles/ImageGallery.css';
 
 const API_URL = process.env.REACT_APP_API_URL || '/api';
 
+// Annotated images are rendered server-side at the requested size
+const resultImageUrl = (image, size) =>
+  `${API_URL}/results/result_${image.filename.replace(/\.[^.]+$/, '')}.webp?size=${size}`;
+
 const ImageGallery = ({ refreshTrigger }) => {
   const [images, setImages] = useState([]);
   const [loading, setLoading] = useState(true);
@@ -70,6 +74,12 @@ const ImageGallery = ({ refreshTrigger }) => {
                 className="gallery-item"
                 onClick={() => handleImageClick(image)}
               >
+                <img
+                  className="gallery-item-thumbnail"
+                  src={resultImageUrl(image, 'thumbnail')}
+                  alt={image.original_filename}
+                  loading="lazy"
+                />
                 <div className="gallery-item-header">
                   <h4>{image.original_filename}</h4>
                   <span className="detection-count">
@@ -110,6 +120,11 @@ const ImageGallery = ({ refreshTrigger }) => {
           <div className="modal-content" onClick={(e) => e.stopPropagation()}>
             <button className="close-button" onClick={() => setSelectedImage(null)}>✕</button>
             <h3>{selectedImage.image.original_filename}</h3>
+            <img
+              className="modal-image"
+              src={resultImageUrl(selectedImage.image, 'medium')}
+              alt={selectedImage.image.original_filename}
+            />
             
             <div className="image-details">
               <div className="detail-section">